@@ -0,0 +1,220 @@
+import asyncio
+import hashlib
+import json
+import logging
+import mmap
+import os
+import time
+from collections import OrderedDict
+
+import discord
+from discord.oggparse import OggStream
+
+logger = logging.getLogger(__name__)
+
+# จำนวนเพลงสูงสุดที่นับจำนวนครั้งเล่นไว้ (ยังไม่ถึงเกณฑ์ cache)
+MAX_TRACKED_PLAYS = 10000
+RECONNECT_OPTIONS = ['-reconnect', '1', '-reconnect_streamed', '1', '-reconnect_delay_max', '5']
+
+
+class CachedOpusSource(discord.AudioSource):
+    """อ่านแพ็กเก็ต Opus จากไฟล์ Ogg ในเครื่องผ่าน mmap ไม่ต้องใช้ ffmpeg เลย"""
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._packets = OggStream(self._map).iter_packets()
+
+    def is_opus(self):
+        return True
+
+    def read(self):
+        for packet in self._packets:
+            # ข้าม header ของ Ogg Opus ส่งเฉพาะแพ็กเก็ตเสียง
+            if packet.startswith((b'OpusHead', b'OpusTags')):
+                continue
+            return packet
+        return b''
+
+    def cleanup(self):
+        self._packets.close()
+        self._map.close()
+        self._file.close()
+
+
+class AudioCache:
+    """Cache ไฟล์เสียง Opus (Ogg) บนดิสก์สำหรับเพลงที่ถูกเล่นบ่อย
+
+    เพลงที่ถูกเล่นครบ min_plays ครั้งจะถูก transcode เก็บไว้ใน background ตั้งชื่อไฟล์
+    ตาม sha256 ของเนื้อหา ลบไฟล์ที่ไม่ได้ใช้นานที่สุดเมื่อเกิน max_bytes
+    """
+
+    def __init__(self, directory, max_bytes=2 * 1024 ** 3, min_plays=3, max_duration=15 * 60, bitrate='128k'):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.min_plays = min_plays
+        self.max_duration = max_duration
+        self.bitrate = bitrate
+        self._index_path = os.path.join(directory, 'index.json')
+        self._entries = OrderedDict()  # video_id -> {'file', 'size', 'accessed'}
+        self._plays = {}
+        self._pending = {}
+        self._semaphore = asyncio.Semaphore(1)
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self._index_path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        self._plays = data.get('plays', {})
+        entries = sorted(data.get('entries', {}).items(), key=lambda item: item[1]['accessed'])
+        for video_id, entry in entries:
+            if os.path.exists(os.path.join(self.directory, entry['file'])):
+                self._entries[video_id] = entry
+                self.bytes += entry['size']
+        self._evict()
+
+    def _save(self):
+        tmp = self._index_path + '.tmp'
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({'entries': self._entries, 'plays': self._plays}, f)
+            os.replace(tmp, self._index_path)
+        except OSError as e:
+            logger.error(f"Audio cache index write failed: {e}")
+
+    def _file_in_use(self, name):
+        return any(entry['file'] == name for entry in self._entries.values())
+
+    def _evict(self):
+        while self._entries and self.bytes > self.max_bytes:
+            video_id, entry = self._entries.popitem(last=False)
+            self.bytes -= entry['size']
+            self.evictions += 1
+            if not self._file_in_use(entry['file']):
+                try:
+                    os.remove(os.path.join(self.directory, entry['file']))
+                except OSError:
+                    pass
+
+    def lookup(self, track):
+        """คืน path ของไฟล์ที่ cache ไว้ หรือ None
+
+        ยังไม่นับเป็น hit เพราะ source ที่เปิดอาจไม่ได้เล่น (prewarm ที่ถูกทิ้ง) หรือเป็นการ
+        เปิดใหม่กลางเพลง (set_volume) hit/miss นับใน record_play ตอนเพลงเริ่มเล่นจริง
+        """
+        video_id = (track.info or {}).get('id')
+        entry = self._entries.get(video_id) if video_id else None
+        if entry is None:
+            return None
+        path = os.path.join(self.directory, entry['file'])
+        if not os.path.exists(path):
+            del self._entries[video_id]
+            self.bytes -= entry['size']
+            return None
+        self._entries.move_to_end(video_id)
+        entry['accessed'] = time.time()
+        return path
+
+    def record_play(self, track, from_cache=False):
+        """นับว่าเพลงถูกเล่นหนึ่งครั้ง
+
+        from_cache = source ที่เล่นอ่านจากไฟล์ใน cache (นับเป็น hit) ไม่อย่างนั้นนับเป็น miss
+        และถ้าเพลงถูกเล่นถึงเกณฑ์จะเริ่ม transcode เก็บไว้ใน background
+        """
+        info = track.info or {}
+        video_id = info.get('id')
+        entry = self._entries.get(video_id) if video_id else None
+        if from_cache:
+            self.hits += 1
+            if entry is not None:
+                self.bytes_saved += entry['size']
+            return
+        self.misses += 1
+        if not video_id or entry is not None or video_id in self._pending:
+            return
+        self._plays[video_id] = self._plays.pop(video_id, 0) + 1
+        if len(self._plays) > MAX_TRACKED_PLAYS:
+            self._plays.pop(next(iter(self._plays)))
+        if self._plays[video_id] < self.min_plays:
+            return
+        if not track.stream_url or (track.duration and track.duration > self.max_duration):
+            return
+        task = asyncio.create_task(self._store(video_id, track.stream_url, info.get('acodec')))
+        self._pending[video_id] = task
+        task.add_done_callback(lambda _: self._pending.pop(video_id, None))
+
+    async def _store(self, video_id, url, acodec):
+        tmp = os.path.join(self.directory, f'.{video_id}.part.ogg')
+        codec = ['-c:a', 'copy'] if (acodec or '').startswith('opus') else ['-c:a', 'libopus', '-b:a', self.bitrate]
+        async with self._semaphore:
+            try:
+                proc = await asyncio.create_subprocess_exec(
+                    'ffmpeg', '-nostdin', '-loglevel', 'error', '-y', *RECONNECT_OPTIONS,
+                    '-i', url, '-vn', '-map_metadata', '-1', *codec, '-f', 'ogg', tmp,
+                    stdout=asyncio.subprocess.DEVNULL,
+                    stderr=asyncio.subprocess.DEVNULL,
+                )
+                if await proc.wait() != 0:
+                    raise RuntimeError(f"ffmpeg exited with {proc.returncode}")
+
+                digest = await asyncio.get_running_loop().run_in_executor(None, _file_digest, tmp)
+                name = f'{digest}.ogg'
+                path = os.path.join(self.directory, name)
+                if os.path.exists(path):
+                    os.remove(tmp)
+                else:
+                    os.replace(tmp, path)
+            except asyncio.CancelledError:
+                _remove_quietly(tmp)
+                raise
+            except Exception as e:
+                logger.error(f"Audio cache transcode failed for {video_id}: {e}")
+                _remove_quietly(tmp)
+                return
+
+        size = os.path.getsize(path)
+        self._entries[video_id] = {'file': name, 'size': size, 'accessed': time.time()}
+        self.bytes += size
+        self._plays.pop(video_id, None)
+        self._evict()
+        self._save()
+        logger.info(f"Cached audio for {video_id} ({size / 1024 / 1024:.1f} MB)")
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self.bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 3) if lookups else 0.0,
+            'bytes_saved': self.bytes_saved,
+            'evictions': self.evictions,
+            'pending': len(self._pending),
+        }
+
+    def close(self):
+        for task in list(self._pending.values()):
+            task.cancel()
+        self._save()
+
+
+def _file_digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.file_digest(f, 'sha256').hexdigest()
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
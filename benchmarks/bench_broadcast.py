@@ -0,0 +1,67 @@
+"""Benchmark การประกาศหลายห้อง (Broadcaster) กับ REST API จำลองบนเครื่อง
+
+    python benchmarks/bench_broadcast.py [จำนวนห้อง] [latency ms]
+
+ใช้ HTTP client ของ discord.py จริง (รวม bucket/429 handling ของมัน) ยิงไปที่ RestStub
+เทียบส่งทีละห้องแบบ on_ready เดิม, gather ทุกห้องพร้อมกันไม่จำกัด และ Broadcaster
+แล้วรันซ้ำอีกรอบเหมือน reconnect เพื่อดูว่าไม่มีการส่งซ้ำ
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import discord  # noqa: E402
+
+from broadcast import Broadcaster  # noqa: E402
+from rest_stub import RestStub  # noqa: E402
+
+
+def report(name, stub, elapsed, sent):
+    print(f"{name:<22} {elapsed:6.2f}s  {sent:>5} sent  {stub.requests:>5} requests  "
+          f"429 route/global {stub.route_429}/{stub.global_429}  max in flight {stub.max_in_flight}")
+
+
+async def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    latency = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.1
+
+    stub = RestStub(latency=latency)
+    await stub.start()
+    stub.install()
+    client = discord.Client(intents=discord.Intents.none())
+    await client.login('stub-token')
+    channels = [client.get_partial_messageable(300000000000000000 + i) for i in range(count)]
+    print(f"{count} channels, {latency * 1000:.0f} ms RTT, stub global limit {stub.global_limit}/s")
+
+    async def send(channel):
+        await channel.send("✅ Bot is now online!")
+
+    start = time.perf_counter()
+    for channel in channels:
+        await send(channel)
+    report("sequential", stub, time.perf_counter() - start, count)
+
+    await asyncio.sleep(1)  # เริ่มที่ global window ใหม่ของ stub
+    stub.reset_counters()
+    start = time.perf_counter()
+    results = await asyncio.gather(*(send(channel) for channel in channels), return_exceptions=True)
+    sent = sum(1 for result in results if not isinstance(result, Exception))
+    report("unbounded gather", stub, time.perf_counter() - start, sent)
+
+    broadcaster = Broadcaster()
+    for run in ('broadcaster', 'broadcaster (again)'):
+        await asyncio.sleep(1)
+        stub.reset_counters()
+        start = time.perf_counter()
+        job = await broadcaster.run('online', channels, send)
+        report(run, stub, time.perf_counter() - start, job['sent'])
+
+    await client.close()
+    await stub.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
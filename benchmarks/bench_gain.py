@@ -0,0 +1,48 @@
+"""Micro-benchmark ของ gain stage ต่อเฟรม 20ms
+
+    python benchmarks/bench_gain.py [จำนวนเฟรม]
+
+เทียบ GainStage (numpy, buffer จองไว้ล่วงหน้า) กับ audioop.mul ที่
+discord.PCMVolumeTransformer ใช้ (ถ้ามี) งบเวลาจริงต่อเฟรมคือ 20ms
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_dsp import FRAME_BYTES, GainStage  # noqa: E402
+
+
+def bench(name, fn, frames, iterations):
+    start = time.perf_counter()
+    for i in range(iterations):
+        fn(frames[i % len(frames)])
+    elapsed = time.perf_counter() - start
+    per_frame_us = elapsed / iterations * 1e6
+    print(f"{name:<24} {per_frame_us:8.2f} µs/frame  ({per_frame_us / 20000 * 100:.3f}% of a 20ms frame)")
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(-32768, 32767, FRAME_BYTES // 2, dtype=np.int16).tobytes() for _ in range(64)]
+
+    stage = GainStage()
+    print(f"{iterations} frames of {FRAME_BYTES} bytes")
+    bench("GainStage gain=1.0", lambda f: stage.process(f, 1.0), frames, iterations)
+    bench("GainStage gain=0.5", lambda f: stage.process(f, 0.5), frames, iterations)
+    bench("GainStage gain=1.8", lambda f: stage.process(f, 1.8), frames, iterations)
+
+    try:
+        import audioop
+    except ImportError:
+        print("audioop not available, skipping comparison")
+        return
+    bench("audioop.mul gain=0.5", lambda f: audioop.mul(f, 2, 0.5), frames, iterations)
+
+
+if __name__ == '__main__':
+    main()
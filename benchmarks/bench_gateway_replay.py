@@ -0,0 +1,262 @@
+"""Benchmark บอทตัวจริงจาก bot.py ด้วย gateway และ REST API จำลองบนเครื่อง (ไม่ต้องมี network)
+
+    python benchmarks/bench_gateway_replay.py [--duration 10] [--messages 200] [--voice 20] [--joins 20]
+    python benchmarks/bench_gateway_replay.py --replay events.jsonl [--speed 2]
+
+ยิง MESSAGE_CREATE / VOICE_STATE_UPDATE / GUILD_MEMBER_ADD ที่อัตรา (ต่อวินาที) ที่กำหนด
+ผ่าน websocket เข้า discord.py ตามเส้นทางจริง (parse -> dispatch -> on_message ->
+process_commands -> check -> คำสั่ง -> REST) แล้วรายงาน event ต่อวินาที, percentile ของเวลา
+และเวลาที่บล็อก loop ของแต่ละ handler (จาก profiling.CallbackTimer), memory ที่เพิ่มขึ้น
+และ event loop lag ข้อความสังเคราะห์เป็นแชตทั่วไป 70% คำสั่ง 20% คำหยาบ 10%
+
+ไฟล์ --replay เป็น JSONL บรรทัดละ {"t": "MESSAGE_CREATE", "d": {...}, "at": วินาที}
+(at ไม่ใส่ = ส่งเร็วที่สุด) บรรทัด GUILD_CREATE ใช้เป็น guild ตั้งต้นแทน guild สังเคราะห์
+stub ทั้งสองรันใน thread แยกจึงไม่แย่งเวลา event loop ของบอท
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# ไฟล์ cache ของบอทไปไว้ที่ temp ไม่ให้ปนกับของจริง
+_tmp = tempfile.mkdtemp(prefix='bench-replay-')
+os.environ.setdefault('CHAT_CACHE_PATH', os.path.join(_tmp, 'chat_cache.sqlite3'))
+os.environ.setdefault('PROFANITY_PATH', os.path.join(_tmp, 'profanity.json'))
+
+import discord  # noqa: E402
+
+from gateway_stub import TEXT, VOICE, GatewayStub, make_guild, member_payload  # noqa: E402
+from rest_stub import RestStub  # noqa: E402
+
+GUILD_ID = 900000000000000000
+CHATTER = ('สวัสดีครับ', 'วันนี้เล่นเกมอะไรดี', 'lol', 'ok ไปกินข้าวก่อนนะ', 'https://youtu.be/dQw4w9WgXcQ',
+           'พรุ่งนี้ว่างไหม ไปดูหนังกัน', 'gg wp', 'ใครอยู่บ้าง')
+COMMANDS = ('!ping', '!help', '!myroles', '!serverstatus', '!channels', '!queue', '!nosuchcommand')
+PROFANE = ('kuy', 'ค ว ย', 'K.U.Y lol')
+
+
+class StubThread:
+    """event loop ใน thread แยกสำหรับ stub"""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name='stubs', daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def call(self, coro):
+        return asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self.loop))
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+def synthetic_events(args, guild, rng):
+    members = [member['user']['id'] for member in guild['members'][1:]]
+    text = [channel['id'] for channel in guild['channels'] if channel['type'] == TEXT]
+    bot_channel = next(channel['id'] for channel in guild['channels'] if channel['name'] == 'bot')
+    voice = [channel['id'] for channel in guild['channels'] if channel['type'] == VOICE]
+    ids = itertools.count(discord.utils.time_snowflake(discord.utils.utcnow()))
+    in_voice = set()
+    events = []
+
+    def spaced(rate):
+        count = int(rate * args.duration)
+        return [i / rate + rng.uniform(0, 1 / rate) for i in range(count)]
+
+    for at in spaced(args.messages):
+        author = rng.choice(members)
+        roll = rng.random()
+        if roll < 0.2:
+            content, channel = rng.choice(COMMANDS), bot_channel if rng.random() < 0.8 else rng.choice(text)
+        elif roll < 0.3:
+            content, channel = rng.choice(PROFANE), rng.choice(text)
+        else:
+            content, channel = rng.choice(CHATTER), rng.choice(text)
+        member = member_payload(int(author))
+        events.append((at, 'MESSAGE_CREATE', {
+            'id': str(next(ids)), 'channel_id': channel, 'guild_id': guild['id'],
+            'author': member.pop('user'), 'member': member, 'content': content,
+            'timestamp': discord.utils.utcnow().isoformat(), 'edited_timestamp': None, 'tts': False,
+            'mention_everyone': False, 'mentions': [], 'mention_roles': [], 'attachments': [],
+            'embeds': [], 'pinned': False, 'type': 0,
+        }))
+
+    for at in spaced(args.voice) if voice else ():
+        user = rng.choice(members)
+        channel = None if user in in_voice else rng.choice(voice)
+        (in_voice.discard if channel is None else in_voice.add)(user)
+        events.append((at, 'VOICE_STATE_UPDATE', {
+            'guild_id': guild['id'], 'channel_id': channel, 'user_id': user, 'member': member_payload(int(user)),
+            'session_id': 'stub', 'deaf': False, 'mute': False, 'self_deaf': False, 'self_mute': False,
+            'self_video': False, 'suppress': False, 'request_to_speak_timestamp': None,
+        }))
+
+    for i, at in enumerate(spaced(args.joins)):
+        events.append((at, 'GUILD_MEMBER_ADD', dict(member_payload(int(guild['id']) + 500000 + i),
+                                                    guild_id=guild['id'])))
+
+    events.sort(key=lambda event: event[0])
+    return events
+
+
+def recorded_events(path, speed):
+    guilds, events = [], []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record['t'] == 'GUILD_CREATE':
+                guilds.append(record['d'])
+            else:
+                events.append((record.get('at', 0) / speed, record['t'], record['d']))
+    events.sort(key=lambda event: event[0])
+    return guilds, events
+
+
+async def sample_lag(ring, interval=0.01):
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        ring.append((time.perf_counter() - start - interval) * 1000)
+
+
+async def drain(client, gateway, timeout=60):
+    """รอจนบอทรับครบทุก event และ handler ที่ dispatch ไปทำงานเสร็จหมด"""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        received = client.ws is not None and client.ws.sequence >= gateway.sequence
+        running = [task for task in asyncio.all_tasks() if task.get_name().startswith('discord.py: ')]
+        if received and not running:
+            return True
+        await asyncio.sleep(0.005)
+    return False
+
+
+def print_handlers(metrics):
+    print(f"\n{'handler':<54}{'count':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'block p95':>11}{'block max':>11}")
+    rows = sorted(metrics.callback_duration.children.items(), key=lambda item: -item[1].count)
+    for (kind, name), hist in rows:
+        wall = hist.snapshot()
+        blocking = metrics.callback_blocking.labels(kind, name)
+        worst = max(blocking.samples, default=0.0) * 1000
+        print(f"{kind + ':' + name:<54}{wall['count']:>7}{wall['p50_ms']:>9.1f}{wall['p95_ms']:>9.1f}"
+              f"{wall['p99_ms']:>9.1f}{blocking.percentile(0.95) * 1000:>11.2f}{worst:>11.2f}")
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    if args.replay:
+        guilds, events = recorded_events(args.replay, args.speed)
+    else:
+        guilds, events = [], []
+    if not guilds:
+        guilds = [make_guild(GUILD_ID, args.members)]
+    if not args.replay:
+        events = synthetic_events(args, guilds[0], rng)
+
+    # DM ที่ค้างอยู่ตอนปิดบอทจะถูกตัดกลางทาง ไม่ต้อง log ฝั่ง stub
+    logging.getLogger('aiohttp.server').setLevel(logging.CRITICAL)
+    limits = {} if args.rate_limits else {'route_limit': 10 ** 9, 'global_limit': 10 ** 9}
+    rest = RestStub(latency=args.rest_latency / 1000, **limits)
+    gateway = GatewayStub(guilds)
+    stubs = StubThread()
+    stubs.start()
+    await stubs.call(rest.start())
+    await stubs.call(gateway.start())
+    rest.install()
+    gateway.install()
+
+    import bot as bot_module  # noqa: E402  (import หลังตั้ง env และ stub แล้ว)
+    import metrics
+    from bot_stats import ProcessSampler
+    from net_monitor import RingBuffer
+
+    client = bot_module.bot
+    async with client:
+        await bot_module.load_cogs()
+        bot_task = asyncio.create_task(client.start('stub-token'))
+        await asyncio.wait_for(client.wait_until_ready(), 30)
+        await asyncio.sleep(1)  # ให้งานของ on_ready (ประกาศออนไลน์ ฯลฯ) จบก่อน
+        if bot_task.done():
+            bot_task.result()  # ต่อ gateway ไม่ได้ โยน error ของ discord.py ออกมาเลย
+
+        metrics.callback_duration.children.clear()
+        metrics.callback_blocking.children.clear()
+        bot_module.loop_watchdog.start()
+        lag = RingBuffer(100000)
+        lag_task = asyncio.create_task(sample_lag(lag))
+        process = ProcessSampler()
+        process.sample()
+        rss_before = process.latest['rss_mb']
+        blocks_before = sys.getallocatedblocks()
+        rest.reset_counters()
+
+        counts = {}
+        for _, event, _ in events:
+            counts[event] = counts.get(event, 0) + 1
+        print(f"replaying {len(events)} events ({', '.join(f'{n} {e}' for e, n in counts.items())}) "
+              f"into {len(guilds)} guild(s), REST RTT {args.rest_latency:.0f} ms")
+
+        start = time.perf_counter()
+        send_elapsed = await stubs.call(gateway.replay(events))
+        drained = await drain(client, gateway)
+        elapsed = time.perf_counter() - start
+        process.sample()
+        lag_task.cancel()
+
+        print(f"\nsent in {send_elapsed:.2f}s, all handlers done in {elapsed:.2f}s"
+              f"{'' if drained else ' (TIMED OUT waiting for handlers)'}")
+        print(f"throughput        {len(events) / elapsed:10.0f} events/s")
+        print(f"event loop lag    p50 {lag.percentile(0.5) or 0:.2f} ms  p99 {lag.percentile(0.99) or 0:.2f} ms  "
+              f"max {max(lag.values(), default=0):.2f} ms  stalls {bot_module.loop_watchdog.stalls}")
+        print(f"memory            RSS {rss_before} -> {process.latest['rss_mb']} MB  "
+              f"allocated blocks +{sys.getallocatedblocks() - blocks_before}")
+        print(f"REST calls        {rest.requests} ({', '.join(f'{n} {r}' for r, n in sorted(rest.calls.items()))})")
+        print_handlers(metrics)
+
+        # งาน delete_after ที่ยังรออยู่จะล้มเพราะ session ปิด ไม่ต้องแสดง
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: None)
+        bot_module.loop_watchdog.close()
+        bot_module.welcome.close()
+        await client.close()
+        await asyncio.gather(bot_task, return_exceptions=True)
+
+    await stubs.call(gateway.close())
+    await stubs.call(rest.close())
+    stubs.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--duration', type=float, default=10, help='วินาทีของ stream สังเคราะห์')
+    parser.add_argument('--messages', type=float, default=200, help='MESSAGE_CREATE ต่อวินาที')
+    parser.add_argument('--voice', type=float, default=20, help='VOICE_STATE_UPDATE ต่อวินาที')
+    parser.add_argument('--joins', type=float, default=20, help='GUILD_MEMBER_ADD ต่อวินาที')
+    parser.add_argument('--members', type=int, default=500, help='จำนวนสมาชิกใน guild สังเคราะห์')
+    parser.add_argument('--replay', help='ไฟล์ JSONL ของ event ที่บันทึกไว้')
+    parser.add_argument('--speed', type=float, default=1.0, help='เร่งเวลาของไฟล์ replay')
+    parser.add_argument('--rest-latency', type=float, default=20, help='RTT จำลองของ REST (ms)')
+    parser.add_argument('--rate-limits', action='store_true', help='เปิด rate limit แบบ Discord ใน REST stub')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    for name in ('messages', 'voice', 'joins'):
+        if getattr(args, name) <= 0:
+            setattr(args, name, 1e-9)  # 0 = ไม่ส่ง event ชนิดนี้
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
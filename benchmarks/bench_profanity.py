@@ -0,0 +1,92 @@
+"""Throughput benchmark ของตัวกรองคำหยาบ
+
+    python benchmarks/bench_profanity.py [corpus] [จำนวนคำในรายการ...]
+
+corpus คือไฟล์ข้อความที่บันทึกไว้ บรรทัดละหนึ่งข้อความ หรือ JSONL ที่มี field
+"content" (เช่น export จาก channel จริง) ถ้าไม่ระบุจะสร้างข้อความไทย/อังกฤษปนกันขึ้นมาเอง
+เทียบ ProfanityFilter (normalize + Aho-Corasick) กับการวน `term in text.lower()`
+ทีละคำแบบเดิม ที่จำนวนคำต่างๆ กัน
+"""
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from profanity import Automaton, normalize  # noqa: E402
+
+THAI = 'กขคงจฉชซญดตถทนบปผพฟมยรลวศสหอฮะาิีึืุูเแโใไ่้๊๋'
+LATIN = 'abcdefghijklmnopqrstuvwxyz'
+
+
+def load_corpus(path):
+    messages = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if not line:
+                continue
+            if line.startswith('{'):
+                try:
+                    line = json.loads(line).get('content', '')
+                except ValueError:
+                    pass
+            messages.append(line)
+    return messages
+
+
+def synthetic_corpus(count, rng):
+    messages = []
+    for _ in range(count):
+        words = []
+        for _ in range(rng.randint(1, 30)):
+            alphabet = THAI if rng.random() < 0.5 else LATIN
+            words.append(''.join(rng.choice(alphabet) for _ in range(rng.randint(2, 8))))
+        messages.append(' '.join(words))
+    return messages
+
+
+def make_terms(count, rng):
+    terms = ['kuy', 'ควย']
+    while len(terms) < count:
+        alphabet = THAI if rng.random() < 0.5 else LATIN
+        terms.append(''.join(rng.choice(alphabet) for _ in range(rng.randint(3, 7))))
+    return terms
+
+
+def bench(name, fn, messages, total_chars):
+    start = time.perf_counter()
+    hits = sum(1 for message in messages if fn(message))
+    elapsed = time.perf_counter() - start
+    print(f"{name:<32} {len(messages) / elapsed:>10.0f} msg/s  {total_chars / elapsed / 1e6:6.2f} Mchar/s  ({hits} hits)")
+
+
+def main():
+    rng = random.Random(0)
+    args = sys.argv[1:]
+    if args and not args[0].isdigit():
+        messages = load_corpus(args.pop(0))
+        print(f"corpus: {len(messages)} recorded messages")
+    else:
+        messages = synthetic_corpus(20000, rng)
+        print(f"corpus: {len(messages)} synthetic messages")
+    sizes = [int(arg) for arg in args] or [2, 100, 1000, 5000]
+    total_chars = sum(map(len, messages))
+
+    for size in sizes:
+        terms = make_terms(size, rng)
+        start = time.perf_counter()
+        automaton = Automaton(terms)
+        build_ms = (time.perf_counter() - start) * 1000
+        print(f"\n{size} terms (compile {build_ms:.1f} ms)")
+
+        bench("normalize + Aho-Corasick", lambda m: automaton.search(normalize(m)), messages, total_chars)
+        if size <= 1000:
+            lowered = [t.lower() for t in terms]
+            bench("naive `in` loop", lambda m: any(t in m.lower() for t in lowered), messages, total_chars)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""Gateway (websocket) ของ Discord แบบจำลองบนเครื่อง คู่กับ RestStub
+
+ตอบ HELLO/IDENTIFY/heartbeat ตามโปรโตคอลจริง ส่ง READY ตามด้วย GUILD_CREATE ของ guild
+จำลอง แล้วให้ replay() ยิง dispatch event (MESSAGE_CREATE ฯลฯ) ตามเวลาที่กำหนด
+ส่งเป็น text frame ซึ่ง discord.py รับได้แม้จะขอ zlib-stream
+
+    gateway = GatewayStub([make_guild(...)])
+    await gateway.start()
+    gateway.install()  # ให้ discord.py ต่อมาที่ stub แทน gateway.discord.gg
+"""
+import asyncio
+import json
+import time
+
+import discord
+import yarl
+from aiohttp import web
+
+from rest_stub import BOT_USER
+
+TEXT, VOICE = 0, 2
+
+
+def user_payload(user_id, name=None):
+    return {'id': str(user_id), 'username': name or f'user{user_id % 100000}', 'discriminator': '0',
+            'global_name': None, 'avatar': None}
+
+
+def member_payload(user_id, name=None, bot=False):
+    user = user_payload(user_id, name)
+    if bot:
+        user['bot'] = True
+    return {'user': user, 'roles': [], 'joined_at': '2024-01-01T00:00:00+00:00', 'deaf': False, 'mute': False,
+            'flags': 0}
+
+
+def make_guild(guild_id, members, text_channels=('bot', 'general', 'welcome', 'music-bot'), voice_channels=('General',)):
+    """GUILD_CREATE ของ guild จำลอง: บอท + สมาชิก members คน, ห้องข้อความ/เสียงตามชื่อที่ให้
+
+    id ของห้องคือ guild_id + ลำดับ (ห้องข้อความก่อน) id ของสมาชิกคือ guild_id + 1000 + ลำดับ
+    """
+    channels = []
+    for position, name in enumerate(text_channels + voice_channels):
+        channel = {'id': str(guild_id + 1 + position), 'name': name, 'position': position,
+                   'type': TEXT if position < len(text_channels) else VOICE, 'permission_overwrites': []}
+        if channel['type'] == VOICE:
+            channel.update(bitrate=64000, user_limit=0)
+        channels.append(channel)
+    everyone = {'id': str(guild_id), 'name': '@everyone', 'permissions': '8', 'position': 0, 'color': 0,
+                'hoist': False, 'managed': False, 'mentionable': False}
+    member_list = [member_payload(int(BOT_USER['id']), BOT_USER['username'], bot=True)]
+    member_list += [member_payload(guild_id + 1000 + i) for i in range(members)]
+    return {
+        'id': str(guild_id),
+        'name': f'guild-{guild_id}',
+        'owner_id': member_list[-1]['user']['id'],
+        'member_count': len(member_list),
+        'large': False,
+        'unavailable': False,
+        'channels': channels,
+        'roles': [everyone],
+        'members': member_list,
+        'voice_states': [],
+        'presences': [],
+        'emojis': [],
+        'stickers': [],
+        'features': [],
+        'threads': [],
+        'stage_instances': [],
+        'guild_scheduled_events': [],
+        'joined_at': '2024-01-01T00:00:00+00:00',
+    }
+
+
+class GatewayStub:
+    def __init__(self, guilds):
+        self.guilds = guilds
+        self.sequence = 0
+        self.sent = 0
+        self.heartbeats = 0
+        self._ws = None
+        self._runner = None
+        self.url = None
+
+    async def start(self, port=0):
+        app = web.Application()
+        app.router.add_get('/', self.handle_ws)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f'ws://127.0.0.1:{port}/'
+        return self.url
+
+    def install(self):
+        discord.gateway.DiscordWebSocket.DEFAULT_GATEWAY = yarl.URL(self.url)
+
+    async def close(self):
+        if self._ws is not None:
+            await self._ws.close()
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def _send(self, op, data, event=None):
+        payload = {'op': op, 'd': data, 's': None, 't': event}
+        if op == 0:
+            self.sequence += 1
+            payload['s'] = self.sequence
+        await self._ws.send_str(json.dumps(payload))
+
+    async def dispatch(self, event, data):
+        await self._send(0, data, event)
+        self.sent += 1
+
+    async def handle_ws(self, request):
+        ws = web.WebSocketResponse(max_msg_size=0)
+        await ws.prepare(request)
+        self._ws = ws
+        await self._send(10, {'heartbeat_interval': 41250})
+        async for msg in ws:
+            payload = json.loads(msg.data)
+            op = payload['op']
+            if op == 1:
+                self.heartbeats += 1
+                await self._send(11, None)
+            elif op == 2:
+                await self._send(0, {
+                    'v': 10,
+                    'user': BOT_USER,
+                    'guilds': [{'id': guild['id'], 'unavailable': True} for guild in self.guilds],
+                    'session_id': 'stub-session',
+                    'resume_gateway_url': self.url,
+                    'application': {'id': BOT_USER['id'], 'flags': 0},
+                }, 'READY')
+                for guild in self.guilds:
+                    await self._send(0, guild, 'GUILD_CREATE')
+        return ws
+
+    async def replay(self, events):
+        """ส่ง [(วินาทีนับจากเริ่ม, ชื่อ event, data)] ตามเวลา (เวลา 0 ทั้งหมด = เร็วที่สุดที่ส่งได้)"""
+        start = time.perf_counter()
+        for at, event, data in events:
+            delay = start + at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await self.dispatch(event, data)
+        return time.perf_counter() - start
@@ -0,0 +1,205 @@
+"""REST API ของ Discord แบบจำลองบนเครื่อง สำหรับ benchmark ที่ไม่มี network
+
+จำลองเฉพาะส่วนที่บอทเรียกบ่อย (ส่ง/ลบข้อความ, ผู้ใช้ปัจจุบัน, DM) พร้อม rate limit
+แบบ Discord: bucket ต่อห้อง (header X-RateLimit-*) และ global limit ต่อวินาที ตอบ 429
+พร้อม retry_after เหมือนของจริง latency จำลอง RTT ไปยัง discord.com
+
+    stub = RestStub(latency=0.1)
+    await stub.start()
+    stub.install()  # ให้ discord.py ยิง request มาที่ stub แทน
+"""
+import asyncio
+import itertools
+import json
+import re
+import time
+
+import discord
+from aiohttp import web
+
+BOT_USER = {
+    'id': '100000000000000001',
+    'username': 'stub-bot',
+    'discriminator': '0',
+    'global_name': None,
+    'avatar': None,
+    'bot': True,
+}
+
+APPLICATION = {
+    'id': BOT_USER['id'],
+    'name': 'stub-bot',
+    'icon': None,
+    'description': '',
+    'bot_public': True,
+    'bot_require_code_grant': False,
+    'verify_key': '',
+    'owner': dict(BOT_USER, id='100000000000000002', username='owner', bot=False),
+}
+
+
+def _json(data, status=200, headers=None):
+    # discord.py เทียบ content-type ตรงตัว ('application/json' ไม่มี charset เหมือน Discord จริง)
+    headers = dict(headers or {}, **{'Content-Type': 'application/json'})
+    return web.Response(body=json.dumps(data).encode(), status=status, headers=headers)
+
+
+class RestStub:
+    def __init__(self, latency=0.05, route_limit=5, route_window=5.0, global_limit=50):
+        self.latency = latency
+        self.route_limit = route_limit
+        self.route_window = route_window
+        self.global_limit = global_limit
+        self.requests = 0
+        self.route_429 = 0
+        self.global_429 = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = {}  # "METHOD route" -> จำนวน
+        self.forbidden = set()  # channel id ที่ตอบ 403 (บอทไม่มีสิทธิ์ส่ง)
+        self._buckets = {}  # channel id -> (เริ่ม window, จำนวนที่ใช้ไป)
+        self._global = (0, 0)  # (วินาที, จำนวนในวินาทีนั้น)
+        self._ids = itertools.count(200000000000000000)
+        self._runner = None
+        self.url = None
+
+    def reset_counters(self):
+        self.requests = self.route_429 = self.global_429 = self.max_in_flight = 0
+        self.calls = {}
+        self._buckets = {}
+
+    async def start(self, port=0):
+        app = web.Application()
+        app.router.add_get('/api/v10/users/@me', self.handle_me)
+        app.router.add_get('/api/v10/oauth2/applications/@me', self.handle_application)
+        app.router.add_post('/api/v10/users/@me/channels', self.handle_dm_channel)
+        app.router.add_post('/api/v10/channels/{channel_id}/messages', self.handle_send)
+        app.router.add_patch('/api/v10/channels/{channel_id}/messages/{message_id}', self.handle_edit)
+        app.router.add_route('*', '/api/v10/{tail:.*}', self.handle_other)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f'http://127.0.0.1:{port}/api/v10'
+        return self.url
+
+    def install(self):
+        discord.http.Route.BASE = self.url
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def _enter(self, request, route):
+        self.requests += 1
+        self.calls[route] = self.calls.get(route, 0) + 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+
+    def _global_limited(self):
+        second = int(time.monotonic())
+        start, used = self._global
+        if start != second:
+            start, used = second, 0
+        used += 1
+        self._global = (start, used)
+        if used > self.global_limit:
+            self.global_429 += 1
+            retry_after = round(1 - (time.monotonic() - second), 3)
+            return _json(
+                {'message': 'You are being rate limited.', 'retry_after': retry_after, 'global': True},
+                status=429,
+                headers={'Retry-After': str(retry_after), 'X-RateLimit-Global': 'true', 'X-RateLimit-Scope': 'global'},
+            )
+        return None
+
+    def _route_headers(self, channel_id):
+        now = time.monotonic()
+        start, used = self._buckets.get(channel_id, (now, 0))
+        if now - start >= self.route_window:
+            start, used = now, 0
+        used += 1
+        self._buckets[channel_id] = (start, used)
+        reset_after = round(self.route_window - (now - start), 3)
+        headers = {
+            'X-RateLimit-Limit': str(self.route_limit),
+            'X-RateLimit-Remaining': str(max(0, self.route_limit - used)),
+            'X-RateLimit-Reset': str(time.time() + reset_after),
+            'X-RateLimit-Reset-After': str(reset_after),
+            'X-RateLimit-Bucket': 'stub-messages',
+        }
+        return headers, used > self.route_limit, reset_after
+
+    def message(self, channel_id, content):
+        return {
+            'id': str(next(self._ids)),
+            'channel_id': str(channel_id),
+            'author': BOT_USER,
+            'content': content or '',
+            'timestamp': discord.utils.utcnow().isoformat(),
+            'edited_timestamp': None,
+            'tts': False,
+            'mention_everyone': False,
+            'mentions': [],
+            'mention_roles': [],
+            'attachments': [],
+            'embeds': [],
+            'pinned': False,
+            'type': 0,
+        }
+
+    async def handle_me(self, request):
+        await self._enter(request, 'GET /users/@me')
+        return _json(BOT_USER)
+
+    async def handle_application(self, request):
+        await self._enter(request, 'GET /oauth2/applications/@me')
+        return _json(APPLICATION)
+
+    async def handle_dm_channel(self, request):
+        await self._enter(request, 'POST /users/@me/channels')
+        payload = await request.json()
+        return _json({
+            'id': str(next(self._ids)),
+            'type': 1,
+            'last_message_id': None,
+            'recipients': [{'id': payload['recipient_id'], 'username': 'member', 'discriminator': '0', 'avatar': None}],
+        })
+
+    async def handle_send(self, request):
+        channel_id = request.match_info['channel_id']
+        await self._enter(request, 'POST /channels/{id}/messages')
+        limited = self._global_limited()
+        if limited is not None:
+            return limited
+        if channel_id in self.forbidden:
+            return _json({'message': 'Missing Access', 'code': 50001}, status=403)
+        headers, over, reset_after = self._route_headers(channel_id)
+        if over:
+            self.route_429 += 1
+            headers.update({'Retry-After': str(reset_after), 'X-RateLimit-Scope': 'user'})
+            return _json({'message': 'You are being rate limited.', 'retry_after': reset_after, 'global': False},
+                         status=429, headers=headers)
+        if request.content_type == 'application/json':
+            payload = await request.json()
+        else:
+            payload = {}
+        return _json(self.message(channel_id, payload.get('content')), headers=headers)
+
+    async def handle_edit(self, request):
+        channel_id = request.match_info['channel_id']
+        await self._enter(request, 'PATCH /channels/{id}/messages/{id}')
+        payload = await request.json()
+        message = self.message(channel_id, payload.get('content'))
+        message['id'] = request.match_info['message_id']
+        return _json(message)
+
+    async def handle_other(self, request):
+        route = re.sub(r'\d{15,}', '{id}', request.match_info['tail'])
+        await self._enter(request, f'{request.method} /{route}')
+        return web.Response(status=204)
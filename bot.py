@@ -1,3 +1,4 @@
+import math
 import time
 import discord
 from discord.ext import commands
@@ -5,11 +6,27 @@ import logging
 from dotenv import load_dotenv
 import os
 import asyncio
-import socket
-import aiohttp
-import requests
+import contextlib
+import hmac
+import io
 from aiohttp import web
 import threading
+from llm_client import LLMClient, LLMError, DEFAULT_MODEL
+from llm_cache import ResponseCache, make_key
+from llm_scheduler import FairScheduler, SchedulerBusy
+from chat_memory import ConversationStore
+import extractor
+import metrics
+import playback
+from chat_stream import StreamingReply
+from profanity import ProfanityFilter
+from channel_policy import ChannelPolicy, load_overrides
+from bot_stats import BotStats, ProcessSampler
+from net_monitor import ConnectionMonitor
+from voice_idle import IdleVoiceScheduler
+from broadcast import Broadcaster
+from welcome import WelcomePipeline
+from profiling import CallbackTimer, LoopWatchdog, ProfilerBusy, SamplingProfiler
 
 load_dotenv()
 token = os.getenv('DISCORD_TOKEN')
@@ -19,17 +36,169 @@ intents = discord.Intents.default()
 intents.message_content = True
 intents.members = True
 
-bot = commands.Bot(command_prefix='!', intents=intents, help_command=None)
+# จับเวลาทุกคำสั่งและ event handler และแจ้งเตือนเมื่อมีอะไรบล็อก event loop นานเกิน SLOW_CALLBACK_MS
+callback_timer = CallbackTimer()
+loop_watchdog = LoopWatchdog(callback_timer, threshold=float(os.getenv('SLOW_CALLBACK_MS', 250)) / 1000)
+sampling_profiler = SamplingProfiler(max_seconds=float(os.getenv('PROFILER_MAX_SECONDS', 60)))
+# token สำหรับ /debug/profile (ไม่ตั้ง = ปิด route นี้)
+PROFILER_TOKEN = os.getenv('PROFILER_TOKEN')
+
+class MetricsBot(commands.Bot):
+    """Bot ที่นับจำนวน event ทุกตัวที่ dispatch (แค่เพิ่มค่าใน dict ไม่สร้าง task เพิ่ม)
+    และจับเวลา handler ของคำสั่ง/event ทุกตัวผ่าน callback_timer
+    """
+
+    def dispatch(self, event_name, /, *args, **kwargs):
+        metrics.events.inc(event_name)
+        super().dispatch(event_name, *args, **kwargs)
+
+    async def _run_event(self, coro, event_name, *args, **kwargs):
+        # ทุก handler ที่ dispatch สร้าง task ผ่านเมธอดนี้ (รวม listener จาก add_listener/cog)
+        # แยกตาม listener ด้วย เพราะ event เดียวอาจมีหลายตัวฟังอยู่ (เช่น bot กับ bot_stats)
+        name = f'{event_name}:{getattr(coro, "__qualname__", coro)}'
+        await callback_timer.track('event', name, super()._run_event(coro, event_name, *args, **kwargs))
+
+    async def invoke(self, ctx, /):
+        if ctx.command is None:
+            return await super().invoke(ctx)
+        # รวม check/cooldown/before_invoke/after_invoke ด้วย เพราะทั้งหมดรันใน loop เดียวกัน
+        await callback_timer.track('command', ctx.command.qualified_name, super().invoke(ctx))
+
+
+bot = MetricsBot(command_prefix='!', intents=intents, help_command=None)
+
+# ตัวนับสถิติที่อัปเดตจาก event และค่าของ process ที่สุ่มเก็บเป็นระยะ
+bot_stats = BotStats()
+bot_stats.attach(bot)
+process_sampler = ProcessSampler(interval=float(os.getenv('PROCESS_SAMPLE_INTERVAL', 15)))
+# วัดคุณภาพการเชื่อมต่อเป็นระยะ !ping, !nettest และหน้าสถานะอ่านจากประวัตินี้
+net_monitor = ConnectionMonitor(bot, interval=float(os.getenv('NET_MONITOR_INTERVAL', 30)))
+
+
+def format_history(summary):
+    if summary is None:
+        return "⏳ ยังไม่มีข้อมูล"
+    return f"p50 `{summary['p50']:.0f}ms` p95 `{summary['p95']:.0f}ms`\n`{summary['spark']}`"
 
 ALLOWED_CHANNELS = ['bot', 'test_bot']
+# ตั้งห้องเฉพาะ guild ได้ในไฟล์ CHANNEL_POLICY_PATH (section "bot")
+CHANNEL_POLICY_PATH = os.getenv('CHANNEL_POLICY_PATH', 'channel_policy.json')
+channel_policy = ChannelPolicy(ALLOWED_CHANNELS, load_overrides(CHANNEL_POLICY_PATH, 'bot'))
+
+# ส่งข้อความหลายห้องพร้อมกันแบบจำกัดจำนวน/ความเร็ว (ต่ำกว่า global rate limit ของ Discord)
+broadcaster = Broadcaster(
+    concurrency=int(os.getenv('BROADCAST_CONCURRENCY', 8)),
+    rate=float(os.getenv('BROADCAST_RATE', 40)),
+)
+
+# ห้องต้อนรับ (ตั้งเฉพาะ guild ได้ใน section "welcome") และการรวมข้อความต้อนรับช่วงที่คนเข้าพร้อมกันเยอะ
+welcome_channels = ChannelPolicy(['welcome'], load_overrides(CHANNEL_POLICY_PATH, 'welcome'))
+welcome = WelcomePipeline(
+    welcome_channels,
+    window=float(os.getenv('WELCOME_BATCH_WINDOW', 2)),
+    dm_queue=int(os.getenv('WELCOME_DM_QUEUE', 100)),
+    dm_rate=float(os.getenv('WELCOME_DM_RATE', 2)),
+)
+
+llm_client = LLMClient(
+    DEEPINFRA_API_KEY,
+    max_concurrency=int(os.getenv('LLM_MAX_CONCURRENCY', 8)),
+    timeout=float(os.getenv('LLM_TIMEOUT', 60)),
+    max_retries=int(os.getenv('LLM_MAX_RETRIES', 3)),
+)
+llm_scheduler = FairScheduler(
+    max_concurrency=int(os.getenv('LLM_MAX_CONCURRENCY', 8)),
+    max_queue=int(os.getenv('LLM_MAX_QUEUE', 32)),
+    max_per_user=int(os.getenv('LLM_MAX_PER_USER', 2)),
+)
+CHAT_PARAMS = {"model": DEFAULT_MODEL, "max_tokens": 200, "temperature": 0.7}
+chat_cache = ResponseCache(
+    path=os.getenv('CHAT_CACHE_PATH', 'chat_cache.sqlite3'),
+    max_entries=int(os.getenv('CHAT_CACHE_ENTRIES', 2000)),
+    max_bytes=int(os.getenv('CHAT_CACHE_BYTES', 8 * 1024 * 1024)),
+    ttl=float(os.getenv('CHAT_CACHE_TTL', 24 * 3600)),
+)
+chat_memory = ConversationStore(
+    window_tokens=int(os.getenv('CHAT_CONTEXT_TOKENS', 600)),
+    summary_tokens=int(os.getenv('CHAT_SUMMARY_TOKENS', 200)),
+)
+# แสดงคำตอบ AI ทีละส่วนระหว่างที่ได้รับ (ปิดได้ด้วย CHAT_STREAMING=0)
+CHAT_STREAMING = os.getenv('CHAT_STREAMING', '1') != '0'
+
+# รายการคำหยาบต่อ guild (ไฟล์ JSON โหลดใหม่อัตโนมัติเมื่อแก้ไข)
+profanity_filter = ProfanityFilter(
+    path=os.getenv('PROFANITY_PATH', 'profanity.json'),
+    reload_interval=float(os.getenv('PROFANITY_RELOAD_INTERVAL', 30)),
+)
+
+
+async def disconnect_idle(guild_id):
+    guild = bot.get_guild(guild_id)
+    voice_client = guild.voice_client if guild else None
+    if voice_client and voice_client.is_connected():
+        await voice_client.disconnect()
+
+
+# ออกจากห้อง voice เมื่อไม่มีคนอยู่ครบ VOICE_IDLE_GRACE วินาที
+voice_idle = IdleVoiceScheduler(disconnect_idle, grace=float(os.getenv('VOICE_IDLE_GRACE', 5)))
+
+
+def music_queue_depth():
+    cog = bot.get_cog('Music')
+    return sum(len(queue) for queue in cog.queues.values()) if cog else 0
+
+
+# metrics ที่อ่านจากค่าที่มีอยู่แล้ว (คำนวณตอน scrape /metrics เท่านั้น)
+metrics.Gauge('bot_gateway_latency_seconds', 'Discord gateway heartbeat latency',
+              fn=lambda: None if math.isnan(bot.latency) else bot.latency)
+metrics.Gauge('bot_guilds', 'Guilds the bot is in', fn=lambda: bot_stats.guilds)
+metrics.Gauge('bot_voice_sessions', 'Connected voice clients', fn=lambda: len(bot.voice_clients))
+metrics.Gauge('bot_music_queue_depth', 'Tracks waiting in all music queues', fn=music_queue_depth)
+metrics.Counter('bot_playback_sources_total', 'Audio sources created by path', ('path',), fn=lambda: playback.stats)
+metrics.Gauge('bot_broadcast_pending', 'Broadcast deliveries not finished yet', fn=lambda: broadcaster.pending)
+metrics.Gauge('bot_llm_in_flight', 'LLM requests currently in flight', fn=lambda: llm_client.in_flight)
+metrics.Gauge('bot_llm_queue_waiting', 'Chat requests waiting for an LLM slot', fn=lambda: llm_scheduler.waiting)
+metrics.Gauge('bot_process_resident_memory_megabytes', 'Resident memory of the bot process',
+              fn=lambda: process_sampler.latest.get('rss_mb'))
+
+
+@bot.listen()
+async def on_command(ctx):
+    ctx.metrics_started = time.perf_counter()
+
+
+@bot.listen()
+async def on_command_completion(ctx):
+    name = ctx.command.qualified_name
+    metrics.commands.inc(name, 'ok')
+    metrics.command_latency.observe(time.perf_counter() - ctx.metrics_started, name)
+
+
+@bot.listen('on_command_error')
+async def record_command_error(ctx, error):
+    if ctx.command is None:
+        metrics.commands.inc('unknown', 'not_found')
+        return
+    status = 'rejected' if isinstance(error, commands.CheckFailure) else 'error'
+    metrics.commands.inc(ctx.command.qualified_name, status)
 
 # HTTP Server สำหรับ Render
 async def handle_root(request):
     """แสดงสถานะบอท"""
     bot_status = "🟢 Online" if bot.is_ready() else "🔴 Offline"
-    guild_count = len(bot.guilds) if bot.guilds else 0
-    user_count = len(bot.users) if bot.users else 0
-    
+    stats = bot_stats.snapshot()
+    uptime = int(stats['uptime'])
+
+    network_rows = ""
+    for name, label in (('gateway', 'Gateway'), ('rest', 'REST API'), ('dns', 'DNS'), ('loop_lag', 'Loop Lag')):
+        summary = net_monitor.summary(name)
+        value = f"{summary['p50']:.0f} / {summary['p95']:.0f}ms <code>{summary['spark']}</code>" if summary else "-"
+        network_rows += f"""
+                <div class="stat">
+                    <span>{label} (p50 / p95):</span>
+                    <span>{value}</span>
+                </div>"""
+
     html = f"""
     <html>
     <head>
@@ -54,19 +223,20 @@ async def handle_root(request):
                 </div>
                 <div class="stat">
                     <span>Servers:</span>
-                    <span>{guild_count}</span>
+                    <span>{stats['guilds']}</span>
                 </div>
                 <div class="stat">
                     <span>Users:</span>
-                    <span>{user_count}</span>
+                    <span>{stats['users']}</span>
                 </div>
                 <div class="stat">
                     <span>Latency:</span>
                     <span>{round(bot.latency * 1000)}ms</span>
                 </div>
+                {network_rows}
                 <div class="stat">
                     <span>Uptime:</span>
-                    <span>{time.strftime('%Y-%m-%d %H:%M:%S')}</span>
+                    <span>{uptime // 86400}d {uptime % 86400 // 3600}h {uptime % 3600 // 60}m</span>
                 </div>
             </div>
             <p>✅ Bot is running and ready to serve!</p>
@@ -81,15 +251,58 @@ async def handle_health(request):
     return web.json_response({
         'status': 'healthy',
         'bot_ready': bot.is_ready(),
-        'guild_count': len(bot.guilds) if bot.guilds else 0,
-        'latency': round(bot.latency * 1000) if bot.latency else 0
+        'guild_count': bot_stats.guilds,
+        'latency': round(bot.latency * 1000) if bot.latency else 0,
+        'stats': bot_stats.snapshot(),
+        'network': net_monitor.snapshot(),
+        'process': process_sampler.latest,
+        'chat_cache': chat_cache.stats(),
+        'chat_queue': llm_scheduler.stats(),
+        'ytdl_cache': extractor.cache.stats(),
+        'ytdl_pool': extractor.pool.stats(),
+        'playback': playback.stats,
+        'source_pool': playback.source_pool.stats(),
+        'voice_idle': voice_idle.stats(),
+        'profanity': profanity_filter.stats(),
+        'broadcasts': broadcaster.stats(),
+        'welcome': welcome.stats(),
+        'voice_workers': playback.voice_workers.stats() if playback.voice_workers else None,
+        'slow_callbacks': loop_watchdog.stats(),
+        'callbacks': callback_timer.top(),
+        'ttfa': {trigger: hist.snapshot() for (trigger,), hist in metrics.ttfa.children.items()},
+        'audio_cache': playback.audio_cache.stats() if playback.audio_cache else None
     })
 
+async def handle_metrics(request):
+    """Prometheus metrics"""
+    return web.Response(text=metrics.render(), content_type='text/plain', charset='utf-8',
+                        headers={'X-Content-Type-Options': 'nosniff'})
+
+async def handle_profile(request):
+    """รัน sampling profiler ?seconds=N วินาที แล้วคืน collapsed stack (ต้องส่ง Authorization: Bearer <PROFILER_TOKEN>)"""
+    if not PROFILER_TOKEN:
+        raise web.HTTPNotFound()
+    given = request.headers.get('Authorization', '').encode()
+    if not hmac.compare_digest(given, f'Bearer {PROFILER_TOKEN}'.encode()):
+        raise web.HTTPUnauthorized()
+    try:
+        seconds = float(request.query.get('seconds', 10))
+    except ValueError:
+        raise web.HTTPBadRequest(text='seconds must be a number')
+    try:
+        collapsed = await sampling_profiler.profile(seconds)
+    except ProfilerBusy:
+        raise web.HTTPConflict(text='profiler is already running')
+    return web.Response(text=collapsed, content_type='text/plain', charset='utf-8',
+                        headers={'Content-Disposition': 'attachment; filename="profile.folded"'})
+
 async def start_web_server():
     """เริ่มต้น HTTP server"""
     app = web.Application()
     app.router.add_get('/', handle_root)
     app.router.add_get('/health', handle_health)
+    app.router.add_get('/metrics', handle_metrics)
+    app.router.add_get('/debug/profile', handle_profile)
     
     # ใช้พอร์ตจาก environment variable หรือใช้ 10000 เป็นค่าเริ่มต้น
     port = int(os.environ.get('PORT', 10000))
@@ -103,6 +316,7 @@ async def start_web_server():
     print(f"🌐 HTTP server started on port {port}")
     print(f"📊 Status page: http://localhost:{port}/")
     print(f"🏥 Health check: http://localhost:{port}/health")
+    print(f"📈 Metrics: http://localhost:{port}/metrics")
 
 def is_allowed_channel():
     """ตรวจสอบว่าเป็นห้องที่อนุญาตหรือไม่"""
@@ -111,32 +325,59 @@ def is_allowed_channel():
             await ctx.send("❌ คำสั่งนี้ใช้ได้เฉพาะในเซิร์ฟเวอร์เท่านั้น")
             return False
         
-        if ctx.channel.name.lower() not in [ch.lower() for ch in ALLOWED_CHANNELS]:
-            allowed_channels_str = ", ".join([f"#{ch}" for ch in ALLOWED_CHANNELS])
-            await ctx.send(f"❌ คำสั่งนี้ใช้ได้เฉพาะในห้อง: {allowed_channels_str}")
+        if not channel_policy.allows(ctx.channel):
+            await ctx.send(f"❌ คำสั่งนี้ใช้ได้เฉพาะในห้อง: {channel_policy.describe(ctx.guild.id)}")
             return False
         
         return True
     return commands.check(predicate)
 
+def announcement_channel(guild):
+    """ห้องแรกตามลำดับใน channel policy ที่มีอยู่จริงใน guild"""
+    for channel_name in channel_policy.names_for(guild.id):
+        channel = discord.utils.get(guild.text_channels, name=channel_name)
+        if channel:
+            return channel
+    return None
+
 @bot.event
 async def on_ready():
     print(f'Logged in as {bot.user.name} - {bot.user.id}')
     print('------')
-    
-    for guild in bot.guilds:
-        for channel_name in ALLOWED_CHANNELS:
-            channel = discord.utils.get(guild.text_channels, name=channel_name)
-            if channel:
-                await channel.send("✅ Bot is now online!")
-                break 
+    channel_policy.reset()
+    welcome_channels.reset()
+
+    # on_ready เกิดซ้ำทุกครั้งที่ reconnect guild ที่ประกาศไปแล้วจะถูกข้าม
+    await broadcaster.run('online', filter(None, map(announcement_channel, bot.guilds)),
+                          lambda channel: channel.send("✅ Bot is now online!"),
+                          key=lambda channel: channel.guild.id)
+
+@bot.event
+async def on_guild_channel_create(channel):
+    channel_policy.channel_created(channel)
+    welcome_channels.channel_created(channel)
+
+@bot.event
+async def on_guild_channel_update(before, after):
+    channel_policy.channel_updated(before, after)
+    welcome_channels.channel_updated(before, after)
+
+@bot.event
+async def on_guild_channel_delete(channel):
+    channel_policy.channel_deleted(channel)
+    welcome_channels.channel_deleted(channel)
+
+@bot.event
+async def on_guild_remove(guild):
+    channel_policy.forget(guild.id)
+    welcome_channels.forget(guild.id)
 
 @bot.event
 async def on_message(message):
     if message.author == bot.user:
         return
     
-    if "kuy" in message.content.lower():
+    if profanity_filter.check(message.guild.id if message.guild else None, message.content):
         try:
             await message.delete()
             await message.channel.send(f"{message.author.mention} - don't say harsh words.", delete_after=5)
@@ -149,14 +390,7 @@ async def on_message(message):
 
 @bot.event
 async def on_member_join(member):
-    try:
-        await member.send(f"Welcome to the server {member.guild}!")
-    except discord.errors.Forbidden:
-        pass
-    
-    channel = discord.utils.get(member.guild.text_channels, name='welcome')
-    if channel:
-        await channel.send(f"ยินดีต้อนรับ {member.mention} เข้าสู่เซิร์ฟเวอร์! ของโอย่า")
+    welcome.member_joined(member)
 
 @bot.event
 async def on_command_error(ctx, error):
@@ -164,7 +398,7 @@ async def on_command_error(ctx, error):
     if isinstance(error, commands.CheckFailure):
         return
     elif isinstance(error, commands.CommandNotFound):
-        if ctx.guild and ctx.channel.name.lower() in [ch.lower() for ch in ALLOWED_CHANNELS]:
+        if channel_policy.allows(ctx.channel):
             await ctx.send("❌ Command not found.", delete_after=5)
     elif isinstance(error, commands.MissingRequiredArgument):
         await ctx.send("❌ Missing required argument.", delete_after=5)
@@ -179,17 +413,21 @@ async def on_command_error(ctx, error):
 @bot.event
 async def on_voice_state_update(member, before, after):
     """จัดการเมื่อมีการเปลี่ยนแปลงใน voice channel"""
+    guild_id = member.guild.id
     if member == bot.user:
+        voice_idle.bot_moved(guild_id, after.channel)
         return
-    
+    if member.bot:
+        return
+
     voice_client = member.guild.voice_client
     if voice_client and voice_client.channel:
-        members_in_channel = [m for m in voice_client.channel.members if not m.bot]
-        if len(members_in_channel) == 0:
-            await asyncio.sleep(5)
-            members_in_channel = [m for m in voice_client.channel.members if not m.bot]
-            if len(members_in_channel) == 0:
-                await voice_client.disconnect()
+        voice_idle.member_moved(
+            guild_id,
+            voice_client.channel.id,
+            before.channel.id if before.channel else None,
+            after.channel.id if after.channel else None,
+        )
 
 # ============ คำสั่งต่างๆ ที่จำกัดห้อง ============
 
@@ -197,47 +435,34 @@ async def on_voice_state_update(member, before, after):
 @is_allowed_channel()
 @commands.cooldown(1, 10, commands.BucketType.guild)
 async def nettest(ctx):
-    """ทดสอบการเชื่อมต่อเครือข่าย"""
+    """ทดสอบการเชื่อมต่อเครือข่าย (จากประวัติที่ connection monitor วัดไว้)"""
     embed = discord.Embed(title="🌐 Network Diagnostic", color=0x0099ff)
-    
-    start_time = time.time()
-    try:
-        socket.gethostbyname('discord.com')
-        dns_time = round((time.time() - start_time) * 1000)
-        embed.add_field(name="🔍 DNS Resolution", value=f"✅ {dns_time}ms", inline=True)
-    except Exception as e:
-        embed.add_field(name="🔍 DNS Resolution", value="❌ Failed", inline=True)
-        dns_time = 999
-    
-    start_time = time.time()
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get('https://discord.com/api/v10/gateway') as resp:
-                if resp.status == 200:
-                    http_time = round((time.time() - start_time) * 1000)
-                    embed.add_field(name="🌐 HTTP Connection", value=f"✅ {http_time}ms", inline=True)
-                else:
-                    embed.add_field(name="🌐 HTTP Connection", value=f"❌ Status: {resp.status}", inline=True)
-                    http_time = 999
-    except Exception as e:
-        embed.add_field(name="🌐 HTTP Connection", value="❌ Failed", inline=True)
-        http_time = 999
-    
-    ws_latency = round(bot.latency * 1000)
-    embed.add_field(name="📡 WebSocket", value=f"{ws_latency}ms", inline=True)
-    
+
+    fields = (
+        ('dns', "🔍 DNS Resolution"),
+        ('rest', "🌐 HTTP Connection"),
+        ('gateway', "📡 WebSocket"),
+        ('loop_lag', "⏱️ Event Loop Lag"),
+    )
+    for name, title in fields:
+        embed.add_field(name=title, value=format_history(net_monitor.summary(name)), inline=True)
+
+    dns = net_monitor.summary('dns')
+    rest = net_monitor.summary('rest')
+    gateway = net_monitor.summary('gateway')
     suggestions = []
-    if dns_time > 100:
+    if dns and dns['p50'] > 100:
         suggestions.append("• เปลี่ยน DNS เป็น 1.1.1.1")
-    if http_time > 200:
+    if rest and rest['p50'] > 200:
         suggestions.append("• ตรวจสอบ Firewall/Antivirus")
-    if ws_latency > 200:
+    if gateway and gateway['p50'] > 200:
         suggestions.append("• ปิดโปรแกรมที่ใช้เน็ตมาก")
         suggestions.append("• ตรวจสอบ VPN/Proxy")
-    
+
     if suggestions:
         embed.add_field(name="💡 Suggestions", value="\n".join(suggestions), inline=False)
-    
+
+    embed.set_footer(text=f"วัดทุก {net_monitor.interval:.0f} วินาที")
     embed.timestamp = discord.utils.utcnow()
     await ctx.send(embed=embed)
 
@@ -245,43 +470,50 @@ async def nettest(ctx):
 @is_allowed_channel()
 @commands.cooldown(1, 30, commands.BucketType.guild)
 async def speedtest(ctx):
-    """ทดสอบความเร็วการตอบสนองคำสั่ง"""
-    results = []
-    
-    message = await ctx.send("🔄 Testing command response speed...")
-    
-    for i in range(5):
-        start_time = time.time()
-        await asyncio.sleep(0.1)
-        end_time = time.time()
-        response_time = round((end_time - start_time) * 1000)
-        results.append(response_time)
-        
-        await message.edit(content=f"🔄 Testing... {i+1}/5")
-        await asyncio.sleep(0.5)
-    
-    avg_time = sum(results) / len(results)
-    min_time = min(results)
-    max_time = max(results)
-    
+    """ทดสอบความเร็วการตอบสนองคำสั่ง (event loop lag และ REST API จากประวัติ)"""
+    lag = net_monitor.summary('loop_lag')
+    rest = net_monitor.summary('rest')
+    if lag is None:
+        await ctx.send("⏳ ยังไม่มีข้อมูลการวัด ลองใหม่อีกครั้งในภายหลัง")
+        return
+
     embed = discord.Embed(title="⚡ Speed Test Results", color=0x00ff88)
-    embed.add_field(name="📊 Average", value=f"{avg_time:.1f}ms", inline=True)
-    embed.add_field(name="🟢 Best", value=f"{min_time}ms", inline=True)
-    embed.add_field(name="🔴 Worst", value=f"{max_time}ms", inline=True)
-    
-    if avg_time < 50:
+    embed.add_field(name="📊 Loop Lag (p50)", value=f"{lag['p50']:.1f}ms", inline=True)
+    embed.add_field(name="🔴 Loop Lag (p95)", value=f"{lag['p95']:.1f}ms", inline=True)
+    embed.add_field(name="🌐 REST API (p50)", value=f"{rest['p50']:.0f}ms" if rest else "N/A", inline=True)
+
+    response = lag['p95'] + (rest['p50'] if rest else 0)
+    if response < 50:
         rating = "🟢 Excellent"
-    elif avg_time < 100:
+    elif response < 100:
         rating = "🟡 Good"
-    elif avg_time < 200:
+    elif response < 200:
         rating = "🟠 Fair"
     else:
         rating = "🔴 Poor"
-    
+
     embed.add_field(name="📈 Rating", value=rating, inline=False)
-    embed.add_field(name="📋 Raw Results", value=" | ".join([f"{r}ms" for r in results]), inline=False)
-    
-    await message.edit(content="", embed=embed)
+    embed.add_field(name="📋 History", value=f"`{lag['spark']}`", inline=False)
+
+    await ctx.send(embed=embed)
+
+@bot.command()
+@is_allowed_channel()
+@commands.has_permissions(administrator=True)
+@commands.cooldown(1, 30, commands.BucketType.guild)
+async def profile(ctx, seconds: float = 10):
+    """(แอดมิน) รัน sampling profiler แล้วส่งไฟล์ collapsed stack สำหรับทำ flamegraph"""
+    if sampling_profiler.running:
+        await ctx.send("❌ มี profiler รันอยู่แล้ว", delete_after=5)
+        return
+    message = await ctx.send(f"🔬 กำลัง profile {min(seconds, sampling_profiler.max_seconds):.0f} วินาที...")
+    try:
+        collapsed = await sampling_profiler.profile(seconds)
+    except ProfilerBusy:
+        await message.edit(content="❌ มี profiler รันอยู่แล้ว")
+        return
+    await message.edit(content="🔬 Profile เสร็จแล้ว (เปิดด้วย flamegraph.pl หรือ https://www.speedscope.app)")
+    await ctx.send(file=discord.File(io.BytesIO(collapsed.encode('utf-8')), filename='profile.folded'))
 
 @bot.command()
 @is_allowed_channel()
@@ -319,7 +551,7 @@ async def ping(ctx):
     
     end_time = time.time()
     
-    websocket_latency = round(bot.latency * 1000) 
+    websocket_latency = round(bot.latency * 1000)
     api_latency = round((end_time - start_time) * 1000) 
     embed = discord.Embed(
         title="🏓 Pong!",
@@ -338,6 +570,12 @@ async def ping(ctx):
         inline=True
     )
     
+    embed.add_field(
+        name="📈 WebSocket History",
+        value=format_history(net_monitor.summary('gateway')),
+        inline=False
+    )
+
     if websocket_latency < 50:
         status = "🟢 Excellent"
     elif websocket_latency < 100:
@@ -375,9 +613,10 @@ async def serverstatus(ctx):
         timestamp=discord.utils.utcnow()
     )
     
+    stats = bot_stats.snapshot()
     embed.add_field(
         name="🤖 Bot Information",
-        value=f"**Servers:** {len(bot.guilds)}\n**Users:** {len(bot.users)}\n**Channels:** {sum(len(guild.channels) for guild in bot.guilds)}",
+        value=f"**Servers:** {stats['guilds']}\n**Users:** {stats['users']}\n**Channels:** {stats['channels']}",
         inline=True
     )
     
@@ -395,17 +634,13 @@ async def serverstatus(ctx):
             inline=True
         )
     
-    try:
-        import psutil
-        process = psutil.Process()
-        memory_mb = process.memory_info().rss / 1024 / 1024
+    memory_mb = process_sampler.latest.get('rss_mb')
+    if memory_mb is not None:
         embed.add_field(
             name="💾 Memory Usage",
             value=f"{memory_mb:.1f} MB",
             inline=True
         )
-    except ImportError:
-        pass
     
     embed.set_footer(text=f"Requested by {ctx.author.display_name}", icon_url=ctx.author.avatar.url if ctx.author.avatar else None)
     
@@ -423,10 +658,9 @@ async def help_command(ctx):
     )
     
     # แสดงห้องที่อนุญาต
-    allowed_channels_str = ", ".join([f"#{ch}" for ch in ALLOWED_CHANNELS])
     embed.add_field(
         name="📍 ห้องที่อนุญาต",
-        value=f"คำสั่งทั้งหมดใช้ได้เฉพาะในห้อง: {allowed_channels_str}",
+        value=f"คำสั่งทั้งหมดใช้ได้เฉพาะในห้อง: {channel_policy.describe(ctx.guild.id)}",
         inline=False
     )
     
@@ -464,7 +698,10 @@ async def help_command(ctx):
             "**!join** - ให้บอทเข้า voice channel\n"
             "**!leave** - ให้บอทออกจาก voice channel\n"
             "**!play <url/คำค้นหา>** - เล่นเพลงจาก YouTube\n"
-            "**!stop** - หยุดเล่นเพลง\n"
+            "**!queue** - ดูคิวเพลง\n"
+            "**!skip** - ข้ามเพลงปัจจุบัน\n"
+            "**!remove <ลำดับ>** / **!move <จาก> <ไป>** - จัดการคิว\n"
+            "**!stop** - หยุดเล่นเพลงและล้างคิว\n"
             "**!pause** - หยุดเพลงชั่วคราว\n"
             "**!resume** - เล่นเพลงต่อ\n"
             "**!volume <0-100>** - ปรับระดับเสียง\n"
@@ -477,10 +714,13 @@ async def help_command(ctx):
     embed.add_field(
         name="ℹ️ ข้อมูลเพิ่มเติม",
         value=(
-            "• บอทจะลบข้อความที่มีคำว่า 'kuy' ในทุกห้อง\n"
+            "• บอทจะลบข้อความที่มีคำหยาบตามรายการของเซิร์ฟเวอร์นี้ (รายการกลาง + รายการเฉพาะเซิร์ฟเวอร์) "
+            "จับได้แม้จะเว้นวรรค/ใส่จุด/ลากเสียง เช่น k.u.y หรือ kuuuy\n"
+            "• รายการคำแก้ได้ที่ไฟล์รายการคำของบอท (ไม่มีคำสั่งในแชต) แจ้งผู้ดูแลบอทเพื่อเพิ่ม/ลบคำ "
+            "บอทโหลดรายการใหม่เองภายในไม่กี่วินาที\n"
             "• บอทจะต้อนรับสมาชิกใหม่อัตโนมัติ\n"
             "• บอทจะออกจาก voice channel เมื่อไม่มีคนฟัง\n"
-            "• สำหรับเพลง: ใส่ URL หรือชื่อเพลงก็ได้"
+            "• สำหรับเพลง: ใส่ URL, URL ของ playlist หรือชื่อเพลงก็ได้"
         ),
         inline=False
     )
@@ -505,7 +745,7 @@ async def channels(ctx):
     existing_channels = []
     missing_channels = []
     
-    for channel_name in ALLOWED_CHANNELS:
+    for channel_name in channel_policy.names_for(ctx.guild.id):
         channel = discord.utils.get(ctx.guild.text_channels, name=channel_name)
         if channel:
             existing_channels.append(f"✅ {channel.mention}")
@@ -546,31 +786,58 @@ async def load_cogs():
 @bot.command()
 async def chat(ctx, *, prompt):
     """คุยกับ AI (DeepInfra)"""
+    history = chat_memory.history(ctx.channel.id)
+    # cache เฉพาะคำถามที่ไม่มีบริบทของห้อง (คำถามทั่วไป/FAQ) คำตอบที่ขึ้นกับประวัติ
+    # ใช้ซ้ำได้ยากและถ้ารวมประวัติไว้ใน key ก็แทบไม่มีทาง hit
+    cache_key = make_key(prompt, **CHAT_PARAMS) if not history else None
+    cached = chat_cache.get(cache_key) if cache_key is not None else None
+    if cached is not None:
+        chat_memory.add(ctx.channel.id, "user", prompt)
+        chat_memory.add(ctx.channel.id, "assistant", cached)
+        await ctx.send(cached)
+        return
+
+    messages = history + [{"role": "user", "content": prompt}]
+    guild_id = ctx.guild.id if ctx.guild else 0
+
+    async def notify_queued(position):
+        await ctx.send(f"⏳ บอทกำลังยุ่ง คุณอยู่คิวที่ {position}", delete_after=10)
+
+    try:
+        async with llm_scheduler.slot(guild_id, ctx.author.id, on_wait=notify_queued):
+            answer = await generate_reply(ctx, messages)
+        if answer.strip():
+            if cache_key is not None:
+                chat_cache.put(cache_key, answer)
+            chat_memory.add(ctx.channel.id, "user", prompt)
+            chat_memory.add(ctx.channel.id, "assistant", answer)
+    except SchedulerBusy as e:
+        await ctx.send(f"❌ บอทกำลังยุ่ง (รอคิวอยู่ {e.waiting} งาน) ลองใหม่อีกครั้งภายหลัง", delete_after=10)
+    except LLMError as e:
+        await ctx.send(f"เกิดข้อผิดพลาดจาก DeepInfra: {e}")
+    except Exception as e:
+        await ctx.send(f"เกิดข้อผิดพลาด: {e}")
+
+async def generate_reply(ctx, messages):
+    """ส่ง prompt ไปยัง AI แล้วตอบกลับในห้อง คืนข้อความคำตอบทั้งหมด"""
+    if CHAT_STREAMING:
+        reply = StreamingReply(ctx.channel)
+        async with contextlib.aclosing(llm_client.stream(messages, **CHAT_PARAMS)) as stream:
+            # แสดง typing จนกว่าข้อความแรกจะถูกส่ง
+            async with ctx.typing():
+                async for chunk in stream:
+                    await reply.feed(chunk)
+                    if reply.message is not None:
+                        break
+            async for chunk in stream:
+                await reply.feed(chunk)
+        await reply.finish()
+        return reply.text
+
     async with ctx.typing():
-        try:
-            url = "https://api.deepinfra.com/v1/openai/chat/completions"
-            headers = {
-                "Authorization": f"Bearer {DEEPINFRA_API_KEY}",
-                "Content-Type": "application/json"
-            }
-            payload = {
-                "model": "mistralai/Mixtral-8x7B-Instruct-v0.1",
-                "messages": [{"role": "user", "content": prompt}],
-                "max_tokens": 200,
-                "temperature": 0.7
-            }
-            response = requests.post(url, headers=headers, json=payload)
-            result = response.json()
-            print(result)
-
-            if "choices" in result and result["choices"]:
-                answer = result["choices"][0]["message"]["content"]
-                await ctx.send(answer)
-            else:
-                error_msg = result.get("error", result)
-                await ctx.send(f"เกิดข้อผิดพลาดจาก DeepInfra: {error_msg}")
-        except Exception as e:
-            await ctx.send(f"เกิดข้อผิดพลาด: {e}")
+        answer = await llm_client.complete(messages, **CHAT_PARAMS)
+    await ctx.send(answer)
+    return answer
 
 async def main():
     """ฟังก์ชันหลักในการรันบอท"""
@@ -581,6 +848,9 @@ async def main():
     print(f"🎯 Bot will only respond to commands in channels: {', '.join(ALLOWED_CHANNELS)}")
     
     # เริ่มต้น HTTP server
+    process_sampler.start()
+    net_monitor.start()
+    loop_watchdog.start()
     await start_web_server()
     
     async with bot:
@@ -591,6 +861,21 @@ async def main():
             print("❌ Invalid token provided.")
         except Exception as e:
             print(f"❌ Error starting bot: {e}")
+        finally:
+            voice_idle.close()
+            welcome.close()
+            loop_watchdog.close()
+            process_sampler.close()
+            await net_monitor.close()
+            await llm_client.close()
+            chat_cache.close()
+            extractor.cache.close()
+            await extractor.pool.close()
+            playback.source_pool.clear()
+            if playback.voice_workers:
+                playback.voice_workers.close()
+            if playback.audio_cache:
+                playback.audio_cache.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
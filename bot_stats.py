@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+
+class BotStats:
+    """ตัวนับจำนวน guild/ห้อง/สมาชิก ที่อัปเดตทีละ event
+
+    นับใหม่ทั้งหมดแค่ตอน on_ready หลังจากนั้นแต่ละ event ปรับตัวนับ O(1)
+    (ยกเว้นตอนเข้า/ออก guild ที่ไล่สมาชิกของ guild นั้นครั้งเดียว) ทำให้หน้าสถานะ
+    และ !serverstatus อ่านค่าได้ทันทีไม่ต้องวนทุก guild
+    """
+
+    EVENTS = ('on_ready', 'on_guild_join', 'on_guild_remove', 'on_guild_channel_create',
+              'on_guild_channel_delete', 'on_member_join', 'on_member_remove')
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.guilds = 0
+        self.channels = 0
+        self.members = 0
+        self._user_refs = {}  # user id -> จำนวน guild ที่เห็น user นี้
+        self._bot = None
+
+    def attach(self, bot):
+        for name in self.EVENTS:
+            bot.add_listener(getattr(self, name), name)
+        self._bot = bot
+
+    @property
+    def users(self):
+        return len(self._user_refs)
+
+    def rebuild(self, guilds):
+        self.guilds = self.channels = self.members = 0
+        self._user_refs = {}
+        for guild in guilds:
+            self._add_guild(guild)
+
+    def _add_guild(self, guild):
+        self.guilds += 1
+        self.channels += len(guild.channels)
+        self.members += guild.member_count or 0
+        refs = self._user_refs
+        for member in guild.members:
+            refs[member.id] = refs.get(member.id, 0) + 1
+
+    def _remove_guild(self, guild):
+        self.guilds -= 1
+        self.channels -= len(guild.channels)
+        self.members -= guild.member_count or 0
+        for member in guild.members:
+            self._release(member.id)
+
+    def _release(self, user_id):
+        count = self._user_refs.get(user_id, 0) - 1
+        if count > 0:
+            self._user_refs[user_id] = count
+        else:
+            self._user_refs.pop(user_id, None)
+
+    async def on_ready(self):
+        self.rebuild(self._bot.guilds)
+
+    async def on_guild_join(self, guild):
+        self._add_guild(guild)
+
+    async def on_guild_remove(self, guild):
+        self._remove_guild(guild)
+
+    async def on_guild_channel_create(self, channel):
+        self.channels += 1
+
+    async def on_guild_channel_delete(self, channel):
+        self.channels -= 1
+
+    async def on_member_join(self, member):
+        self.members += 1
+        self._user_refs[member.id] = self._user_refs.get(member.id, 0) + 1
+
+    async def on_member_remove(self, member):
+        self.members -= 1
+        self._release(member.id)
+
+    @property
+    def uptime(self):
+        return time.time() - self.started_at
+
+    def snapshot(self):
+        return {
+            'guilds': self.guilds,
+            'channels': self.channels,
+            'members': self.members,
+            'users': self.users,
+            'uptime': round(self.uptime),
+        }
+
+
+def _rss_bytes():
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class ProcessSampler:
+    """เก็บค่า memory/CPU/thread ของ process ทุก interval วินาทีใน background"""
+
+    def __init__(self, interval=15.0):
+        self.interval = interval
+        self.latest = {}
+        self._task = None
+        self._last = None
+
+    def sample(self):
+        wall = time.monotonic()
+        cpu = time.process_time()
+        cpu_percent = None
+        if self._last is not None:
+            elapsed = wall - self._last[0]
+            if elapsed > 0:
+                cpu_percent = round((cpu - self._last[1]) / elapsed * 100, 1)
+        self._last = (wall, cpu)
+        rss = _rss_bytes()
+        self.latest = {
+            'rss_mb': round(rss / 1024 / 1024, 1) if rss is not None else None,
+            'cpu_percent': cpu_percent,
+            'threads': threading.active_count(),
+            'sampled_at': time.time(),
+        }
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                # psutil อ่าน /proc ซึ่งอาจช้าบนเครื่องเล็ก ให้ไปทำใน thread
+                await loop.run_in_executor(None, self.sample)
+            except Exception as e:
+                logger.error(f"Process sampling failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
@@ -0,0 +1,155 @@
+import asyncio
+import json
+import logging
+import time
+
+import discord
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """token bucket ของทั้ง process (Discord จำกัด global ไว้ราว 50 request/วินาที)
+
+    burst เริ่มต้นเป็นแค่ 1/4 วินาทีของ rate เพราะ Discord นับ global limit เป็นช่วงละวินาที
+    (burst เต็ม + rate ในวินาทีแรกจะเกิน limit ได้) pause() หยุดทุก worker จนถึงเวลาที่กำหนด
+    ใช้ตอนได้ 429 แบบ global
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate / 4)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+
+    def pause(self, seconds):
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+def _retry_after(error):
+    """(วินาที, เป็น global หรือไม่) จาก 429 ที่ discord.py ยอมแพ้แล้วโยนออกมา"""
+    if isinstance(error, discord.RateLimited):
+        return error.retry_after, False
+    response = getattr(error, 'response', None)
+    headers = response.headers if response is not None else {}
+    is_global = headers.get('X-RateLimit-Global') == 'true' or headers.get('X-RateLimit-Scope') == 'global'
+    try:
+        return float(headers.get('Retry-After') or json.loads(error.text).get('retry_after', 1.0)), is_global
+    except (TypeError, ValueError, AttributeError):
+        return 1.0, is_global
+
+
+class Broadcaster:
+    """ส่งข้อความเดียวกันไปหลายปลายทางพร้อมกันแบบจำกัดจำนวนและความเร็ว
+
+    - worker concurrency ตัวดึงปลายทางจาก iterator ร่วมกัน (ไม่สร้าง task ต่อปลายทาง)
+    - ทุก request ผ่าน RateLimiter ของทั้ง process ก่อน ส่วน bucket ต่อ route
+      (ต่อห้อง) discord.py จัดการเอง ปลายทาง key ซ้ำในรอบเดียวกันจะถูกตัดทิ้ง
+      จึงไม่มีสอง request ชน bucket เดียวกันพร้อมกัน
+    - 429 ที่หลุดออกมาจาก discord.py จะรอตาม retry_after แล้วลองใหม่ (global = หยุดทุก worker)
+    - key ที่ส่งสำเร็จแล้วจำไว้ต่อชื่อ broadcast การเรียกซ้ำ (เช่น on_ready หลัง reconnect)
+      จะส่งเฉพาะปลายทางที่ยังไม่เคยสำเร็จ
+    """
+
+    def __init__(self, concurrency=8, rate=40.0, max_retries=3):
+        self.concurrency = concurrency
+        self.limiter = RateLimiter(rate)
+        self.max_retries = max_retries
+        self.jobs = {}  # ชื่อ broadcast -> ความคืบหน้ารอบล่าสุด
+        self._delivered = {}  # ชื่อ broadcast -> set ของ key ที่ส่งสำเร็จแล้ว
+        self._in_flight = {}  # ชื่อ broadcast -> set ของ key ที่กำลังส่งอยู่ (กันรอบที่ซ้อนกัน)
+
+    async def run(self, name, targets, send, key=lambda target: target.id):
+        """ส่ง send(target) ให้ทุก target ที่ยังไม่เคยสำเร็จ คืนความคืบหน้าของรอบนี้"""
+        delivered = self._delivered.setdefault(name, set())
+        in_flight = self._in_flight.setdefault(name, set())
+        pending = {}
+        skipped = 0
+        for target in targets:
+            target_key = key(target)
+            if target_key in delivered or target_key in in_flight or target_key in pending:
+                skipped += 1
+                continue
+            pending[target_key] = target
+        in_flight.update(pending)
+
+        job = self.jobs[name] = {
+            'total': len(pending),
+            'sent': 0,
+            'failed': 0,
+            'skipped': skipped,
+            'retries': 0,
+            'started_at': time.time(),
+            'duration': None,
+        }
+        metrics.broadcasts.inc(name, 'skipped', amount=skipped)
+        start = time.perf_counter()
+        items = iter(pending.items())
+
+        async def worker():
+            for target_key, target in items:
+                try:
+                    if await self._deliver(name, job, send, target):
+                        delivered.add(target_key)
+                finally:
+                    in_flight.discard(target_key)
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(min(self.concurrency, len(pending)))))
+        finally:
+            in_flight.difference_update(pending)
+            job['duration'] = round(time.perf_counter() - start, 2)
+        if job['total']:
+            logger.info(f"Broadcast {name}: {job['sent']}/{job['total']} sent, {job['failed']} failed "
+                        f"in {job['duration']:.1f}s")
+        return job
+
+    async def _deliver(self, name, job, send, target):
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.acquire()
+            try:
+                await send(target)
+            except (discord.RateLimited, discord.HTTPException) as e:
+                if (isinstance(e, discord.HTTPException) and e.status != 429) or attempt == self.max_retries:
+                    logger.warning(f"Broadcast {name} to {target!r} failed: {e}")
+                    break
+                retry_after, is_global = _retry_after(e)
+                job['retries'] += 1
+                metrics.broadcasts.inc(name, 'retried')
+                if is_global:
+                    self.limiter.pause(retry_after)
+                else:
+                    await asyncio.sleep(retry_after)
+            except Exception as e:
+                logger.warning(f"Broadcast {name} to {target!r} failed: {e}")
+                break
+            else:
+                job['sent'] += 1
+                metrics.broadcasts.inc(name, 'sent')
+                return True
+        job['failed'] += 1
+        metrics.broadcasts.inc(name, 'failed')
+        return False
+
+    @property
+    def pending(self):
+        return sum(len(keys) for keys in self._in_flight.values())
+
+    def stats(self):
+        return {name: dict(job) for name, job in self.jobs.items()}
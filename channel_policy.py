@@ -0,0 +1,115 @@
+import json
+import logging
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+
+def load_overrides(path, section):
+    """อ่านชื่อห้องที่ตั้งเฉพาะ guild จากไฟล์ JSON:
+    {"<section>": {"<guild id>": ["ชื่อห้อง", ...]}}
+    """
+    if not path:
+        return {}
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.error(f"Failed to load channel policy {path}: {e}")
+        return {}
+    return {int(guild_id): names for guild_id, names in data.get(section, {}).items()}
+
+
+class ChannelPolicy:
+    """ดัชนีห้องที่อนุญาตของแต่ละ guild เก็บเป็น set ของ channel id
+
+    แปลงชื่อห้องเป็น id ครั้งเดียวตอนใช้ guild นั้นครั้งแรก จากนั้นอัปเดตทีละห้องผ่าน
+    event on_guild_channel_create/update/delete การเช็กแต่ละคำสั่งจึงเหลือแค่
+    `channel.id in set`
+    """
+
+    def __init__(self, names, overrides=None):
+        self.names = tuple(names)
+        self._default = frozenset(name.lower() for name in self.names)
+        self._overrides = {}
+        self._ids = {}  # guild_id -> set ของ channel id ที่อนุญาต
+        for guild_id, guild_names in (overrides or {}).items():
+            self.configure(guild_id, guild_names)
+
+    def configure(self, guild_id, names):
+        """ตั้งชื่อห้องเฉพาะ guild (None = กลับไปใช้ค่าเริ่มต้น)"""
+        if names is None:
+            self._overrides.pop(guild_id, None)
+        else:
+            self._overrides[guild_id] = (tuple(names), frozenset(name.lower() for name in names))
+        self._ids.pop(guild_id, None)
+
+    def names_for(self, guild_id):
+        override = self._overrides.get(guild_id)
+        return override[0] if override else self.names
+
+    def _lower_names(self, guild_id):
+        override = self._overrides.get(guild_id)
+        return override[1] if override else self._default
+
+    def describe(self, guild_id):
+        return ", ".join(f"#{name}" for name in self.names_for(guild_id))
+
+    def _index(self, guild):
+        names = self._lower_names(guild.id)
+        ids = {channel.id for channel in guild.channels if channel.name.lower() in names}
+        self._ids[guild.id] = ids
+        return ids
+
+    def allows(self, channel):
+        guild = getattr(channel, 'guild', None)
+        if guild is None:
+            return False
+        ids = self._ids.get(guild.id)
+        if ids is None:
+            ids = self._index(guild)
+        return channel.id in ids
+
+    def channel_for(self, guild):
+        """ห้องข้อความที่อนุญาตห้องแรกของ guild (None ถ้าไม่มี)"""
+        ids = self._ids.get(guild.id)
+        if ids is None:
+            ids = self._index(guild)
+        for channel_id in sorted(ids):
+            channel = guild.get_channel(channel_id)
+            if isinstance(channel, discord.TextChannel):
+                return channel
+        return None
+
+    # ---- อัปเดตจาก event ของ gateway ----
+
+    def channel_created(self, channel):
+        ids = self._ids.get(channel.guild.id)
+        if ids is not None and channel.name.lower() in self._lower_names(channel.guild.id):
+            ids.add(channel.id)
+
+    def channel_updated(self, before, after):
+        if before.name == after.name:
+            return
+        ids = self._ids.get(after.guild.id)
+        if ids is None:
+            return
+        if after.name.lower() in self._lower_names(after.guild.id):
+            ids.add(after.id)
+        else:
+            ids.discard(after.id)
+
+    def channel_deleted(self, channel):
+        ids = self._ids.get(channel.guild.id)
+        if ids is not None:
+            ids.discard(channel.id)
+
+    def forget(self, guild_id):
+        self._ids.pop(guild_id, None)
+
+    def reset(self):
+        """ล้างดัชนีทั้งหมด (เช่น หลัง reconnect ที่อาจพลาด event ไป)"""
+        self._ids.clear()
@@ -0,0 +1,108 @@
+import time
+from collections import OrderedDict, deque
+
+
+def estimate_tokens(text):
+    """ประมาณจำนวน token คร่าวๆ ไม่ต้องโหลด tokenizer
+
+    ASCII ~3 ตัวอักษรต่อ token แต่ภาษาไทย (และตัวอักษรนอก ASCII อื่นๆ) tokenizer แบบ BPE
+    แตกเป็นราว 1 token ต่อตัวอักษรหรือมากกว่า จึงนับตัวละ 1 token ไม่งั้น history ภาษาไทย
+    จะเกิน budget หลายเท่า
+    """
+    ascii_chars = len(text.encode("ascii", "ignore"))
+    return ascii_chars // 3 + (len(text) - ascii_chars) + 1
+
+
+class ChannelMemory:
+    """ประวัติการคุยของห้องเดียว: turn ล่าสุดใน ring buffer + สรุปของ turn ที่เก่ากว่า"""
+
+    __slots__ = ("turns", "tokens", "summary", "summary_tokens", "last_used")
+
+    def __init__(self, max_turns):
+        self.turns = deque(maxlen=max_turns)  # (role, content, tokens)
+        self.tokens = 0
+        self.summary = deque()  # บรรทัดสรุป (line, tokens)
+        self.summary_tokens = 0
+        self.last_used = time.monotonic()
+
+
+class ConversationStore:
+    """เก็บบทสนทนาแยกตามห้อง และประกอบ context ให้อยู่ใน token budget คงที่
+
+    turn ใหม่ๆ จะถูกส่งไปเต็มๆ ภายใน window_tokens ส่วน turn ที่หลุด window จะถูกย่อ
+    เป็นบรรทัดสรุปสั้นๆ สะสมไว้ (ไม่เกิน summary_tokens) จึงไม่ต้องคำนวณใหม่ทุกครั้ง
+    ห้องที่ไม่ได้ใช้นานหรือเกินจำนวน max_channels จะถูกลบแบบ LRU
+    """
+
+    def __init__(self, window_tokens=600, summary_tokens=200, max_turns=20,
+                 max_channels=500, idle_ttl=3600, snippet_chars=120):
+        self.window_tokens = window_tokens
+        self.summary_tokens = summary_tokens
+        self.max_turns = max_turns
+        self.max_channels = max_channels
+        self.idle_ttl = idle_ttl
+        self.snippet_chars = snippet_chars
+        self._channels = OrderedDict()
+
+    def _get(self, channel_id, create=False):
+        memory = self._channels.get(channel_id)
+        now = time.monotonic()
+        if memory is not None and now - memory.last_used > self.idle_ttl:
+            del self._channels[channel_id]
+            memory = None
+        if memory is None:
+            if not create:
+                return None
+            memory = self._channels[channel_id] = ChannelMemory(self.max_turns)
+            while len(self._channels) > self.max_channels:
+                self._channels.popitem(last=False)
+        else:
+            self._channels.move_to_end(channel_id)
+        memory.last_used = now
+        return memory
+
+    def _fold(self, memory, role, content, tokens):
+        """ย่อ turn ที่หลุด window เข้าไปในสรุป"""
+        snippet = " ".join(content.split())
+        if len(snippet) > self.snippet_chars:
+            snippet = snippet[:self.snippet_chars] + "…"
+        line = f"{role}: {snippet}"
+        line_tokens = estimate_tokens(line)
+        memory.summary.append((line, line_tokens))
+        memory.summary_tokens += line_tokens
+        while memory.summary and memory.summary_tokens > self.summary_tokens:
+            _, old_tokens = memory.summary.popleft()
+            memory.summary_tokens -= old_tokens
+
+    def add(self, channel_id, role, content):
+        memory = self._get(channel_id, create=True)
+        tokens = estimate_tokens(content)
+        if len(memory.turns) == memory.turns.maxlen:
+            old = memory.turns[0]
+            memory.tokens -= old[2]
+            self._fold(memory, *old)
+        memory.turns.append((role, content, tokens))
+        memory.tokens += tokens
+        while len(memory.turns) > 1 and memory.tokens > self.window_tokens:
+            old = memory.turns.popleft()
+            memory.tokens -= old[2]
+            self._fold(memory, *old)
+
+    def history(self, channel_id):
+        """คืน messages ของประวัติ (สรุป + turn ล่าสุด) สำหรับห้องนี้"""
+        memory = self._get(channel_id)
+        if memory is None:
+            return []
+
+        messages = []
+        if memory.summary:
+            summary = "\n".join(line for line, _ in memory.summary)
+            messages.append({"role": "system", "content": f"Summary of earlier conversation:\n{summary}"})
+        messages.extend({"role": role, "content": content} for role, content, _ in memory.turns)
+        return messages
+
+    def clear(self, channel_id):
+        self._channels.pop(channel_id, None)
+
+    def __len__(self):
+        return len(self._channels)
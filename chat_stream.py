@@ -0,0 +1,81 @@
+import time
+
+# ข้อจำกัดความยาวข้อความของ Discord
+MESSAGE_LIMIT = 2000
+
+
+class StreamingReply:
+    """ข้อความ Discord ที่ค่อยๆ ยาวขึ้นตาม token ที่ได้รับ
+
+    ข้อความแรกจะถูกส่งทันทีที่ได้ token แรก หลังจากนั้นจะ edit รวบเป็นชุด
+    ตามเวลา (edit_interval) และจำนวนตัวอักษร (min_chars) เพื่อไม่ให้ชน rate limit
+    ของการ edit ต่อห้อง ถ้าเกิน 2000 ตัวอักษรจะขึ้นข้อความใหม่ต่อ
+    """
+
+    def __init__(self, channel, edit_interval=1.2, min_chars=24, limit=MESSAGE_LIMIT):
+        self.channel = channel
+        self.edit_interval = edit_interval
+        self.min_chars = min_chars
+        self.limit = limit
+        self.message = None
+        self.content = ""
+        self.text = ""
+        self._shown = 0
+        self._last_edit = 0.0
+
+    async def feed(self, chunk):
+        """เพิ่มข้อความใหม่ และ edit ถ้าถึงรอบที่ควรแสดงผล"""
+        self.text += chunk
+        self.content += chunk
+
+        if self.message is None:
+            # Discord ไม่รับข้อความว่าง รอจนมีตัวอักษรจริงก่อน
+            if self.content.strip():
+                await self._send_new()
+            return
+
+        if len(self.content) > self.limit:
+            await self._rollover()
+            return
+
+        pending = len(self.content) - self._shown
+        if pending >= self.min_chars and time.monotonic() - self._last_edit >= self.edit_interval:
+            await self._edit()
+
+    async def finish(self):
+        """แสดงข้อความส่วนที่เหลือทั้งหมด"""
+        if self.message is None:
+            if self.content.strip():
+                await self._send_new()
+            return
+        if len(self.content) > self.limit:
+            await self._rollover()
+        if self.message is not None and len(self.content) != self._shown:
+            await self._edit()
+
+    async def _send_new(self):
+        head = self.content[:self.limit]
+        self.message = await self.channel.send(head)
+        self._shown = len(head)
+        self._last_edit = time.monotonic()
+        if len(self.content) > self.limit:
+            await self._rollover()
+
+    async def _rollover(self):
+        """ปิดข้อความปัจจุบันที่ความยาวเต็ม แล้วย้ายส่วนที่เหลือไปข้อความใหม่"""
+        cut = self.content.rfind("\n", 0, self.limit)
+        if cut <= 0:
+            cut = self.limit
+        head, rest = self.content[:cut], self.content[cut:].lstrip("\n")
+        if self._shown != len(head):
+            await self.message.edit(content=head)
+        self.content = rest
+        self.message = None
+        self._shown = 0
+        if rest.strip():
+            await self._send_new()
+
+    async def _edit(self):
+        await self.message.edit(content=self.content)
+        self._shown = len(self.content)
+        self._last_edit = time.monotonic()
@@ -0,0 +1,164 @@
+import json
+import logging
+import re
+import sqlite3
+import time
+from collections import OrderedDict
+
+from extraction_pool import INFO_FIELDS
+
+logger = logging.getLogger(__name__)
+
+# googlevideo ใส่เวลาหมดอายุไว้ใน url ทั้งแบบ ?expire=... และ /expire/.../
+EXPIRE_RE = re.compile(r'[?&/]expire[=/](\d+)')
+YOUTUBE_ID_RE = re.compile(r'(?:youtube\.com/(?:watch\?(?:.*&)?v=|shorts/|embed/)|youtu\.be/)([\w-]{11})')
+
+
+def normalize_query(query):
+    return " ".join(query.casefold().split())
+
+
+def video_id_from_url(query):
+    """ดึง video id จาก url ของ YouTube ได้เลยโดยไม่ต้องเรียก yt-dlp"""
+    match = YOUTUBE_ID_RE.search(query)
+    return match.group(1) if match else None
+
+
+def stream_expiry(url):
+    match = EXPIRE_RE.search(url or '')
+    return int(match.group(1)) if match else None
+
+
+class LRUStore:
+    """dict แบบ LRU ที่มีวันหมดอายุต่อ entry และเลือกเก็บลงตาราง SQLite ได้"""
+
+    def __init__(self, max_entries, db=None, table=None):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._db = db
+        self._table = table
+        self.evictions = 0
+        if db is not None:
+            db.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            db.execute(f"DELETE FROM {table} WHERE expires_at <= ?", (time.time(),))
+            rows = db.execute(
+                f"SELECT key, value, expires_at FROM {table} ORDER BY expires_at DESC LIMIT ?",
+                (max_entries,),
+            ).fetchall()
+            for key, value, expires_at in reversed(rows):
+                self._entries[key] = (expires_at, json.loads(value))
+            db.commit()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.time():
+            self.delete(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value, expires_at):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        self._execute(
+            f"INSERT OR REPLACE INTO {self._table} (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), expires_at),
+        )
+        while len(self._entries) > self.max_entries:
+            old_key, _ = self._entries.popitem(last=False)
+            self.evictions += 1
+            self._execute(f"DELETE FROM {self._table} WHERE key = ?", (old_key,))
+
+    def delete(self, key):
+        if self._entries.pop(key, None) is not None:
+            self._execute(f"DELETE FROM {self._table} WHERE key = ?", (key,))
+
+    def _execute(self, sql, args):
+        if self._db is None:
+            return
+        try:
+            self._db.execute(sql, args)
+            self._db.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Extraction cache write failed: {e}")
+
+
+class ExtractionCache:
+    """Cache สองชั้นของผล yt-dlp
+
+    ชั้นที่ 1: คำค้นหา -> video id (อายุยาว เพราะผลค้นหาไม่ค่อยเปลี่ยน)
+    ชั้นที่ 2: video id -> url เสียงและข้อมูลเพลง (หมดอายุตาม expire= ของ googlevideo)
+    """
+
+    def __init__(self, path=None, max_queries=5000, max_videos=1000,
+                 query_ttl=7 * 24 * 3600, stream_ttl=6 * 3600, expiry_margin=600):
+        self.query_ttl = query_ttl
+        self.stream_ttl = stream_ttl
+        self.expiry_margin = expiry_margin
+        self.hits = 0
+        self.misses = 0
+        self._db = None
+        if path:
+            try:
+                self._db = sqlite3.connect(path)
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute("PRAGMA synchronous=NORMAL")
+            except sqlite3.Error as e:
+                logger.error(f"Extraction cache disabled persistence: {e}")
+                self._db = None
+        self.queries = LRUStore(max_queries, self._db, "ytdl_queries")
+        self.videos = LRUStore(max_videos, self._db, "ytdl_videos")
+
+    def video_id(self, query):
+        """หา video id ของคำค้นหา/url ที่เคยเห็นแล้ว"""
+        return video_id_from_url(query) or self.queries.get(normalize_query(query))
+
+    def get(self, query):
+        """คืน info ที่ยังใช้ได้ หรือ None ถ้าต้องเรียก yt-dlp ใหม่"""
+        video_id = self.video_id(query)
+        info = self.videos.get(video_id) if video_id else None
+        if info is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return dict(info)
+
+    def put(self, query, info):
+        video_id = info.get('id')
+        if not video_id:
+            return
+        now = time.time()
+        if not video_id_from_url(query):
+            self.queries.put(normalize_query(query), video_id, now + self.query_ttl)
+
+        expires_at = now + self.stream_ttl
+        url_expiry = stream_expiry(info.get('url'))
+        if url_expiry is not None:
+            expires_at = min(expires_at, url_expiry - self.expiry_margin)
+        if expires_at > now:
+            self.videos.put(video_id, {k: info[k] for k in INFO_FIELDS if k in info}, expires_at)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "queries": len(self.queries),
+            "videos": len(self.videos),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.queries.evictions + self.videos.evictions,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,307 @@
+"""Pool ของ process แยกสำหรับ yt-dlp
+
+การ extract ของ yt-dlp ใช้ CPU หนัก (ถอดรหัส signature, parse JSON) และถือ GIL ไว้
+ถ้ารันใน thread ของ process หลักจะทำให้ gateway และ thread เสียงของ guild อื่นสะดุด
+จึงแยกไปรันใน process ลูกที่ import yt_dlp และสร้าง YoutubeDL ไว้แล้ว คุยกันผ่าน
+stdin/stdout เป็น JSON บรรทัดละงาน ถ้างานเกินเวลา ถูกยกเลิก หรือ process ตาย
+จะ kill ตัวนั้นทิ้งแล้วสร้างใหม่แทน process หลักไม่ได้รับผลกระทบ
+"""
+import asyncio
+import json
+import logging
+import os
+import sys
+
+logger = logging.getLogger(__name__)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+YDL_OPTS = {
+    'format': 'bestaudio/best',
+    'quiet': True,
+    'noplaylist': True,
+    'default_search': 'ytsearch',
+    'extractaudio': True,
+    'audioformat': 'opus',
+    'outtmpl': '%(extractor)s-%(id)s-%(title)s.%(ext)s',
+    'restrictfilenames': True,
+    'logtostderr': False,
+    'ignoreerrors': False,
+    'no_warnings': True,
+    'source_address': '0.0.0.0',
+    'socket_timeout': 30
+}
+
+# ตัวเลือกสำหรับอ่านรายการใน playlist แบบเร็ว (ไม่ resolve แต่ละเพลง)
+FLAT_PLAYLIST_OPTS = {
+    **YDL_OPTS,
+    'noplaylist': False,
+    'extract_flat': 'in_playlist',
+    'lazy_playlist': True,
+}
+
+# เวลาที่ยอมรอ worker import yt_dlp เสร็จแล้วตอบว่าพร้อม
+READY_TIMEOUT = 30.0
+
+# เวลารอก่อนลองสร้าง worker ใหม่อีกครั้งเมื่อสร้างไม่สำเร็จ (เพิ่มเป็นเท่าตัวจนถึงค่าสูงสุด)
+RESPAWN_DELAY = 1.0
+RESPAWN_MAX_DELAY = 60.0
+
+# เก็บเฉพาะ field ที่ใช้เล่นเพลง ไม่ส่ง info dict ทั้งก้อนข้าม process
+INFO_FIELDS = ('id', 'url', 'title', 'duration', 'uploader', 'webpage_url',
+               'acodec', 'ext', 'abr', 'asr', 'extractor_key', 'http_headers')
+
+
+class ExtractionError(Exception):
+    """ดึงข้อมูลเพลงจาก yt-dlp ไม่สำเร็จ (ข้อความเป็นข้อความที่แสดงให้ผู้ใช้ได้)"""
+
+
+def run_extract(ydl, query):
+    info = ydl.extract_info(query, download=False)
+
+    if 'entries' in info:
+        entries = list(info['entries'] or [])
+        if len(entries) == 0:
+            raise ExtractionError("❌ ไม่พบผลการค้นหา")
+        info = entries[0]
+
+    if not info.get('url'):
+        raise ExtractionError("❌ ไม่สามารถดึง URL เสียงได้")
+    return {k: info[k] for k in INFO_FIELDS if k in info}
+
+
+def iter_flat_entries(ydl, url):
+    # process=False ให้ entries เป็น generator ที่ดึงหน้าถัดไปเมื่อวนถึงเท่านั้น
+    info = ydl.extract_info(url, download=False, process=False)
+    for _ in range(3):
+        if info.get('_type') not in ('url', 'url_transparent'):
+            break
+        info = ydl.extract_info(info['url'], download=False, process=False)
+    for entry in info.get('entries') or []:
+        if entry and (entry.get('url') or entry.get('id')):
+            yield {
+                'url': entry.get('url') or entry['id'],
+                'title': entry.get('title'),
+                'duration': entry.get('duration'),
+            }
+
+
+class ExtractionPool:
+    """Pool ของ worker process ที่อุ่นเครื่องไว้แล้ว จำกัดงานพร้อมกันเท่าจำนวน worker"""
+
+    def __init__(self, size=2, timeout=30, max_jobs_per_worker=500):
+        self.size = size
+        self.timeout = timeout
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self._idle = asyncio.Queue()
+        self._procs = set()
+        self._jobs = {}
+        self._start_lock = asyncio.Lock()
+        self._started = False
+        self._closed = False
+        self._respawns = set()
+        self.completed = 0
+        self.failed = 0
+        self.restarts = 0
+
+    async def start(self):
+        """สร้าง worker ทั้งหมดล่วงหน้า (import yt_dlp เสร็จก่อนมีงานแรก)"""
+        async with self._start_lock:
+            if self._started:
+                return
+            procs = await asyncio.gather(*(self._spawn() for _ in range(self.size)), return_exceptions=True)
+            errors = [proc for proc in procs if isinstance(proc, BaseException)]
+            if errors:
+                # ตัวที่สร้างสำเร็จไม่ได้เข้า pool ถ้าไม่ปิดทิ้ง start() รอบหน้าจะสร้างเพิ่มซ้อนไปเรื่อยๆ
+                for proc in procs:
+                    if not isinstance(proc, BaseException):
+                        self._discard(proc)
+                        await proc.wait()
+                raise errors[0]
+            for proc in procs:
+                self._idle.put_nowait(proc)
+            self._started = True
+            logger.info(f"yt-dlp extraction pool started with {self.size} workers")
+
+    async def _spawn(self):
+        proc = await self._launch()
+        self._procs.add(proc)
+        self._jobs[proc] = 0
+        return proc
+
+    async def _launch(self):
+        proc = await asyncio.create_subprocess_exec(
+            sys.executable, '-m', 'extraction_pool',
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            cwd=HERE,
+            limit=1024 * 1024,
+        )
+        try:
+            ready = await asyncio.wait_for(proc.stdout.readline(), READY_TIMEOUT)
+        except asyncio.TimeoutError:
+            ready = b''
+        except BaseException:
+            proc.kill()
+            raise
+        if not ready:
+            if proc.returncode is None:
+                proc.kill()
+            await proc.wait()
+            raise RuntimeError("extraction worker failed to start")
+        return proc
+
+    def _discard(self, proc):
+        self._procs.discard(proc)
+        self._jobs.pop(proc, None)
+        if proc.returncode is None:
+            proc.kill()
+
+    def _replace(self, proc):
+        """kill worker ที่มีปัญหาแล้วสร้างตัวใหม่ใน background
+
+        ถ้าสร้างไม่สำเร็จจะลองใหม่เรื่อยๆ แบบ backoff ไม่อย่างนั้น pool จะเสีย worker ไปถาวร
+        และถ้าหมดทุกตัว extract จะรอ worker ว่างจนหมดเวลาทุกครั้ง
+        """
+        self._discard(proc)
+        if self._closed:
+            return
+        self.restarts += 1
+
+        async def respawn():
+            await proc.wait()
+            delay = RESPAWN_DELAY
+            while not self._closed:
+                try:
+                    self._idle.put_nowait(await self._spawn())
+                    return
+                except Exception as e:
+                    logger.error(f"Failed to respawn extraction worker: {e}, retrying in {delay:.0f}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RESPAWN_MAX_DELAY)
+
+        task = asyncio.create_task(respawn())
+        self._respawns.add(task)
+        task.add_done_callback(self._respawns.discard)
+
+    async def extract(self, query, timeout=None):
+        """ส่งงาน extract ให้ worker ที่ว่าง คืน info dict ที่ตัดเหลือเฉพาะ field ที่ใช้"""
+        if not self._started:
+            await self.start()
+
+        # timeout เดียวครอบทั้งการรอ worker ว่างและการรอผล
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (timeout or self.timeout)
+        proc = await asyncio.wait_for(self._idle.get(), deadline - loop.time())
+        try:
+            proc.stdin.write(json.dumps({'op': 'extract', 'query': query}).encode() + b'\n')
+            await proc.stdin.drain()
+            line = await asyncio.wait_for(proc.stdout.readline(), deadline - loop.time())
+            if not line:
+                raise RuntimeError("extraction worker crashed")
+        except BaseException:
+            # เกินเวลา / ถูกยกเลิก / worker ตาย: worker อาจยังทำงานค้างอยู่ ทิ้งไปเลย
+            self.failed += 1
+            self._replace(proc)
+            raise
+
+        self._jobs[proc] += 1
+        if self._jobs[proc] >= self.max_jobs_per_worker:
+            self._replace(proc)
+        else:
+            self._idle.put_nowait(proc)
+
+        result = json.loads(line)
+        if not result['ok']:
+            self.failed += 1
+            if result.get('user'):
+                raise ExtractionError(result['error'])
+            raise RuntimeError(result['error'])
+        self.completed += 1
+        return result['info']
+
+    async def iter_playlist(self, url, limit, timeout=None):
+        """อ่านรายการใน playlist แบบ flat ทีละเพลงตามที่ yt-dlp ได้มา (async generator)
+
+        ใช้ process แยกที่สร้างใหม่ ไม่ยืม worker จาก pool เพื่อให้การ resolve เพลงแรก
+        ทำงานต่อได้ระหว่างที่ยังอ่าน playlist ไม่จบ
+        """
+        timeout = timeout or self.timeout
+        proc = await self._launch()
+        try:
+            proc.stdin.write(json.dumps({'op': 'flat', 'query': url, 'limit': limit}).encode() + b'\n')
+            await proc.stdin.drain()
+            while True:
+                line = await asyncio.wait_for(proc.stdout.readline(), timeout)
+                if not line:
+                    raise RuntimeError("extraction worker crashed")
+                result = json.loads(line)
+                if not result['ok']:
+                    if result.get('user'):
+                        raise ExtractionError(result['error'])
+                    raise RuntimeError(result['error'])
+                if result.get('done'):
+                    return
+                yield result['entry']
+        finally:
+            if proc.returncode is None:
+                proc.kill()
+            await proc.wait()
+
+    def stats(self):
+        return {
+            "workers": len(self._procs),
+            "idle": self._idle.qsize(),
+            "completed": self.completed,
+            "failed": self.failed,
+            "restarts": self.restarts,
+        }
+
+    async def close(self):
+        self._closed = True
+        for task in list(self._respawns):
+            task.cancel()
+        for proc in list(self._procs):
+            self._discard(proc)
+            await proc.wait()
+
+
+def worker_main():
+    """loop ของ worker process: อ่าน query จาก stdin ตอบผลทาง stdout"""
+    # ใช้ stdout เดิมเป็นช่องส่งผลอย่างเดียว ข้อความอื่นจาก yt-dlp ให้ไป stderr
+    out = os.fdopen(os.dup(1), 'w', buffering=1)
+    os.dup2(2, 1)
+    sys.stdout = sys.stderr
+
+    import yt_dlp
+
+    ydl = yt_dlp.YoutubeDL(YDL_OPTS)
+    flat_ydl = None
+    out.write(json.dumps({'ready': True}) + '\n')
+
+    for line in sys.stdin:
+        job = json.loads(line)
+        try:
+            if job['op'] == 'flat':
+                if flat_ydl is None:
+                    flat_ydl = yt_dlp.YoutubeDL(FLAT_PLAYLIST_OPTS)
+                count = 0
+                for entry in iter_flat_entries(flat_ydl, job['query']):
+                    out.write(json.dumps({'ok': True, 'entry': entry}, default=str) + '\n')
+                    count += 1
+                    if count >= job['limit']:
+                        break
+                if count == 0:
+                    raise ExtractionError("❌ ไม่พบเพลงใน playlist")
+                result = {'ok': True, 'done': True}
+            else:
+                result = {'ok': True, 'info': run_extract(ydl, job['query'])}
+        except ExtractionError as e:
+            result = {'ok': False, 'user': True, 'error': str(e)}
+        except Exception as e:
+            result = {'ok': False, 'user': False, 'error': str(e)}
+        out.write(json.dumps(result, default=str) + '\n')
+
+
+if __name__ == '__main__':
+    worker_main()
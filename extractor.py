@@ -0,0 +1,79 @@
+import asyncio
+import logging
+import os
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import metrics
+from extraction_cache import ExtractionCache
+from extraction_pool import ExtractionError, ExtractionPool
+
+logger = logging.getLogger(__name__)
+
+# ตั้ง YTDL_CACHE_PATH เพื่อให้ cache อยู่รอดหลังรีสตาร์ท
+cache = ExtractionCache(path=os.getenv('YTDL_CACHE_PATH'))
+pool = ExtractionPool(
+    size=int(os.getenv('YTDL_WORKERS', 2)),
+    timeout=float(os.getenv('YTDL_TIMEOUT', 30)),
+)
+
+
+async def extract_info(query, timeout=None):
+    """ดึงข้อมูลเพลง (url ของเสียง, ชื่อ, ความยาว ฯลฯ) จาก url หรือคำค้นหา"""
+    info = cache.get(query)
+    if info is not None:
+        metrics.ytdl_extractions.inc('cache_hit')
+        return info
+
+    # รู้ video id แล้วแต่ url หมดอายุ: ดึงจากหน้าวิดีโอตรงๆ ไม่ต้องค้นหาใหม่
+    video_id = cache.video_id(query)
+    target = f"https://www.youtube.com/watch?v={video_id}" if video_id else query
+
+    started = time.perf_counter()
+    try:
+        info = await pool.extract(target, timeout=timeout)
+        cache.put(query, info)
+        metrics.ytdl_extractions.inc('ok')
+        metrics.ytdl_latency.observe(time.perf_counter() - started)
+        return info
+    except asyncio.TimeoutError:
+        metrics.ytdl_extractions.inc('timeout')
+        raise ExtractionError("❌ หมดเวลาในการค้นหา")
+    except ExtractionError:
+        metrics.ytdl_extractions.inc('not_found')
+        raise
+    except Exception as e:
+        metrics.ytdl_extractions.inc('error')
+        logger.error(f"yt-dlp extraction error: {e}")
+        raise ExtractionError("❌ ไม่สามารถดึงข้อมูลวิดีโอได้") from e
+
+
+def is_playlist(query):
+    """url นี้เป็น playlist หรือไม่ (ตาม noplaylist ของ yt-dlp)
+
+    ลิงก์วิดีโอที่ติด list= มาด้วย (watch?v=...&list=..., youtu.be/...?list=...) ซึ่งได้จากการ
+    กดแชร์ระหว่างเล่น playlist ถือเป็นเพลงเดียว ถ้าต้องการทั้ง playlist ให้ใช้ลิงก์ /playlist?list=...
+    """
+    if not query.startswith(('http://', 'https://')):
+        return False
+    parts = urlsplit(query)
+    if '/playlist' in parts.path or '/sets/' in parts.path:
+        return True
+    params = parse_qs(parts.query)
+    if 'list' not in params:
+        return False
+    return 'v' not in params and not parts.netloc.endswith('youtu.be')
+
+
+async def iter_playlist(url, limit):
+    """รายการเพลงใน playlist แบบ flat (url, title, duration) ทีละรายการ"""
+    try:
+        async for entry in pool.iter_playlist(url, limit):
+            yield entry
+    except asyncio.TimeoutError:
+        raise ExtractionError("❌ หมดเวลาในการโหลด playlist")
+    except ExtractionError:
+        raise
+    except Exception as e:
+        logger.error(f"yt-dlp playlist error: {e}")
+        raise ExtractionError("❌ ไม่สามารถโหลด playlist ได้") from e
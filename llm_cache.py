@@ -0,0 +1,189 @@
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_prompt(prompt):
+    """ทำให้ prompt ที่ต่างกันแค่ตัวพิมพ์/ช่องว่างได้ key เดียวกัน"""
+    return " ".join(prompt.casefold().split())
+
+
+def make_key(prompt, **params):
+    raw = json.dumps([normalize_prompt(prompt), params], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Cache คำตอบ AI แบบ LRU + TTL จำกัดทั้งจำนวนและขนาด พร้อมเก็บลง SQLite
+
+    get/put ถูกเรียกบน event loop จึงไม่แตะ SQLite เอง: insert/delete ถูกต่อคิวไว้แล้วเขียน
+    รวมในทรานแซกชันเดียวผ่าน asyncio.to_thread ส่วนเวลาที่ใช้ล่าสุดของ hit เขียนรวมทุก
+    flush_interval วินาที ที่ค้างอยู่ทั้งหมดถูกเขียนตอน close
+    """
+
+    def __init__(self, path=None, max_entries=2000, max_bytes=8 * 1024 * 1024, ttl=24 * 3600, flush_interval=30.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._touched = {}  # key -> accessed_at ที่ยังไม่ได้เขียนลง SQLite
+        self._writes = []  # (sql, args) ที่ยังไม่ได้เขียนลง SQLite ตามลำดับที่เกิด
+        self._pending_lock = threading.Lock()  # กันคิวข้างบนระหว่าง event loop กับ thread ที่เขียน
+        self._db_lock = threading.Lock()  # ให้เขียน/ปิด SQLite ได้ทีละที่
+        self._flush_task = None
+        self._flushed_at = time.monotonic()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._db = None
+        if path:
+            self._open(path)
+
+    def _open(self, path):
+        try:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            now = time.time()
+            self._db.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+            rows = self._db.execute(
+                "SELECT key, value, expires_at FROM responses ORDER BY accessed_at"
+            ).fetchall()
+            for key, value, expires_at in rows:
+                self._store(key, value, expires_at)
+            self._db.commit()
+            logger.info(f"Loaded {len(self._entries)} cached chat responses from {path}")
+        except sqlite3.Error as e:
+            logger.error(f"Chat cache disabled persistence: {e}")
+            self._db = None
+
+    def _store(self, key, value, expires_at):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.bytes -= len(old[1].encode("utf-8"))
+        self._entries[key] = (expires_at, value)
+        self.bytes += len(value.encode("utf-8"))
+        self._evict()
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self.bytes > self.max_bytes):
+            key, (_, value) = self._entries.popitem(last=False)
+            self.bytes -= len(value.encode("utf-8"))
+            self.evictions += 1
+            self._execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def _execute(self, sql, args):
+        if self._db is None:
+            return
+        with self._pending_lock:
+            self._writes.append((sql, args))
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        """เริ่ม flush ใน thread ถ้ายังไม่มีตัวไหนทำอยู่ นอก event loop (เช่นตอนโหลด) เขียนตรงๆ"""
+        if self._flush_task is not None:
+            return  # ตัวที่กำลังเขียนจะเริ่มรอบใหม่เองถ้ามีของค้าง
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+        self._flushed_at = time.monotonic()
+        self._flush_task = loop.create_task(asyncio.to_thread(self.flush))
+        self._flush_task.add_done_callback(self._flush_done)
+
+    def _flush_done(self, task):
+        self._flush_task = None
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Chat cache flush failed: {task.exception()}")
+        if self._writes:
+            self._schedule_flush()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            self.bytes -= len(value.encode("utf-8"))
+            self.expirations += 1
+            self.misses += 1
+            self._execute("DELETE FROM responses WHERE key = ?", (key,))
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        if self._db is not None:
+            with self._pending_lock:
+                self._touched[key] = time.time()
+            if time.monotonic() - self._flushed_at >= self.flush_interval:
+                self._schedule_flush()
+        return value
+
+    def flush(self):
+        """เขียน insert/delete และเวลาที่ใช้ล่าสุดที่ค้างไว้ลง SQLite ในทรานแซกชันเดียว
+
+        blocking — บน event loop ให้ผ่าน _schedule_flush ซึ่งเรียกตัวนี้ใน thread
+        """
+        with self._db_lock:
+            with self._pending_lock:
+                writes, self._writes = self._writes, []
+                touched, self._touched = self._touched, {}
+            if self._db is None or not (writes or touched):
+                return
+            rows = [(accessed_at, key) for key, accessed_at in touched.items()]
+            try:
+                for sql, args in writes:
+                    self._db.execute(sql, args)
+                self._db.executemany("UPDATE responses SET accessed_at = ? WHERE key = ?", rows)
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Chat cache write failed: {e}")
+
+    def put(self, key, value):
+        if len(value.encode("utf-8")) > self.max_bytes:
+            return
+        now = time.time()
+        expires_at = now + self.ttl
+        self._store(key, value, expires_at)
+        if key in self._entries:
+            self._execute(
+                "INSERT OR REPLACE INTO responses (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, expires_at, now),
+            )
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+    def close(self):
+        if self._db is not None:
+            self.flush()
+            with self._db_lock:
+                self._db.close()
+                self._db = None
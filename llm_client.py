@@ -0,0 +1,179 @@
+import asyncio
+import email.utils
+import json
+import logging
+import os
+import random
+import time
+from datetime import datetime, timezone
+
+import aiohttp
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+DEEPINFRA_URL = os.getenv("DEEPINFRA_URL", "https://api.deepinfra.com/v1/openai/chat/completions")
+DEFAULT_MODEL = "mistralai/Mixtral-8x7B-Instruct-v0.1"
+
+# สถานะที่ควรลองใหม่ (rate limit / ฝั่งเซิร์ฟเวอร์ล่ม)
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    """ข้อผิดพลาดจาก LLM API"""
+
+
+def _parse_retry_after(value):
+    """Retry-After เป็นได้ทั้งจำนวนวินาทีและ HTTP-date (RFC 9110) คืนวินาที หรือ None ถ้าอ่านไม่ออก"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class LLMClient:
+    """Client แบบ async สำหรับ DeepInfra ที่ใช้ session เดียวตลอดอายุบอท"""
+
+    def __init__(self, api_key, url=DEEPINFRA_URL, max_concurrency=8, pool_size=16,
+                 timeout=60, connect_timeout=10, max_retries=3, backoff_base=0.5, backoff_max=8.0):
+        self.api_key = api_key
+        self.url = url
+        self.pool_size = pool_size
+        self.timeout = aiohttp.ClientTimeout(total=timeout, connect=connect_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._session = None
+        self.in_flight = 0
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                keepalive_timeout=60,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self.timeout,
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json",
+                },
+            )
+        return self._session
+
+    def _backoff(self, attempt, retry_after=None):
+        """คำนวณเวลารอแบบ exponential backoff + full jitter"""
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def build_payload(self, messages, model=DEFAULT_MODEL, max_tokens=200, temperature=0.7):
+        return {
+            "model": model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+        }
+
+    async def _post(self, payload):
+        """POST พร้อม retry แบบ backoff คืน response ที่ยังเปิดอยู่ (ผู้เรียกต้องปิดเอง)"""
+        session = self._get_session()
+        for attempt in range(self.max_retries + 1):
+            try:
+                resp = await session.post(self.url, json=payload)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt >= self.max_retries:
+                    raise LLMError(f"เชื่อมต่อ DeepInfra ไม่สำเร็จ: {e}") from e
+                metrics.llm_retries.inc('connection')
+                delay = self._backoff(attempt)
+                logger.warning(f"DeepInfra connection error: {e!r}, retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            if resp.status in RETRY_STATUSES and attempt < self.max_retries:
+                retry_after = _parse_retry_after(resp.headers.get("Retry-After"))
+                resp.release()
+                metrics.llm_retries.inc(str(resp.status))
+                delay = self._backoff(attempt, retry_after)
+                logger.warning(f"DeepInfra status {resp.status}, retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                continue
+            return resp
+
+    async def complete(self, messages, **params):
+        """ส่ง chat completion และคืนข้อความคำตอบ"""
+        payload = self.build_payload(messages, **params)
+
+        started = time.perf_counter()
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                async with await self._post(payload) as resp:
+                    result = await resp.json(content_type=None)
+            except BaseException:
+                metrics.llm_requests.inc('complete', 'error')
+                raise
+            finally:
+                self.in_flight -= 1
+
+        if "choices" in result and result["choices"]:
+            metrics.llm_requests.inc('complete', 'ok')
+            metrics.llm_latency.observe(time.perf_counter() - started, 'complete')
+            return result["choices"][0]["message"]["content"]
+        metrics.llm_requests.inc('complete', 'error')
+        raise LLMError(result.get("error", result))
+
+    async def stream(self, messages, **params):
+        """ส่ง chat completion แบบ stream (SSE) แล้ว yield ข้อความทีละส่วน"""
+        payload = self.build_payload(messages, **params)
+        payload["stream"] = True
+
+        started = time.perf_counter()
+        status = 'error'
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                async with await self._post(payload) as resp:
+                    if resp.status != 200:
+                        body = await resp.text()
+                        raise LLMError(f"status {resp.status}: {body[:200]}")
+
+                    async for line in resp.content:
+                        line = line.strip()
+                        if not line.startswith(b"data:"):
+                            continue
+                        data = line[5:].strip()
+                        if data == b"[DONE]":
+                            break
+                        chunk = json.loads(data)
+                        if "error" in chunk:
+                            raise LLMError(chunk["error"])
+                        choices = chunk.get("choices") or [{}]
+                        delta = choices[0].get("delta", {}).get("content")
+                        if delta:
+                            yield delta
+                status = 'ok'
+                metrics.llm_latency.observe(time.perf_counter() - started, 'stream')
+            except GeneratorExit:
+                status = 'cancelled'
+                raise
+            finally:
+                self.in_flight -= 1
+                metrics.llm_requests.inc('stream', status)
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
@@ -0,0 +1,155 @@
+import asyncio
+import contextlib
+import time
+from collections import OrderedDict, deque
+
+import metrics
+
+
+class SchedulerBusy(Exception):
+    """คิวเต็ม ไม่รับงานเพิ่ม"""
+
+    def __init__(self, waiting):
+        super().__init__(f"queue full ({waiting} waiting)")
+        self.waiting = waiting
+
+
+class FairScheduler:
+    """คิวงาน LLM ที่สลับกันแบบ round-robin ระหว่าง guild และระหว่าง user ใน guild
+
+    จำกัดจำนวน request ที่ส่งขึ้น upstream พร้อมกัน (max_concurrency) และจำนวนงานที่รอ
+    (max_queue / max_per_user) ถ้าเต็มจะโยน SchedulerBusy ทันทีแทนที่จะรอไปเรื่อยๆ
+    เวลารอคิวและเวลาที่ถือช่องไว้บันทึกลง metrics (bot_llm_queue_wait_seconds,
+    bot_llm_service_seconds)
+    """
+
+    def __init__(self, max_concurrency=4, max_queue=32, max_per_user=2):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_per_user = max_per_user
+        self.running = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._guilds = OrderedDict()  # guild_id -> OrderedDict(user_id -> deque[Future])
+        self.queue_wait = metrics.llm_queue_wait.labels()
+        self.service_time = metrics.llm_service_time.labels()
+
+    def _enqueue(self, guild_id, user_id):
+        if self.running < self.max_concurrency and self.waiting == 0:
+            self.running += 1
+            return None, 0
+
+        users = self._guilds.get(guild_id)
+        queue = users.get(user_id) if users else None
+        if self.waiting >= self.max_queue or (queue and len(queue) >= self.max_per_user):
+            self.rejected += 1
+            raise SchedulerBusy(self.waiting)
+
+        if users is None:
+            users = self._guilds[guild_id] = OrderedDict()
+        if queue is None:
+            queue = users[user_id] = deque()
+        waiter = asyncio.get_running_loop().create_future()
+        queue.append(waiter)
+        self.waiting += 1
+        return waiter, self._position(waiter)
+
+    @staticmethod
+    def _pop_next(guilds):
+        """หยิบงานถัดไปตามลำดับ round-robin แล้วหมุนคิวเหมือนตอน dispatch จริง"""
+        guild_id, users = next(iter(guilds.items()))
+        user_id, queue = next(iter(users.items()))
+        waiter = queue.popleft()
+
+        # คนที่เพิ่งได้คิวย้ายไปท้ายแถว ทั้งระดับ user และ guild
+        if queue:
+            users.move_to_end(user_id)
+        else:
+            del users[user_id]
+        if users:
+            guilds.move_to_end(guild_id)
+        else:
+            del guilds[guild_id]
+        return waiter
+
+    def _position(self, waiter):
+        """ลำดับจริงของ waiter ในรอบ round-robin (เริ่มที่ 1) ไม่ใช่จำนวนงานที่รอทั้งหมด"""
+        guilds = OrderedDict(
+            (guild_id, OrderedDict((user_id, deque(queue)) for user_id, queue in users.items()))
+            for guild_id, users in self._guilds.items()
+        )
+        position = 0
+        while guilds:
+            candidate = self._pop_next(guilds)
+            if candidate.cancelled():
+                continue
+            position += 1
+            if candidate is waiter:
+                break
+        return position
+
+    def _remove(self, guild_id, user_id, waiter):
+        """เอา waiter ที่ถูกยกเลิกออกจากคิว ไม่ให้นับใน max_queue/max_per_user อีก"""
+        users = self._guilds.get(guild_id)
+        queue = users.get(user_id) if users else None
+        if queue is None:
+            return
+        try:
+            queue.remove(waiter)
+        except ValueError:
+            return
+        self.waiting -= 1
+        if not queue:
+            del users[user_id]
+            if not users:
+                del self._guilds[guild_id]
+
+    def _dispatch(self):
+        while self.running < self.max_concurrency and self._guilds:
+            waiter = self._pop_next(self._guilds)
+            self.waiting -= 1
+            if waiter.cancelled():
+                # task ถูกยกเลิกแล้วแต่ยังไม่ได้รันถึง _remove
+                continue
+            self.running += 1
+            waiter.set_result(None)
+
+    def _release(self):
+        self.running -= 1
+        self._dispatch()
+
+    @contextlib.asynccontextmanager
+    async def slot(self, guild_id, user_id, on_wait=None):
+        """จองช่องส่ง request หนึ่งช่อง ถ้าต้องรอคิวจะเรียก on_wait(position) ก่อน"""
+        queued_at = time.monotonic()
+        waiter, position = self._enqueue(guild_id, user_id)
+        if waiter is not None:
+            try:
+                if on_wait is not None:
+                    await on_wait(position)
+                await waiter
+            except BaseException:
+                if waiter.done() and not waiter.cancelled():
+                    # ได้ช่องแล้วแต่ถูกยกเลิกพอดี คืนช่องให้คนถัดไป
+                    self._release()
+                else:
+                    waiter.cancel()
+                    self._remove(guild_id, user_id, waiter)
+                raise
+
+        started_at = time.monotonic()
+        self.queue_wait.observe(started_at - queued_at)
+        try:
+            yield
+        finally:
+            self.service_time.observe(time.monotonic() - started_at)
+            self._release()
+
+    def stats(self):
+        return {
+            "running": self.running,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+            "queue_wait": self.queue_wait.snapshot(),
+            "service_time": self.service_time.snapshot(),
+        }
@@ -0,0 +1,199 @@
+"""ตัวเก็บ metrics ของบอท และแปลงเป็น Prometheus text format สำหรับ /metrics
+
+Counter/Gauge เก็บเป็น dict ธรรมดา (label tuple -> ค่า) ถูกเพิ่มค่าจาก event loop
+เท่านั้น จึงไม่ต้องใช้ lock Histogram ใช้ lock สั้นๆ เพราะบางตัวถูกเรียกจาก thread เสียง
+ค่าที่อ่านได้จากที่อื่นอยู่แล้ว (เช่น ความยาวคิว) ให้ส่ง fn มาแทน จะถูกอ่านตอน scrape เท่านั้น
+"""
+import bisect
+import threading
+from collections import deque
+
+REGISTRY = []
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """ค่าที่เพิ่มขึ้นอย่างเดียว (เช่น จำนวนคำสั่ง) แยกตาม label"""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labels=(), fn=None):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.values = {}
+        self.fn = fn
+        REGISTRY.append(self)
+
+    def inc(self, *labels, amount=1):
+        values = self.values
+        values[labels] = values.get(labels, 0) + amount
+
+    def _samples(self):
+        if self.fn is None:
+            return self.values.items()
+        value = self.fn()
+        if isinstance(value, dict):
+            return [(key if isinstance(key, tuple) else (key,), v) for key, v in value.items()]
+        return [((), value)]
+
+    def collect(self):
+        for labels, value in list(self._samples()):
+            if value is not None:
+                yield f'{self.name}{_format_labels(self.labels, labels)} {_format_value(value)}'
+
+
+class Gauge(Counter):
+    """ค่าที่ขึ้นลงได้ (เช่น จำนวน voice session)"""
+
+    kind = 'gauge'
+
+    def set(self, value, *labels):
+        self.values[labels] = value
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram:
+    """Histogram แบบ bucket สะสม (เหมือน Prometheus) พร้อมเก็บค่าล่าสุดไว้คำนวณ percentile
+
+    observe() เรียกได้จากหลาย thread (เช่น thread เสียงของ discord.py)
+    """
+
+    def __init__(self, buckets, size=512):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # ช่องสุดท้ายคือ +Inf
+        self.count = 0
+        self.total = 0.0
+        self.samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.total += value
+            self.samples.append(value)
+
+    def percentile(self, p):
+        with self._lock:
+            ordered = sorted(self.samples)
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+    def cumulative(self):
+        """คืน [(upper_bound, จำนวนสะสม)] รวม +Inf"""
+        with self._lock:
+            counts = list(self.counts)
+        result = []
+        running = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            running += count
+            result.append((bound, running))
+        return result
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count * 1000, 1) if self.count else 0.0,
+            "p50_ms": round(self.percentile(0.5) * 1000, 1),
+            "p95_ms": round(self.percentile(0.95) * 1000, 1),
+            "p99_ms": round(self.percentile(0.99) * 1000, 1),
+        }
+
+
+class HistogramFamily:
+    """กลุ่ม Histogram ชื่อเดียวกันแยกตาม label"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=None):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self.buckets = buckets or LATENCY_BUCKETS
+        self.children = {}
+        REGISTRY.append(self)
+
+    def labels(self, *values):
+        child = self.children.get(values)
+        if child is None:
+            child = self.children[values] = Histogram(self.buckets)
+        return child
+
+    def observe(self, value, *labels):
+        self.labels(*labels).observe(value)
+
+    def collect(self):
+        for labels, child in list(self.children.items()):
+            for bound, count in child.cumulative():
+                le = _format_labels(self.label_names, labels, [('le', _format_value(bound))])
+                yield f'{self.name}_bucket{le} {count}'
+            base = _format_labels(self.label_names, labels)
+            yield f'{self.name}_sum{base} {_format_value(child.total)}'
+            yield f'{self.name}_count{base} {child.count}'
+
+
+def render():
+    """metrics ทั้งหมดในรูป Prometheus text exposition format"""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        lines.extend(metric.collect())
+    lines.append('')
+    return '\n'.join(lines)
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# เวลาตั้งแต่ได้รับคำสั่งจนส่งเฟรมเสียงแรก แยกตามสิ่งที่ทำให้เพลงเริ่ม
+# play = คำสั่ง !play ตอนไม่มีเพลงเล่นอยู่, next = เพลงก่อนหน้าจบหรือถูก !skip
+TTFA_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 10.0, 20.0)
+ttfa = HistogramFamily('bot_time_to_first_audio_seconds', 'Time from request to the first audio frame sent',
+                       ('trigger',), TTFA_BUCKETS)
+for _trigger in ('play', 'next'):
+    ttfa.labels(_trigger)
+
+commands = Counter('bot_commands_total', 'Commands invoked by outcome', ('command', 'status'))
+command_latency = HistogramFamily('bot_command_duration_seconds', 'Command handler duration', ('command',))
+events = Counter('bot_gateway_events_total', 'Events dispatched by the client', ('event',))
+
+llm_requests = Counter('bot_llm_requests_total', 'LLM API requests by outcome', ('mode', 'status'))
+llm_retries = Counter('bot_llm_retries_total', 'LLM API retries by reason', ('reason',))
+llm_latency = HistogramFamily('bot_llm_request_duration_seconds', 'LLM request duration until the full answer', ('mode',))
+llm_queue_wait = HistogramFamily('bot_llm_queue_wait_seconds', 'Time chat requests waited in the fair queue for an LLM slot')
+llm_service_time = HistogramFamily('bot_llm_service_seconds', 'Time chat requests held an LLM slot')
+
+ytdl_extractions = Counter('bot_ytdl_extractions_total', 'yt-dlp extractions by result', ('result',))
+ytdl_latency = HistogramFamily('bot_ytdl_extraction_duration_seconds', 'yt-dlp extraction duration (cache misses)')
+
+# เวลาของ handler คำสั่ง/event (kind = command หรือ event) และเวลาที่ handler นั้นถือ event loop ไว้
+BLOCKING_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+callback_duration = HistogramFamily('bot_callback_duration_seconds', 'Wall time of command and event handlers',
+                                    ('kind', 'name'))
+callback_blocking = HistogramFamily('bot_callback_blocking_seconds', 'Time command and event handlers held the event loop',
+                                    ('kind', 'name'), BLOCKING_BUCKETS)
+loop_stalls = HistogramFamily('bot_event_loop_stall_seconds', 'Event loop stalls longer than the slow-callback threshold',
+                              buckets=(0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0))
+
+broadcasts = Counter('bot_broadcast_messages_total', 'Broadcast deliveries by outcome', ('broadcast', 'status'))
+welcomes = Counter('bot_welcome_messages_total', 'Welcome messages by kind (channel/dm) and outcome', ('kind', 'status'))
@@ -0,0 +1,229 @@
+import logging
+import threading
+import time
+from collections import deque
+
+import discord
+
+from audio_dsp import FRAME_BYTES, CrossfadeStage
+
+logger = logging.getLogger(__name__)
+
+FRAMES_PER_SECOND = 50
+SILENCE_PCM = b'\x00' * FRAME_BYTES
+
+
+class Deck:
+    """แหล่งเสียงของเพลงหนึ่งเพลงในมิกเซอร์ พร้อม buffer เฟรมที่อ่านไว้ล่วงหน้า"""
+
+    def __init__(self, source, track):
+        self.source = source
+        self.track = track
+        self.frames = 0
+        self.total = int(track.duration * FRAMES_PER_SECOND) if track.duration else None
+        self.buffer = deque()
+        self.finished = False
+
+    def prebuffer(self, count):
+        """อ่านเฟรมแรกๆ เก็บไว้ (เรียกใน thread เพราะรอ ffmpeg เชื่อมต่อ)"""
+        for _ in range(count):
+            frame = self.source.read()
+            if not frame:
+                break
+            self.buffer.append(frame)
+
+    @property
+    def remaining(self):
+        if self.total is None:
+            return None
+        return self.total - self.frames
+
+    def is_opus(self):
+        return self.source.is_opus()
+
+    def read(self):
+        if self.finished:
+            return b''
+        frame = self.buffer.popleft() if self.buffer else self.source.read()
+        if frame:
+            self.frames += 1
+            if self.frames == 1:
+                self.track.mark_first_frame()
+        else:
+            self.finished = True
+        return frame
+
+    def cleanup(self):
+        self.source.cleanup()
+
+
+class MixerSource(discord.AudioSource):
+    """AudioSource ตัวเดียวที่เป็นเจ้าของเสียงออกของ voice client ตลอดคิว
+
+    เพลงถัดไปจะถูกเปิด ffmpeg และอ่านเฟรมแรกๆ ไว้ก่อนเพลงปัจจุบันจบ (on_need_next)
+    พอเพลงปัจจุบันหมดจะสลับไปต่อทันทีแบบไม่มีช่องว่าง หรือ crossfade ถ้าตั้งไว้
+    (ต้องเป็น PCM ทั้งสองฝั่ง) ถ้าเพลงเป็น Opus passthrough และไม่ได้ผสม จะส่งแพ็กเก็ต
+    Opus ผ่านตรงๆ เพราะ AudioPlayer เช็ก is_opus() ทุกเฟรม
+
+    callback ทั้งสองถูกเรียกจาก thread เสียง ต้อง thread-safe (เช่น ใช้
+    asyncio.run_coroutine_threadsafe)
+    """
+
+    def __init__(self, on_track_start, on_need_next, crossfade=0.0, preopen=10.0, wait_next=5.0):
+        self.on_track_start = on_track_start
+        self.on_need_next = on_need_next
+        self.crossfade_frames = int(crossfade * FRAMES_PER_SECOND)
+        self.preopen_frames = int(preopen * FRAMES_PER_SECOND)
+        self.wait_frames = int(wait_next * FRAMES_PER_SECOND)
+        self.current = None
+        self.next = None
+        self._lock = threading.RLock()
+        self._requested = False
+        self._exhausted = False
+        self._waited = 0
+        self._gap_started = None
+        self._opus = False
+        self._fade = CrossfadeStage()
+
+    # ---- เรียกจาก event loop ----
+
+    def queue_next(self, deck):
+        with self._lock:
+            old, self.next = self.next, deck
+            self._exhausted = False
+        if old is not None:
+            old.cleanup()
+
+    def discard_next(self):
+        with self._lock:
+            old, self.next = self.next, None
+            self._requested = False
+        if old is not None:
+            old.cleanup()
+
+    def rearm(self):
+        """คิวเปลี่ยน ให้ขอเพลงถัดไปใหม่อีกครั้ง"""
+        with self._lock:
+            self._exhausted = False
+            self._requested = False
+
+    def no_more(self):
+        """ไม่มีเพลงถัดไปแล้ว เมื่อเพลงปัจจุบันจบให้หยุดเล่น"""
+        with self._lock:
+            self._exhausted = True
+
+    def skip(self):
+        with self._lock:
+            old, self.current = self.current, None
+        if old is not None:
+            old.cleanup()
+
+    def replace_current(self, source):
+        """เปลี่ยน source ของเพลงปัจจุบัน (เช่น สลับจาก passthrough ไป PCM)"""
+        with self._lock:
+            deck = self.current
+            old, deck.source = deck.source, source
+            deck.buffer.clear()
+        old.cleanup()
+
+    @property
+    def current_source(self):
+        deck = self.current
+        return deck.source if deck is not None else None
+
+    def set_volume(self, volume):
+        """ปรับเสียงของ deck ที่ปรับได้ (ทาง PCM)
+
+        เพลงถัดไปที่เตรียมไว้แบบ Opus passthrough ปรับเสียงไม่ได้ จะถูกทิ้งแล้วขอเตรียมใหม่
+        (on_need_next ถูกเรียกอีกครั้งในเฟรมถัดไปถ้าอยู่ในช่วง preopen แล้ว) ส่วน current
+        ให้ playback.set_volume สลับ source เอง
+        """
+        stale = None
+        with self._lock:
+            for deck in (self.current, self.next):
+                if deck is not None and getattr(deck.source, 'adjustable', False):
+                    deck.source.volume = volume
+            if self.next is not None:
+                if volume != 1.0 and not getattr(self.next.source, 'adjustable', False):
+                    stale, self.next = self.next, None
+                    self._requested = False
+            else:
+                # ตัวที่กำลังเตรียมอยู่ใช้ระดับเสียงเก่า ให้ขอใหม่
+                self._requested = False
+        if stale is not None:
+            stale.cleanup()
+
+    # ---- เรียกจาก thread เสียง ----
+
+    def _request_next(self):
+        if not self._requested and self.next is None and not self._exhausted:
+            self._requested = True
+            self.on_need_next()
+
+    def _promote(self):
+        if self.current is not None:
+            self.current.cleanup()
+        self.current, self.next = self.next, None
+        self._requested = False
+        self._waited = 0
+        track = self.current.track
+        if track.requested_at is None:
+            # เวลาที่เงียบอยู่ระหว่างรอเพลงนี้ (ถ้าไม่มีเลยคือ gapless)
+            track.mark_requested('next', self._gap_started)
+        self._gap_started = None
+        self.on_track_start(track)
+
+    def is_opus(self):
+        return self._opus
+
+    def read(self):
+        with self._lock:
+            return self._read_locked()
+
+    def _read_locked(self):
+        current = self.current
+        if current is None or current.finished:
+            if self.next is None:
+                if self._exhausted or self._waited >= self.wait_frames:
+                    return b''
+                # เพลงถัดไปยังเตรียมไม่เสร็จ ส่งความเงียบรอไปก่อนสักพัก
+                if self._gap_started is None:
+                    self._gap_started = time.perf_counter()
+                self._request_next()
+                self._waited += 1
+                self._opus = False
+                return SILENCE_PCM
+            self._promote()
+            current = self.current
+
+        remaining = current.remaining
+        if remaining is None or remaining <= self.preopen_frames:
+            self._request_next()
+
+        nxt = self.next
+        if (self.crossfade_frames and nxt is not None and remaining is not None
+                and remaining <= self.crossfade_frames
+                and not current.is_opus() and not nxt.is_opus()):
+            if remaining <= 0:
+                # ความยาวจาก metadata ปัดเป็นวินาที ถึงเวลาแล้วก็ตัดไปเพลงถัดไปเลย
+                self._promote()
+                return self._read_locked()
+            outgoing = current.read()
+            if outgoing:
+                self._opus = False
+                t = 1.0 - remaining / self.crossfade_frames
+                return self._fade.process(outgoing, nxt.read(), t)
+
+        frame = current.read()
+        if not frame:
+            return self._read_locked()
+        self._opus = current.is_opus()
+        return frame
+
+    def cleanup(self):
+        with self._lock:
+            decks = [self.current, self.next]
+            self.current = self.next = None
+        for deck in decks:
+            if deck is not None:
+                deck.cleanup()
@@ -1,32 +1,89 @@
 import discord
 from discord.ext import commands
-import yt_dlp
 import asyncio
+import contextlib
 import logging
 import os
+import time
+import extractor
+from extractor import ExtractionError
+from music_queue import Track, GuildQueue
+from playback import set_volume, source_pool
+from mixer import Deck, MixerSource
+from channel_policy import ChannelPolicy, load_overrides
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # รายชื่อ channel ที่อนุญาตให้ใช้คำสั่ง
 ALLOWED_CHANNELS = ['music-bot', 'music', 'bot-commands']
+channel_policy = ChannelPolicy(
+    ALLOWED_CHANNELS,
+    load_overrides(os.getenv('CHANNEL_POLICY_PATH', 'channel_policy.json'), 'music'),
+)
+
+# ระดับเสียงเริ่มต้น 1.0 = ไม่ปรับเสียง เล่นแบบ Opus passthrough ได้
+DEFAULT_VOLUME = float(os.getenv('MUSIC_DEFAULT_VOLUME', 1.0))
+
+# จำนวนเพลงถัดไปที่จะ resolve ล่วงหน้าระหว่างเล่นเพลงปัจจุบัน
+PREFETCH_AHEAD = int(os.getenv('MUSIC_PREFETCH_AHEAD', 2))
+QUEUE_PAGE_SIZE = 10
+MAX_QUEUE_SIZE = int(os.getenv('MUSIC_MAX_QUEUE', 500))
+MAX_PLAYLIST_ENTRIES = int(os.getenv('MUSIC_MAX_PLAYLIST', 500))
+
+# มิกเซอร์: เตรียมเพลงถัดไปล่วงหน้าให้ต่อกันไม่มีช่องว่าง (MUSIC_MIXER=0 เพื่อปิด)
+MIXER_ENABLED = os.getenv('MUSIC_MIXER', '1') != '0'
+# crossfade ระหว่างเพลง (วินาที) 0 = ต่อกันแบบ gapless
+CROSSFADE_SECONDS = float(os.getenv('MUSIC_CROSSFADE', 0))
+# จำนวนเฟรม (20ms) ที่อ่านรอไว้ก่อนเริ่มเพลง
+PREBUFFER_FRAMES = 25
+# เปิด ffmpeg ของเพลงถัดไปรอไว้เมื่อเพลงปัจจุบันเหลือไม่เกินกี่วินาที
+# (ต้องน้อยกว่า FFMPEG_PREWARM_TTL ไม่อย่างนั้นตัวที่เปิดไว้จะหมดอายุก่อนได้ใช้)
+PREWARM_LEAD = float(os.getenv('FFMPEG_PREWARM_LEAD', 30))
 
 class Music(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.queues = {}
+
+    async def cog_load(self):
+        # อุ่นเครื่อง worker ของ yt-dlp ไว้ก่อนมีคำสั่ง !play แรก
+        try:
+            await extractor.pool.start()
+        except Exception as e:
+            logger.error(f"Failed to start extraction pool: {e}")
 
     async def cog_check(self, ctx):
         if ctx.guild is None:
             await ctx.send("❌ คำสั่งนี้ใช้ได้เฉพาะในเซิร์ฟเวอร์เท่านั้น")
             return False
 
-        if ctx.channel.name.lower() not in [ch.lower() for ch in ALLOWED_CHANNELS]:
-            allowed_channels_str = ", ".join([f"#{ch}" for ch in ALLOWED_CHANNELS])
-            await ctx.send(f"❌ คำสั่งนี้ใช้ได้เฉพาะในห้อง: {allowed_channels_str}")
+        if not channel_policy.allows(ctx.channel):
+            await ctx.send(f"❌ คำสั่งนี้ใช้ได้เฉพาะในห้อง: {channel_policy.describe(ctx.guild.id)}")
             return False
 
         return True
 
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel):
+        channel_policy.channel_created(channel)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_update(self, before, after):
+        channel_policy.channel_updated(before, after)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel):
+        channel_policy.channel_deleted(channel)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        channel_policy.forget(guild.id)
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        channel_policy.reset()
+
     @commands.command()
     async def join(self, ctx):
         """ให้บอทเข้าห้อง voice ที่ผู้ใช้กำลังอยู่"""
@@ -50,6 +107,9 @@ class Music(commands.Cog):
         """ให้บอทออกจากห้อง voice"""
         try:
             if ctx.voice_client:
+                queue = self.queues.pop(ctx.guild.id, None)
+                if queue is not None:
+                    self.clear_queue(queue)
                 await ctx.voice_client.disconnect()
                 await ctx.send("✅ ออกจากห้อง voice แล้ว")
             else:
@@ -60,7 +120,8 @@ class Music(commands.Cog):
 
     @commands.command()
     async def play(self, ctx, *, url):
-        """เล่นเพลงจาก YouTube (url หรือ keyword)"""
+        """เล่นเพลงจาก YouTube (url หรือ keyword) ถ้ามีเพลงเล่นอยู่จะต่อท้ายคิว"""
+        received = time.perf_counter()
         try:
             if not ctx.author.voice:
                 await ctx.send("❌ คุณต้องอยู่ในห้อง voice ก่อน")
@@ -70,106 +131,367 @@ class Music(commands.Cog):
                 await ctx.author.voice.channel.connect()
                 await ctx.send(f"✅ เข้าร่วมห้อง: {ctx.author.voice.channel}")
 
-            search_msg = await ctx.send("🔍 กำลังค้นหา...")
+            queue = self.get_queue(ctx.guild)
+            queue.text_channel = ctx.channel
+            if extractor.is_playlist(url):
+                await self.play_playlist(ctx, queue, url, received)
+                return
 
-            ydl_opts = {
-                'format': 'bestaudio/best',
-                'quiet': True,
-                'noplaylist': True,
-                'default_search': 'ytsearch',
-                'extractaudio': True,
-                'audioformat': 'opus',
-                'outtmpl': '%(extractor)s-%(id)s-%(title)s.%(ext)s',
-                'restrictfilenames': True,
-                'logtostderr': False,
-                'ignoreerrors': False,
-                'no_warnings': True,
-                'source_address': '0.0.0.0',
-                'socket_timeout': 30
-            }
-
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            track = Track(url, ctx.author)
+
+            if ctx.voice_client.is_playing() or ctx.voice_client.is_paused() or queue.current is not None:
                 try:
-                    info = await asyncio.wait_for(
-                        asyncio.get_event_loop().run_in_executor(
-                            None, lambda: ydl.extract_info(url, download=False)
-                        ),
-                        timeout=30
-                    )
-
-                    if 'entries' in info:
-                        if len(info['entries']) == 0:
-                            await search_msg.edit(content="❌ ไม่พบผลการค้นหา")
-                            return
-                        info = info['entries'][0]
-
-                    audio_url = info.get('url')
-                    title = info.get('title', 'Unknown')
-                    duration = info.get('duration', 0)
-                    uploader = info.get('uploader', 'Unknown')
-
-                    if not audio_url:
-                        await search_msg.edit(content="❌ ไม่สามารถดึง URL เสียงได้")
-                        return
-
-                except asyncio.TimeoutError:
-                    await search_msg.edit(content="❌ หมดเวลาในการค้นหา")
-                    return
-                except Exception as e:
-                    logger.error(f"yt-dlp extraction error: {e}")
-                    await search_msg.edit(content="❌ ไม่สามารถดึงข้อมูลวิดีโอได้")
+                    position = queue.add(track)
+                except IndexError:
+                    await ctx.send("❌ คิวเต็มแล้ว")
                     return
+                self.refresh_preload(ctx.guild)
+                await ctx.send(f"➕ เพิ่มเข้าคิวลำดับที่ {position}: `{url}`")
+                return
 
-            ffmpeg_options = {
-                'before_options': '-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5',
-                'options': '-vn -filter:a "volume=0.5"'
-            }
-
+            # จองตำแหน่งเพลงปัจจุบันไว้ก่อน คำสั่ง !play ที่ตามมาระหว่างค้นหาจะต่อท้ายคิวแทน
+            queue.current = track
+            track.mark_requested('play', received)
+            search_msg = await ctx.send("🔍 กำลังค้นหา...")
             try:
-                if ctx.voice_client.is_playing():
-                    ctx.voice_client.stop()
-
-                source = discord.FFmpegPCMAudio(audio_url, **ffmpeg_options)
-
-                def after_playing(error):
-                    if error:
-                        logger.error(f'Player error: {error}')
-                        asyncio.run_coroutine_threadsafe(
-                            ctx.send(f"❌ ข้อผิดพลาดในการเล่น: {error}"),
-                            self.bot.loop
-                        )
-                    else:
-                        asyncio.run_coroutine_threadsafe(
-                            ctx.send("✅ เล่นเพลงเสร็จสิ้น"),
-                            self.bot.loop
-                        )
-
-                ctx.voice_client.play(source, after=after_playing)
-
-                duration_str = f"{duration // 60}:{duration % 60:02d}" if duration else "Unknown"
-                embed = discord.Embed(
-                    title="🎵 กำลังเล่น",
-                    color=0x00ff00
-                )
-                embed.add_field(name="เพลง", value=title, inline=False)
-                embed.add_field(name="ความยาว", value=duration_str, inline=True)
-                embed.add_field(name="ผู้อัปโหลด", value=uploader, inline=True)
-                embed.set_footer(text=f"ขอโดย {ctx.author.display_name}")
-                
-                await search_msg.edit(content="", embed=embed)
-
+                await track.resolve()
+                await self.start_track(ctx.guild, track)
+            except ExtractionError as e:
+                await search_msg.edit(content=str(e))
+                queue.current = None
+                await self.play_next(ctx.guild)
+                return
             except Exception as e:
                 logger.error(f"Playback error: {e}")
                 await search_msg.edit(content="❌ ไม่สามารถเล่นเสียงได้")
+                queue.current = None
+                await self.play_next(ctx.guild)
+                return
+
+            await search_msg.edit(content="", embed=self.now_playing_embed(track))
 
         except Exception as e:
             logger.error(f"General play command error: {e}")
             await ctx.send("❌ เกิดข้อผิดพลาดที่ไม่คาดคิด")
 
+    async def play_playlist(self, ctx, queue, url, received):
+        """โหลด playlist แบบ flat แล้วเข้าคิวทันที resolve แต่ละเพลงทีหลังตอนใกล้ถึงคิว"""
+        status_msg = await ctx.send("📜 กำลังโหลด playlist...")
+        added = 0
+        try:
+            async with contextlib.aclosing(extractor.iter_playlist(url, MAX_PLAYLIST_ENTRIES)) as entries:
+                async for entry in entries:
+                    if ctx.voice_client is None:
+                        break
+                    track = Track(entry['url'], ctx.author, title=entry['title'])
+                    track.duration = entry['duration'] or 0
+
+                    if queue.current is None and not (ctx.voice_client.is_playing() or ctx.voice_client.is_paused()):
+                        # เพลงแรกเริ่มเล่นได้เลยหลัง resolve เพลงเดียว
+                        queue.current = track
+                        track.mark_requested('play', received)
+                        try:
+                            await track.resolve()
+                            await self.start_track(ctx.guild, track)
+                        except Exception as e:
+                            queue.current = None
+                            logger.error(f"Playlist entry error: {e}")
+                            await ctx.send(f"❌ ไม่สามารถเล่น `{track.title}` ได้ ข้ามไปเพลงถัดไป")
+                            continue
+                        await ctx.send(embed=self.now_playing_embed(track))
+                    else:
+                        try:
+                            queue.add(track)
+                        except IndexError:
+                            await ctx.send("❌ คิวเต็มแล้ว")
+                            break
+                        self.refresh_preload(ctx.guild)
+
+                    added += 1
+                    if added % 50 == 0:
+                        await status_msg.edit(content=f"📜 กำลังโหลด playlist... ({added} เพลง)")
+        except ExtractionError as e:
+            await status_msg.edit(content=str(e))
+            return
+
+        await status_msg.edit(content=f"✅ เพิ่ม {added} เพลงจาก playlist เข้าคิวแล้ว")
+
+    def get_queue(self, guild):
+        queue = self.queues.get(guild.id)
+        if queue is None:
+            queue = self.queues[guild.id] = GuildQueue(prefetch_ahead=PREFETCH_AHEAD, max_size=MAX_QUEUE_SIZE, volume=DEFAULT_VOLUME)
+        return queue
+
+    def now_playing_embed(self, track):
+        embed = discord.Embed(
+            title="🎵 กำลังเล่น",
+            color=0x00ff00
+        )
+        embed.add_field(name="เพลง", value=track.title, inline=False)
+        embed.add_field(name="ความยาว", value=track.duration_str, inline=True)
+        embed.add_field(name="ผู้อัปโหลด", value=track.uploader, inline=True)
+        embed.set_footer(text=f"ขอโดย {track.requester.display_name}")
+        return embed
+
+    async def start_track(self, guild, track):
+        """เริ่มเล่นเพลงที่ resolve แล้ว เมื่อจบจะเล่นเพลงถัดไปในคิวอัตโนมัติ"""
+        queue = self.get_queue(guild)
+
+        def after_playing(error):
+            if error:
+                logger.error(f'Player error: {error}')
+            asyncio.run_coroutine_threadsafe(self.play_next(guild, error), self.bot.loop)
+
+        if not MIXER_ENABLED:
+            source = await source_pool.take(track, volume=queue.volume)
+            source.on_first_frame = track.mark_first_frame
+            guild.voice_client.play(source, after=after_playing)
+            return
+
+        deck = await self.open_deck(queue, track)
+        loop = self.bot.loop
+        mixer = MixerSource(
+            on_track_start=lambda t: loop.call_soon_threadsafe(self.on_track_start, guild, t),
+            on_need_next=lambda: loop.call_soon_threadsafe(self.schedule_preload, guild),
+            crossfade=CROSSFADE_SECONDS,
+        )
+        mixer.queue_next(deck)
+        queue.mixer = mixer
+        guild.voice_client.play(mixer, after=after_playing)
+
+    async def open_deck(self, queue, track):
+        """resolve เพลง เปิด ffmpeg และอ่านเฟรมแรกๆ รอไว้ให้มิกเซอร์"""
+        await track.resolve()
+        source = await source_pool.take(track, volume=queue.volume, force_pcm=CROSSFADE_SECONDS > 0)
+        deck = Deck(source, track)
+        try:
+            await self.bot.loop.run_in_executor(None, deck.prebuffer, PREBUFFER_FRAMES)
+        except BaseException:
+            deck.cleanup()
+            raise
+        return deck
+
+    def schedule_preload(self, guild):
+        queue = self.queues.get(guild.id)
+        if queue is None or queue.mixer is None:
+            return
+        if queue.preload_task is not None and not queue.preload_task.done():
+            queue.preload_task.cancel()
+        queue.preload_task = asyncio.create_task(self.preload_next(guild, queue, queue.mixer))
+
+    async def preload_next(self, guild, queue, mixer):
+        """เตรียมเพลงแรกในคิวให้มิกเซอร์ ก่อนเพลงปัจจุบันจบ"""
+        while queue.entries:
+            track = queue.entries[0]
+            try:
+                deck = await self.open_deck(queue, track)
+            except ExtractionError as e:
+                if queue.entries and queue.entries[0] is track:
+                    queue.entries.popleft()
+                await queue.text_channel.send(f"{e} (`{track.query}`) ข้ามไปเพลงถัดไป")
+                continue
+            except Exception as e:
+                logger.error(f"Preload error: {e}")
+                if queue.entries and queue.entries[0] is track:
+                    queue.entries.popleft()
+                await queue.text_channel.send(f"❌ ไม่สามารถเล่น `{track.title}` ได้ ข้ามไปเพลงถัดไป")
+                continue
+
+            if queue.mixer is not mixer or not queue.entries or queue.entries[0] is not track:
+                # คิวเปลี่ยนระหว่างเตรียม refresh_preload จะขอใหม่เอง
+                deck.cleanup()
+                return
+            mixer.queue_next(deck)
+            return
+        mixer.no_more()
+
+    def warm_head(self, queue):
+        """เปิด ffmpeg ของเพลงหัวคิวรอไว้ใน source_pool ปิดตัวเก่าถ้าหัวคิวเปลี่ยน"""
+        head = queue.entries[0] if queue.entries else None
+        if queue.warmed is head:
+            return
+        if queue.warm_task is not None:
+            queue.warm_task.cancel()
+            queue.warm_task = None
+        if queue.warmed is not None:
+            source_pool.discard(queue.warmed)
+        queue.warmed = head
+        if head is not None:
+            queue.warm_task = asyncio.create_task(self._warm(queue, head))
+
+    @staticmethod
+    def warm_delay(queue):
+        """วินาทีที่ต้องรอก่อนเปิด ffmpeg ของหัวคิว ให้เปิดตอนเพลงปัจจุบันใกล้จบ
+
+        ttl ของ source_pool นับจากตอนเปิด ถ้าเปิดตั้งแต่เพลงปัจจุบันเริ่ม เพลงที่ยาวกว่า
+        ttl จะทำให้ตัวที่เปิดไว้ถูกปิดทิ้งก่อนถึงคิว (ไม่รู้ความยาวหรือไม่มีเพลงเล่นอยู่ = เปิดเลย)
+        """
+        current = queue.current
+        if current is None or not current.duration or queue.started_at is None:
+            return 0.0
+        remaining = current.duration - (time.monotonic() - queue.started_at)
+        return max(0.0, remaining - PREWARM_LEAD)
+
+    async def _warm(self, queue, track):
+        try:
+            await track.resolve()
+        except Exception:
+            # ข้อผิดพลาดจะถูกแจ้งตอนถึงคิวเพลงนี้จริง
+            return
+        delay = self.warm_delay(queue)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if queue.warmed is track:
+            source_pool.warm(track, volume=queue.volume, force_pcm=MIXER_ENABLED and CROSSFADE_SECONDS > 0)
+
+    def clear_queue(self, queue):
+        if queue.warmed is not None:
+            source_pool.discard(queue.warmed)
+        queue.clear()
+
+    def refresh_preload(self, guild):
+        """เรียกหลังคิวเปลี่ยน ให้เพลงที่เตรียมไว้ตรงกับหัวคิวเสมอ"""
+        queue = self.queues.get(guild.id)
+        if queue is None:
+            return
+        self.warm_head(queue)
+        if queue.mixer is None:
+            return
+        mixer = queue.mixer
+        head = queue.entries[0] if queue.entries else None
+        if mixer.next is not None:
+            if mixer.next.track is not head:
+                mixer.discard_next()
+        elif queue.preload_task is None or queue.preload_task.done():
+            mixer.rearm()
+
+    def on_track_start(self, guild, track):
+        """มิกเซอร์เริ่มเพลงใหม่แล้ว (เรียกบน event loop)"""
+        queue = self.queues.get(guild.id)
+        if queue is None or queue.current is track:
+            return
+        try:
+            queue.entries.remove(track)
+        except ValueError:
+            pass
+        queue.current = track
+        queue.started_at = time.monotonic()
+        queue.prefetch()
+        self.warm_head(queue)
+        asyncio.create_task(queue.text_channel.send(embed=self.now_playing_embed(track)))
+
+    async def play_next(self, guild, error=None):
+        """เล่นเพลงถัดไปในคิว (เรียกเมื่อเพลงก่อนหน้าจบ)"""
+        queue = self.queues.get(guild.id)
+        if queue is None:
+            return
+        channel = queue.text_channel
+        queue.mixer = None
+
+        if error:
+            await channel.send(f"❌ ข้อผิดพลาดในการเล่น: {error}")
+
+        while True:
+            voice_client = guild.voice_client
+            if voice_client is None or not voice_client.is_connected():
+                self.clear_queue(queue)
+                return
+            if voice_client.is_playing() or voice_client.is_paused():
+                return
+
+            had_current = queue.current is not None
+            track = queue.next()
+            if track is None:
+                if had_current:
+                    await channel.send("✅ เล่นเพลงในคิวจบแล้ว")
+                return
+            if track.requested_at is None:
+                track.mark_requested('next')
+
+            try:
+                await track.resolve()
+                await self.start_track(guild, track)
+            except ExtractionError as e:
+                await channel.send(f"{e} (`{track.query}`) ข้ามไปเพลงถัดไป")
+                continue
+            except Exception as e:
+                logger.error(f"Playback error: {e}")
+                await channel.send(f"❌ ไม่สามารถเล่น `{track.title}` ได้ ข้ามไปเพลงถัดไป")
+                continue
+
+            self.warm_head(queue)
+            await channel.send(embed=self.now_playing_embed(track))
+            return
+
+    @commands.command()
+    async def queue(self, ctx):
+        """แสดงคิวเพลง"""
+        queue = self.queues.get(ctx.guild.id)
+        if queue is None or (queue.current is None and not queue.entries):
+            await ctx.send("📭 คิวว่างอยู่")
+            return
+
+        embed = discord.Embed(title="📜 คิวเพลง", color=0x0099ff)
+        if queue.current is not None:
+            embed.add_field(name="กำลังเล่น", value=f"{queue.current.title} ({queue.current.duration_str})", inline=False)
+
+        lines = []
+        for i, track in enumerate(list(queue.entries)[:QUEUE_PAGE_SIZE], start=1):
+            marker = "" if track.resolved else " ⏳"
+            lines.append(f"**{i}.** {track.title}{marker}")
+        if len(queue.entries) > QUEUE_PAGE_SIZE:
+            lines.append(f"...และอีก {len(queue.entries) - QUEUE_PAGE_SIZE} เพลง")
+        if lines:
+            embed.add_field(name=f"ถัดไป ({len(queue.entries)} เพลง)", value="\n".join(lines), inline=False)
+
+        await ctx.send(embed=embed)
+
+    @commands.command()
+    async def skip(self, ctx):
+        """ข้ามเพลงปัจจุบัน"""
+        if ctx.voice_client and (ctx.voice_client.is_playing() or ctx.voice_client.is_paused()):
+            queue = self.queues.get(ctx.guild.id)
+            if queue is not None and queue.entries:
+                queue.entries[0].mark_requested('next')
+            if queue is not None and queue.mixer is not None and ctx.voice_client.source is queue.mixer:
+                # มิกเซอร์จะต่อเพลงที่เตรียมไว้ให้ทันที
+                queue.mixer.skip()
+            else:
+                # after callback จะเล่นเพลงถัดไปให้เอง
+                ctx.voice_client.stop()
+            await ctx.send("⏭️ ข้ามเพลงแล้ว")
+        else:
+            await ctx.send("❌ ไม่มีเพลงที่กำลังเล่นอยู่")
+
+    @commands.command()
+    async def remove(self, ctx, index: int):
+        """ลบเพลงออกจากคิวตามลำดับ"""
+        queue = self.queues.get(ctx.guild.id)
+        if queue is None or not 1 <= index <= len(queue):
+            await ctx.send("❌ ไม่พบเพลงลำดับนี้ในคิว")
+            return
+        track = queue.remove(index)
+        self.refresh_preload(ctx.guild)
+        await ctx.send(f"🗑️ ลบ `{track.title}` ออกจากคิวแล้ว")
+
+    @commands.command()
+    async def move(self, ctx, src: int, dst: int):
+        """ย้ายลำดับเพลงในคิว"""
+        queue = self.queues.get(ctx.guild.id)
+        if queue is None or not 1 <= src <= len(queue) or not 1 <= dst <= len(queue):
+            await ctx.send("❌ ไม่พบเพลงลำดับนี้ในคิว")
+            return
+        track = queue.move(src, dst)
+        self.refresh_preload(ctx.guild)
+        await ctx.send(f"🔀 ย้าย `{track.title}` ไปลำดับที่ {dst}")
+
     @commands.command()
     async def stop(self, ctx):
-        """หยุดเล่นเพลง"""
-        if ctx.voice_client and ctx.voice_client.is_playing():
+        """หยุดเล่นเพลงและล้างคิว"""
+        queue = self.queues.get(ctx.guild.id)
+        if queue is not None:
+            self.clear_queue(queue)
+        if ctx.voice_client and (ctx.voice_client.is_playing() or ctx.voice_client.is_paused()):
             ctx.voice_client.stop()
             await ctx.send("⏹️ หยุดเล่นเพลงแล้ว")
         else:
@@ -204,11 +526,13 @@ class Music(commands.Cog):
             await ctx.send("❌ ระดับเสียงต้องอยู่ระหว่าง 0-100")
             return
 
-        if ctx.voice_client and hasattr(ctx.voice_client.source, 'volume'):
-            ctx.voice_client.source.volume = volume / 100
+        queue = self.get_queue(ctx.guild)
+        queue.volume = volume / 100
+        if ctx.voice_client and ctx.voice_client.source and queue.current is not None:
+            await set_volume(ctx.voice_client, queue.current, queue.volume)
             await ctx.send(f"🔊 ตั้งระดับเสียงเป็น {volume}%")
         else:
-            await ctx.send("❌ ไม่มีเสียงที่กำลังเล่นอยู่หรือไม่สามารถปรับเสียงได้")
+            await ctx.send(f"🔊 ตั้งระดับเสียงเป็น {volume}% (มีผลกับเพลงถัดไป)")
 
     @commands.command()
     async def status(self, ctx):
@@ -247,8 +571,12 @@ class Music(commands.Cog):
         commands_list = [
             ("!join", "ให้บอทเข้าห้อง voice"),
             ("!leave", "ให้บอทออกจากห้อง voice"),
-            ("!play <เพลง>", "เล่นเพลงจาก YouTube"),
-            ("!stop", "หยุดเล่นเพลง"),
+            ("!play <เพลง/playlist>", "เล่นเพลงจาก YouTube (ต่อท้ายคิวถ้ามีเพลงเล่นอยู่)"),
+            ("!queue", "ดูคิวเพลง"),
+            ("!skip", "ข้ามเพลงปัจจุบัน"),
+            ("!remove <ลำดับ>", "ลบเพลงออกจากคิว"),
+            ("!move <จาก> <ไป>", "ย้ายลำดับเพลงในคิว"),
+            ("!stop", "หยุดเล่นเพลงและล้างคิว"),
             ("!pause", "หยุดเพลงชั่วคราว"),
             ("!resume", "เล่นเพลงต่อ"),
             ("!volume <0-100>", "ปรับระดับเสียง"),
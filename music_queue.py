@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+import metrics
+from extractor import extract_info
+
+logger = logging.getLogger(__name__)
+
+
+class Track:
+    """เพลงหนึ่งรายการในคิว ข้อมูล stream จะถูก resolve ทีหลัง (หรือล่วงหน้าตอน prefetch)"""
+
+    __slots__ = ("query", "requester", "title", "duration", "uploader", "stream_url", "info", "_task",
+                 "requested_at", "trigger")
+
+    def __init__(self, query, requester, title=None):
+        self.query = query
+        self.requester = requester
+        self.title = title or query
+        self.duration = 0
+        self.uploader = 'Unknown'
+        self.stream_url = None
+        self.info = None
+        self._task = None
+        self.requested_at = None
+        self.trigger = None
+
+    @property
+    def resolved(self):
+        return self.stream_url is not None
+
+    def apply(self, info):
+        self.info = info
+        self.stream_url = info.get('url')
+        self.title = info.get('title', 'Unknown')
+        self.duration = info.get('duration') or 0
+        self.uploader = info.get('uploader', 'Unknown')
+
+    def prefetch(self):
+        """เริ่ม resolve ใน background ถ้ายังไม่ได้เริ่ม"""
+        if self._task is None and not self.resolved:
+            self._task = asyncio.create_task(self._resolve())
+        return self._task
+
+    async def _resolve(self):
+        self.apply(await extract_info(self.query))
+        return self
+
+    async def resolve(self):
+        if self.resolved:
+            return self
+        return await self.prefetch()
+
+    def mark_requested(self, trigger, at=None):
+        """เริ่มจับเวลา time-to-first-audio (trigger: 'play' หรือ 'next')"""
+        self.requested_at = time.perf_counter() if at is None else at
+        self.trigger = trigger
+
+    def mark_first_frame(self):
+        """เรียกเมื่อเฟรมแรกของเพลงถูกส่งออก (จาก thread เสียง)"""
+        if self.requested_at is None:
+            return
+        elapsed = time.perf_counter() - self.requested_at
+        self.requested_at = None
+        metrics.ttfa.observe(elapsed, self.trigger)
+        logger.info(f"Time to first audio ({self.trigger}) for {self.title}: {elapsed * 1000:.0f} ms")
+
+    def cancel(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+
+    @property
+    def duration_str(self):
+        duration = int(self.duration)
+        return f"{duration // 60}:{duration % 60:02d}" if duration else "Unknown"
+
+
+class GuildQueue:
+    """คิวเพลงของแต่ละ guild พร้อม resolve เพลงถัดไปล่วงหน้าระหว่างที่เพลงปัจจุบันเล่นอยู่"""
+
+    def __init__(self, prefetch_ahead=2, max_size=200, volume=1.0):
+        self.entries = deque()
+        self.volume = volume
+        self.mixer = None
+        self.preload_task = None
+        self.warmed = None
+        self.warm_task = None
+        self.current = None
+        self.started_at = None  # time.monotonic() ตอนเพลงปัจจุบันเริ่ม
+        self.text_channel = None
+        self.prefetch_ahead = prefetch_ahead
+        self.max_size = max_size
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, track):
+        """เพิ่มเพลงท้ายคิว คืนตำแหน่ง (เริ่มที่ 1)"""
+        if len(self.entries) >= self.max_size:
+            raise IndexError("queue is full")
+        self.entries.append(track)
+        self.prefetch()
+        return len(self.entries)
+
+    def next(self):
+        self.current = self.entries.popleft() if self.entries else None
+        self.started_at = time.monotonic()
+        self.prefetch()
+        return self.current
+
+    def remove(self, index):
+        """ลบเพลงตำแหน่ง index (เริ่มที่ 1)"""
+        track = self.entries[index - 1]
+        del self.entries[index - 1]
+        track.cancel()
+        self.prefetch()
+        return track
+
+    def move(self, src, dst):
+        """ย้ายเพลงจากตำแหน่ง src ไป dst (เริ่มที่ 1)"""
+        track = self.entries[src - 1]
+        del self.entries[src - 1]
+        self.entries.insert(dst - 1, track)
+        self.prefetch()
+        return track
+
+    def prefetch(self):
+        for i in range(min(self.prefetch_ahead, len(self.entries))):
+            self.entries[i].prefetch()
+
+    def clear(self):
+        for track in self.entries:
+            track.cancel()
+        if self.preload_task is not None:
+            self.preload_task.cancel()
+            self.preload_task = None
+        if self.warm_task is not None:
+            self.warm_task.cancel()
+            self.warm_task = None
+        self.entries.clear()
+        self.current = None
+        self.started_at = None
+        self.warmed = None
+        self.mixer = None
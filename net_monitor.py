@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import math
+import time
+from array import array
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+SPARK_CHARS = '▁▂▃▄▅▆▇█'
+
+
+class RingBuffer:
+    """เก็บค่าล่าสุด size ค่าใน array ขนาดคงที่ (เขียนทับค่าเก่าสุด)"""
+
+    def __init__(self, size):
+        self.size = size
+        self._data = array('d', bytes(8 * size))
+        self._next = 0
+        self.count = 0
+
+    def append(self, value):
+        self._data[self._next] = value
+        self._next = (self._next + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+
+    def values(self):
+        """ค่าทั้งหมดเรียงจากเก่าไปใหม่"""
+        if self.count < self.size:
+            return self._data[:self.count].tolist()
+        return (self._data[self._next:] + self._data[:self._next]).tolist()
+
+    @property
+    def last(self):
+        return self._data[self._next - 1] if self.count else None
+
+    def percentile(self, p):
+        if not self.count:
+            return None
+        ordered = sorted(self._data[:self.count])
+        return ordered[min(self.count - 1, int(self.count * p))]
+
+    def sparkline(self, width=30):
+        values = self.values()[-width:]
+        if not values:
+            return ''
+        low, high = min(values), max(values)
+        span = high - low or 1.0
+        top = len(SPARK_CHARS) - 1
+        return ''.join(SPARK_CHARS[round((v - low) / span * top)] for v in values)
+
+
+class ConnectionMonitor:
+    """วัดคุณภาพการเชื่อมต่อเป็นระยะใน background แล้วเก็บประวัติไว้ใน RingBuffer
+
+    ค่าที่วัด (มิลลิวินาที): gateway = heartbeat latency, rest = round-trip ของ REST API,
+    dns = เวลา resolve ชื่อ (getaddrinfo ของ event loop ไม่บล็อก loop),
+    loop_lag = sleep ที่ช้ากว่ากำหนด คำสั่งและหน้าสถานะอ่านจากประวัตินี้ ไม่ต้องวัดใหม่
+    """
+
+    SERIES = ('gateway', 'rest', 'dns', 'loop_lag')
+
+    def __init__(self, bot, interval=30.0, size=120, rest_url='https://discord.com/api/v10/gateway',
+                 dns_host='discord.com', lag_probe=0.1):
+        self.bot = bot
+        self.interval = interval
+        self.rest_url = rest_url
+        self.dns_host = dns_host
+        self.lag_probe = lag_probe
+        self.history = {name: RingBuffer(size) for name in self.SERIES}
+        self.failures = {name: 0 for name in self.SERIES}
+        self.sampled_at = None
+        self._session = None
+        self._task = None
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=1, keepalive_timeout=self.interval * 2),
+                timeout=aiohttp.ClientTimeout(total=10),
+            )
+        return self._session
+
+    async def _probe_rest(self):
+        start = time.perf_counter()
+        async with self._get_session().get(self.rest_url) as resp:
+            await resp.read()
+            if resp.status >= 500:
+                raise RuntimeError(f"status {resp.status}")
+        return time.perf_counter() - start
+
+    async def _probe_dns(self):
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        await loop.getaddrinfo(self.dns_host, 443)
+        return time.perf_counter() - start
+
+    async def _probe_loop_lag(self):
+        start = time.perf_counter()
+        await asyncio.sleep(self.lag_probe)
+        return max(0.0, time.perf_counter() - start - self.lag_probe)
+
+    def _record(self, name, result):
+        if isinstance(result, BaseException):
+            self.failures[name] += 1
+            logger.debug(f"Connection probe {name} failed: {result!r}")
+        else:
+            self.history[name].append(result * 1000)
+
+    async def sample(self):
+        latency = self.bot.latency
+        if not math.isnan(latency) and not math.isinf(latency):
+            self.history['gateway'].append(latency * 1000)
+
+        results = await asyncio.gather(
+            self._probe_rest(), self._probe_dns(), self._probe_loop_lag(),
+            return_exceptions=True,
+        )
+        for name, result in zip(('rest', 'dns', 'loop_lag'), results):
+            self._record(name, result)
+        self.sampled_at = time.time()
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sample()
+            except Exception as e:
+                logger.error(f"Connection monitor sample failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def summary(self, name):
+        """{'last', 'p50', 'p95', 'max', 'samples', 'spark'} ของค่าที่วัด (ms) หรือ None ถ้ายังไม่มีข้อมูล"""
+        ring = self.history[name]
+        if not ring.count:
+            return None
+        return {
+            'last': round(ring.last, 1),
+            'p50': round(ring.percentile(0.5), 1),
+            'p95': round(ring.percentile(0.95), 1),
+            'max': round(max(ring.values()), 1),
+            'samples': ring.count,
+            'failures': self.failures[name],
+            'spark': ring.sparkline(),
+        }
+
+    def snapshot(self):
+        return {name: self.summary(name) for name in self.SERIES}
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
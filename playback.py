@@ -0,0 +1,228 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+
+import discord
+
+from audio_cache import AudioCache, CachedOpusSource
+from audio_dsp import GainTransformer, OpusPassthrough
+from mixer import MixerSource
+from voice_workers import RemoteOpusSource, VoiceWorkerPool
+
+logger = logging.getLogger(__name__)
+
+BEFORE_OPTIONS = '-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5'
+
+# codec ที่ Discord รับได้ตรงๆ โดยไม่ต้อง decode/encode ใหม่
+PASSTHROUGH_CODECS = {'opus'}
+
+stats = {'opus_passthrough': 0, 'pcm': 0, 'local_file': 0, 'voice_worker': 0}
+
+# cache เสียงบนดิสก์ (เปิดใช้เมื่อกำหนด AUDIO_CACHE_DIR)
+audio_cache = None
+if os.getenv('AUDIO_CACHE_DIR'):
+    audio_cache = AudioCache(
+        os.getenv('AUDIO_CACHE_DIR'),
+        max_bytes=int(os.getenv('AUDIO_CACHE_BYTES', 2 * 1024 ** 3)),
+        min_plays=int(os.getenv('AUDIO_CACHE_MIN_PLAYS', 3)),
+    )
+
+# decode/encode เสียงใน process แยก (เปิดใช้เมื่อกำหนด VOICE_WORKERS > 0)
+voice_workers = None
+if int(os.getenv('VOICE_WORKERS', 0)) > 0:
+    voice_workers = VoiceWorkerPool(int(os.getenv('VOICE_WORKERS')))
+
+
+async def probe_codec(track):
+    """หา codec ของเสียง ใช้ข้อมูลจาก yt-dlp ก่อน ถ้าไม่มีค่อย ffprobe"""
+    info = track.info or {}
+    codec = info.get('acodec')
+    if codec and codec != 'none':
+        return codec.split('.')[0].lower()
+    try:
+        codec, _ = await discord.FFmpegOpusAudio.probe(track.stream_url)
+    except Exception as e:
+        logger.warning(f"Codec probe failed for {track.title}: {e}")
+        return None
+    return codec
+
+
+async def create_source(track, volume=1.0, start=0.0, force_pcm=False):
+    """สร้าง AudioSource ของเพลง
+
+    ถ้าต้นทางเป็น Opus อยู่แล้วและไม่ต้องปรับเสียง จะส่งแพ็กเก็ต Opus ผ่านไปตรงๆ
+    (ffmpeg -c:a copy) ไม่ต้อง decode เป็น PCM แล้ว encode ใหม่ทุกเฟรม ซึ่งเป็นงาน
+    ที่กิน CPU มากที่สุดต่อ voice connection ใช้ทาง PCM + GainTransformer เฉพาะ
+    เมื่อต้องปรับเสียงจริงๆ
+
+    ถ้าเปิด voice_workers งาน ffmpeg/gain/encode จะไปอยู่ใน worker process แทน
+    (ยกเว้นเมื่อต้องการ PCM จริงๆ เช่น crossfade ในมิกเซอร์)
+
+    source ที่ได้มี from_cache บอกว่าอ่านจากไฟล์ใน audio_cache หรือไม่
+    """
+    cached_path = audio_cache.lookup(track) if audio_cache is not None else None
+    source = await _open_source(track, cached_path, volume, start, force_pcm)
+    source.from_cache = cached_path is not None
+    return source
+
+
+async def _open_source(track, cached_path, volume, start, force_pcm):
+    source_url = cached_path or track.stream_url
+    before_options = '' if cached_path else BEFORE_OPTIONS
+    if start > 0:
+        before_options = f'-ss {start:.2f} {before_options}'
+
+    codec = None
+    if volume == 1.0 and not force_pcm:
+        if cached_path and start == 0:
+            stats['local_file'] += 1
+            return OpusPassthrough(CachedOpusSource(cached_path))
+        codec = 'opus' if cached_path else await probe_codec(track)
+
+    if voice_workers is not None and not force_pcm:
+        stats['voice_worker'] += 1
+        return voice_workers.open(source_url, before_options, volume=volume,
+                                  passthrough=codec in PASSTHROUGH_CODECS)
+
+    if codec in PASSTHROUGH_CODECS:
+        stats['opus_passthrough'] += 1
+        return OpusPassthrough(discord.FFmpegOpusAudio(
+            source_url,
+            codec='copy',
+            before_options=before_options,
+            options='-vn',
+        ))
+
+    stats['pcm'] += 1
+    source = discord.FFmpegPCMAudio(source_url, before_options=before_options, options='-vn')
+    return GainTransformer(source, volume=volume)
+
+
+async def set_volume(voice_client, track, volume):
+    """ปรับเสียงของเพลงที่กำลังเล่น
+
+    ถ้าเป็นทาง PCM จะมีผลในเฟรมถัดไปทันที ถ้ากำลังเล่นแบบ Opus passthrough
+    ต้องสลับไปทาง PCM ครั้งเดียว โดยเริ่ม ffmpeg ใหม่ที่ตำแหน่งเดิม
+    """
+    source = voice_client.source
+    mixer = source if isinstance(source, MixerSource) else None
+    if mixer is not None:
+        mixer.set_volume(volume)
+        source = mixer.current_source
+
+    if getattr(source, 'adjustable', False):
+        source.volume = volume
+        return
+    if isinstance(source, (OpusPassthrough, RemoteOpusSource)) and volume != 1.0:
+        new_source = await create_source(track, volume=volume, start=source.position)
+        new_source.frames = source.frames
+        if mixer is not None:
+            mixer.replace_current(new_source)
+        else:
+            if not new_source.is_opus() and voice_client.encoder is discord.utils.MISSING:
+                # play() สร้าง encoder เฉพาะเมื่อ source แรกไม่ใช่ Opus ส่วน setter ของ
+                # source ไม่สร้างให้ ถ้าเริ่มแบบ passthrough เฟรม PCM แรกจะ encode ไม่ได้
+                voice_client.encoder = discord.opus.Encoder()
+            voice_client.source = new_source
+            source.cleanup()
+
+
+class SourcePool:
+    """เปิด ffmpeg ของเพลงในคิวรอไว้ล่วงหน้า (จำนวนจำกัด)
+
+    ffmpeg จะเริ่ม process, เชื่อมต่อ HTTP และ probe ไปก่อนระหว่างที่เพลงก่อนหน้ายังเล่นอยู่
+    พอถึงคิวจริงก็หยิบไปใช้ได้ทันที ตัวที่ไม่ได้ใช้ภายใน ttl วินาทีจะถูกปิดทิ้ง
+    """
+
+    def __init__(self, max_size=2, ttl=120.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # track -> (options, task, created)
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.discarded = 0
+
+    @staticmethod
+    def _close(task):
+        if not task.done():
+            task.cancel()
+        elif not task.cancelled() and task.exception() is None:
+            task.result().cleanup()
+
+    def _expire(self):
+        now = time.monotonic()
+        for track, (_, task, created) in list(self._entries.items()):
+            if now - created > self.ttl:
+                del self._entries[track]
+                self._close(task)
+                self.expired += 1
+
+    def warm(self, track, volume=1.0, force_pcm=False):
+        """เริ่มเปิด source ของเพลงที่ resolve แล้วใน background"""
+        if not self.max_size or not track.resolved or track in self._entries:
+            return
+        self._expire()
+        while len(self._entries) >= self.max_size:
+            _, (_, task, _) = self._entries.popitem(last=False)
+            self._close(task)
+            self.discarded += 1
+        task = asyncio.create_task(create_source(track, volume=volume, force_pcm=force_pcm))
+        self._entries[track] = ((volume, force_pcm), task, time.monotonic())
+
+    def discard(self, track):
+        entry = self._entries.pop(track, None)
+        if entry is not None:
+            self._close(entry[1])
+            self.discarded += 1
+
+    async def take(self, track, volume=1.0, force_pcm=False):
+        """คืน source ที่เปิดรอไว้ ถ้าไม่มี (หรือเงื่อนไขไม่ตรง) จะเปิดใหม่
+
+        เป็นจุดเดียวที่นับว่าเพลงถูกเล่นจริง (warm ที่ถูกทิ้งหรือเปิดซ้ำไม่นับ)
+        """
+        self._expire()
+        source = None
+        entry = self._entries.pop(track, None)
+        if entry is not None:
+            options, task, _ = entry
+            if options == (volume, force_pcm):
+                try:
+                    source = await task
+                except Exception as e:
+                    logger.warning(f"Pre-warmed source failed for {track.title}: {e}")
+                else:
+                    self.hits += 1
+            else:
+                self._close(task)
+                self.discarded += 1
+        if source is None:
+            self.misses += 1
+            source = await create_source(track, volume=volume, force_pcm=force_pcm)
+        if audio_cache is not None:
+            audio_cache.record_play(track, from_cache=source.from_cache)
+        return source
+
+    def clear(self):
+        for _, task, _ in self._entries.values():
+            self._close(task)
+        self._entries.clear()
+
+    def stats(self):
+        taken = self.hits + self.misses
+        return {
+            'warm': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / taken, 3) if taken else 0.0,
+            'expired': self.expired,
+            'discarded': self.discarded,
+        }
+
+
+source_pool = SourcePool(
+    max_size=int(os.getenv('FFMPEG_PREWARM', 2)),
+    ttl=float(os.getenv('FFMPEG_PREWARM_TTL', 120)),
+)
@@ -0,0 +1,210 @@
+"""ตัวกรองคำหยาบของ on_message
+
+คำทั้งหมดของแต่ละ guild ถูก compile เป็น automaton Aho-Corasick ตัวเดียว สแกนข้อความ
+รอบเดียวเวลาเป็นเส้นตรงตามความยาวข้อความ ไม่ขึ้นกับจำนวนคำ ก่อนสแกนจะ normalize
+ข้อความ (ตัวพิมพ์เล็ก, leetspeak, ตัดอักษรความกว้างศูนย์, ย่อตัวอักษรที่ซ้ำเกินสองตัว) และรวม
+ตัวอักษรเดี่ยวที่คั่นด้วยช่องว่าง/เครื่องหมายติดกันเป็นคำเดียว เพื่อกันการเลี่ยงแบบ "k.u.y",
+"ค ว ย" หรือแทรก U+200B ถ้าไม่เจอจะสแกนซ้ำอีกรอบด้วยข้อความที่ยุบตัวซ้ำทั้งหมด ("kuuuy")
+รอบนี้จับได้เฉพาะคำที่ไม่มีตัวอักษรซ้ำติดกัน คำอย่าง "ass" จึงไม่ไปตรงกับ "as" ในข้อความปกติ
+ส่วนช่องว่างระหว่างคำปกติยังคงอยู่ และคำภาษาอังกฤษ
+ต้องตรงทั้งคำ ("thank u yeah", "pick u yesterday" จึงไม่ถูกจับ) คำภาษาไทยจับได้กลางข้อความ
+เพราะภาษาไทยไม่เว้นวรรคระหว่างคำ
+
+รายการคำอยู่ในไฟล์ JSON (PROFANITY_PATH):
+    {"default": ["..."], "guilds": {"<guild id>": ["..."]}}
+guild ที่มีรายการของตัวเองจะใช้ default + รายการนั้น แก้ไฟล์แล้วโหลดใหม่เองภายใน
+reload_interval วินาทีโดยไม่ต้องรีสตาร์ทบอท
+"""
+import json
+import logging
+import os
+import re
+import string
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TERMS = ('kuy', 'ควย')
+
+LEET = {'0': 'o', '1': 'i', '3': 'e', '4': 'a', '5': 's', '7': 't', '8': 'b',
+        '@': 'a', '$': 's', '!': 'i', '|': 'i', '+': 't'}
+ZERO_WIDTH = '\u200b\u200c\u200d\u2060\ufeff\u00ad'
+SEPARATORS = string.whitespace + string.punctuation + '\u00a0\u3000' + 'ฯๆ๏๚๛'
+
+_SEP = re.escape(SEPARATORS)
+_STRIP = str.maketrans({ch: None for ch in ZERO_WIDTH})
+_DIGITS = str.maketrans({ch: repl for ch, repl in LEET.items() if ch.isdigit()})
+# เครื่องหมายที่ใช้แทนตัวอักษร (k@y, $hit) นับเฉพาะตอนอยู่กลางคำ ไม่ใช่ตัวคั่นคำ
+_INNER_LEET = re.compile(rf'(?<=[^{_SEP}])[@$!|+](?=[^{_SEP}])')
+_TOKENS = re.compile(rf'[^{_SEP}]+')
+_LONG_RUNS = re.compile(r'(.)\1{2,}', re.DOTALL)
+_REPEATS = re.compile(r'(.)\1+', re.DOTALL)
+
+
+def normalize(text):
+    """ทำให้ข้อความอยู่ในรูปเดียวกับคำในรายการก่อนจับคู่ (คำคั่นด้วยช่องว่างหนึ่งช่อง)
+
+    ตัวอักษรเดี่ยวที่อยู่ติดกันตั้งแต่สองตัวขึ้นไป ("k u y", "K.U.Y") รวมเป็นคำเดียว
+    คำอื่นๆ คงขอบเขตเดิมไว้
+    """
+    text = text.lower().translate(_STRIP)
+    text = _INNER_LEET.sub(lambda m: LEET[m.group()], text).translate(_DIGITS)
+    words = []
+    run = []
+    for token in _TOKENS.findall(text):
+        if len(token) == 1:
+            run.append(token)
+            continue
+        if run:
+            words.append(''.join(run) if len(run) > 1 else run[0])
+            run = []
+        words.append(token)
+    if run:
+        words.append(''.join(run) if len(run) > 1 else run[0])
+    return _LONG_RUNS.sub(r'\1\1', ' '.join(words))
+
+
+def _is_word_char(ch):
+    return ch.isascii() and ch.isalnum()
+
+
+class Automaton:
+    """Aho-Corasick แบบ dict ต่อโหนด (อักษรไทยและ unicode อื่นๆ ใช้ได้ตรงๆ)
+
+    คำที่เป็นอักษรละติน/ตัวเลขล้วนต้องมีขอบคำทั้งสองด้าน คำภาษาอื่นจับได้ทุกตำแหน่ง
+    """
+
+    def __init__(self, terms):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]  # คำทั้งหมดที่จบที่โหนดนี้ (รวมจาก fail link)
+        self.terms = set()
+        for term in terms:
+            key = normalize(term)
+            if key:
+                self.terms.add(key)
+                self._add(key)
+        self._build()
+
+    def _add(self, key):
+        node = 0
+        for ch in key:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            node = nxt
+        self._out[node] = (key,)
+
+    def _build(self):
+        queue = list(self._goto[0].values())
+        for node in queue:
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                if node:
+                    self._fail[child] = self._goto[fail].get(ch, 0)
+                # สืบผลลัพธ์จาก fail link ให้ตอนสแกนไม่ต้องเดินต่อ
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def search(self, normalized):
+        """คืนคำแรกที่พบในข้อความที่ normalize แล้ว หรือ None
+
+        ถ้าไม่เจอจะลองกับข้อความที่ยุบตัวอักษรซ้ำทั้งหมดอีกรอบ ข้อความรูปนี้ไม่มีตัวซ้ำติดกัน
+        คำที่มีตัวซ้ำ ("ass", "butt") จึงจับได้เฉพาะรอบแรกที่เป็นรูปเดียวกับตอนสร้าง
+        """
+        term = self._scan(normalized)
+        if term is None:
+            collapsed = _REPEATS.sub(r'\1', normalized)
+            if collapsed != normalized:
+                term = self._scan(collapsed)
+        return term
+
+    def _scan(self, normalized):
+        goto, fail, out = self._goto, self._fail, self._out
+        last = len(normalized) - 1
+        node = 0
+        for i, ch in enumerate(normalized):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for term in out[node]:
+                if term.isascii():
+                    start = i - len(term) + 1
+                    if (start > 0 and _is_word_char(normalized[start - 1])) or \
+                            (i < last and _is_word_char(normalized[i + 1])):
+                        continue
+                return term
+        return None
+
+
+class ProfanityFilter:
+    """เก็บ automaton ของแต่ละ guild และโหลดรายการคำใหม่เมื่อไฟล์เปลี่ยน"""
+
+    def __init__(self, path=None, reload_interval=30.0):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._mtime = None
+        self._checked = 0.0
+        self._default = Automaton(DEFAULT_TERMS)
+        self._guilds = {}
+        self.scanned = 0
+        self.matched = 0
+        self.reloads = 0
+        self.reload()
+
+    def reload(self):
+        """โหลดไฟล์รายการคำแล้ว compile automaton ใหม่ทั้งหมด"""
+        self._checked = time.monotonic()
+        if not self.path:
+            return
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to load profanity list {self.path}: {e}")
+            return
+
+        default_terms = list(DEFAULT_TERMS) + list(data.get('default', []))
+        self._default = Automaton(default_terms)
+        self._guilds = {
+            int(guild_id): Automaton(default_terms + list(terms))
+            for guild_id, terms in data.get('guilds', {}).items()
+        }
+        self._mtime = mtime
+        self.reloads += 1
+        logger.info(f"Loaded profanity lists: {len(self._default.terms)} default terms, {len(self._guilds)} guild lists")
+
+    def _maybe_reload(self):
+        if time.monotonic() - self._checked >= self.reload_interval:
+            self.reload()
+
+    def check(self, guild_id, text):
+        """คืนคำหยาบที่พบในข้อความ หรือ None"""
+        self._maybe_reload()
+        self.scanned += 1
+        automaton = self._guilds.get(guild_id, self._default)
+        term = automaton.search(normalize(text))
+        if term is not None:
+            self.matched += 1
+        return term
+
+    def stats(self):
+        return {
+            'default_terms': len(self._default.terms),
+            'guild_lists': len(self._guilds),
+            'scanned': self.scanned,
+            'matched': self.matched,
+            'reloads': self.reloads,
+        }
@@ -0,0 +1,259 @@
+"""จับเวลา handler ของคำสั่ง/event, ตรวจจับ event loop ที่ถูกบล็อก และ sampling profiler
+
+- CallbackTimer ห่อ coroutine ของ handler แล้วจับเวลาแต่ละช่วงที่ coroutine ทำงานจริง
+  (ระหว่าง await) ผลรวมคือเวลาที่ handler นั้นถือ event loop ไว้ แยกจากเวลารวม (wall)
+- LoopWatchdog ตั้ง heartbeat ใน loop ทุก interval แล้วให้ thread แยกคอยดู ถ้า heartbeat
+  ค้างเกิน threshold จะเก็บ stack ของ thread ที่รัน loop ตอนที่ยังค้างอยู่ พร้อมชื่อ handler
+- SamplingProfiler อ่าน stack ของทุก thread ทุก interval วินาทีเป็นเวลา N วินาที
+  แล้วคืนผลเป็น collapsed stack (ใช้กับ flamegraph.pl หรือ speedscope ได้ทันที)
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class _Timed:
+    """awaitable ที่ส่งต่อทุกอย่างให้ coroutine ข้างใน พร้อมจับเวลาแต่ละ step"""
+
+    __slots__ = ('coro', 'timer', 'label', 'busy')
+
+    def __init__(self, coro, timer, label):
+        self.coro = coro
+        self.timer = timer
+        self.label = label
+        self.busy = 0.0
+
+    def __await__(self):
+        coro = self.coro
+        timer = self.timer
+        value = error = None
+        while True:
+            parent = timer.active
+            timer.active = self
+            start = time.perf_counter()
+            try:
+                if error is None:
+                    yielded = coro.send(value)
+                else:
+                    yielded = coro.throw(error)
+            except StopIteration as e:
+                return e.value
+            finally:
+                elapsed = time.perf_counter() - start
+                self.busy += elapsed
+                if parent is not None:
+                    # handler ซ้อน (คำสั่งที่รันใน on_message) รันอยู่ใน step ของ parent
+                    # หักออกจาก parent เพื่อไม่ให้เวลาเดียวกันถูกนับสองที่
+                    parent.busy -= elapsed
+                timer.active = parent
+            value = error = None
+            try:
+                value = yield yielded
+            except BaseException as e:
+                error = e
+
+
+class CallbackTimer:
+    """เวลารวมและเวลาที่บล็อก loop ของ handler แต่ละตัว แยกตาม (kind, name)
+
+    kind คือ 'command' หรือ 'event' ส่วน current คือ handler ที่กำลังรันอยู่ใน loop
+    ตอนนี้ (LoopWatchdog อ่านค่านี้จาก thread ของมันเพื่อบอกว่าใครบล็อก loop)
+
+    handler ที่ซ้อนกัน เช่น คำสั่งที่ถูกเรียกจาก on_message นับเวลาที่บล็อก loop ให้
+    handler ในสุดเท่านั้น เวลา busy ของ on_message จึงไม่รวมเวลาของคำสั่ง (ส่วน wall ยังรวม)
+    """
+
+    def __init__(self):
+        self.active = None  # _Timed ที่กำลังรันอยู่
+        self._totals = {}  # (kind, name) -> [count, wall, busy, max_busy]
+
+    @property
+    def current(self):
+        active = self.active
+        return active.label if active is not None else None
+
+    async def track(self, kind, name, coro):
+        label = (kind, name)
+        timed = _Timed(coro, self, label)
+        start = time.perf_counter()
+        try:
+            return await timed
+        finally:
+            wall = time.perf_counter() - start
+            metrics.callback_duration.observe(wall, kind, name)
+            metrics.callback_blocking.observe(timed.busy, kind, name)
+            totals = self._totals.get(label)
+            if totals is None:
+                totals = self._totals[label] = [0, 0.0, 0.0, 0.0]
+            totals[0] += 1
+            totals[1] += wall
+            totals[2] += timed.busy
+            totals[3] = max(totals[3], timed.busy)
+
+    def top(self, limit=10):
+        """handler ที่ใช้เวลา loop รวมมากที่สุด"""
+        ranked = sorted(self._totals.items(), key=lambda item: item[1][2], reverse=True)
+        return [
+            {
+                'kind': kind,
+                'name': name,
+                'count': count,
+                'avg_ms': round(wall / count * 1000, 1),
+                'blocking_ms': round(busy * 1000, 1),
+                'max_blocking_ms': round(max_busy * 1000, 1),
+            }
+            for (kind, name), (count, wall, busy, max_busy) in ranked[:limit]
+        ]
+
+
+def _format_frame(frame, limit):
+    return ''.join(traceback.format_stack(frame, limit=limit))
+
+
+class LoopWatchdog:
+    """แจ้งเตือนเมื่อ event loop ไม่ได้วนกลับมาเกิน threshold วินาที พร้อม stack ตอนที่ค้าง"""
+
+    def __init__(self, timer=None, threshold=0.25, interval=0.05, keep=20, stack_depth=15):
+        self.timer = timer
+        self.threshold = threshold
+        self.interval = interval
+        self.stack_depth = stack_depth
+        self.slow = deque(maxlen=keep)
+        self.stalls = 0
+        self._lock = threading.Lock()
+        self._beat = None
+        self._pending = None  # รายการ slow ที่ยังค้างอยู่ (ยังไม่รู้เวลารวม)
+        self._loop = None
+        self._handle = None
+        self._thread = None
+        self._thread_id = None
+        self._stop = threading.Event()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._handle = self._loop.call_later(self.interval, self._heartbeat)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name='loop-watchdog', daemon=True)
+        self._thread.start()
+
+    def _heartbeat(self):
+        now = time.monotonic()
+        lag = now - self._beat - self.interval
+        with self._lock:
+            pending, self._pending = self._pending, None
+            self._beat = now
+        if lag >= self.threshold:
+            self.stalls += 1
+            metrics.loop_stalls.observe(lag)
+            if pending is not None:
+                pending['blocked_ms'] = round(lag * 1000)
+                logger.warning(f"Event loop was blocked for {lag * 1000:.0f} ms by {pending['callback'] or 'unknown'}")
+        self._handle = self._loop.call_later(self.interval, self._heartbeat)
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                beat = self._beat
+                if self._pending is not None or time.monotonic() - beat - self.interval < self.threshold:
+                    continue
+                frame = sys._current_frames().get(self._thread_id)
+                label = self.timer.current if self.timer else None
+                entry = {
+                    'at': time.time(),
+                    'callback': ':'.join(label) if label else None,
+                    'blocked_ms': None,  # เติมตอน loop กลับมาทำงาน
+                    'stack': _format_frame(frame, self.stack_depth) if frame is not None else '',
+                }
+                self._pending = entry
+            self.slow.append(entry)
+            logger.warning(f"Event loop blocked for over {self.threshold * 1000:.0f} ms "
+                           f"in {entry['callback'] or 'unknown'}:\n{entry['stack']}")
+
+    def stats(self):
+        return {
+            'threshold_ms': round(self.threshold * 1000),
+            'stalls': self.stalls,
+            'recent': list(self.slow)[-5:],
+        }
+
+    def close(self):
+        self._stop.set()
+        if self._handle is not None:
+            self._handle.cancel()
+        if self._thread is not None:
+            self._thread.join()  # ให้ thread เลิกอ่านสถานะก่อนคืน
+        self._thread = None
+
+
+class ProfilerBusy(Exception):
+    """มี profiler รันอยู่แล้ว"""
+
+
+def _collapse(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        module = os.path.splitext(os.path.basename(code.co_filename))[0]
+        names.append(f'{module}:{code.co_name}')
+        frame = frame.f_back
+    names.reverse()
+    return names
+
+
+class SamplingProfiler:
+    """อ่าน stack ของทุก thread เป็นระยะใน thread แยก (ไม่ต้องแก้โค้ดหรือเปิด tracing)
+
+    ครั้งละหนึ่งรอบเท่านั้น ถ้าเรียกซ้อนจะได้ ProfilerBusy
+    """
+
+    def __init__(self, interval=0.01, max_seconds=60):
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.running = False
+        self.runs = 0
+
+    def sample(self, seconds):
+        """เก็บ sample (บล็อกจนครบ seconds) คืน {collapsed stack: จำนวน sample}"""
+        me = threading.get_ident()
+        names = {thread.ident: thread.name.replace(' ', '_') for thread in threading.enumerate()}
+        counts = {}
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me:
+                    continue
+                thread_name = names.get(thread_id)
+                if thread_name is None:
+                    names = {thread.ident: thread.name.replace(' ', '_') for thread in threading.enumerate()}
+                    thread_name = names.get(thread_id, str(thread_id))
+                key = ';'.join([thread_name] + _collapse(frame))
+                counts[key] = counts.get(key, 0) + 1
+            time.sleep(self.interval)
+        return counts
+
+    async def profile(self, seconds):
+        """รัน profiler seconds วินาทีใน thread แยก คืนข้อความ collapsed stack (บรรทัดละ 'stack count')"""
+        if self.running:
+            raise ProfilerBusy()
+        seconds = max(1.0, min(float(seconds), self.max_seconds))
+        self.running = True
+        try:
+            counts = await asyncio.to_thread(self.sample, seconds)
+        finally:
+            self.running = False
+        self.runs += 1
+        lines = [f'{stack} {count}' for stack, count in sorted(counts.items(), key=lambda item: -item[1])]
+        return '\n'.join(lines) + '\n'
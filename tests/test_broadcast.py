@@ -0,0 +1,112 @@
+import asyncio
+import os
+import sys
+import unittest
+
+import discord
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from broadcast import Broadcaster  # noqa: E402
+from rest_stub import RestStub  # noqa: E402
+
+SEND = 'POST /channels/{id}/messages'
+FIRST_CHANNEL = 300000000000000000
+
+
+class BroadcasterTest(unittest.IsolatedAsyncioTestCase):
+    """Broadcaster + HTTP client ของ discord.py จริง ยิงไปที่ RestStub บนเครื่อง"""
+
+    async def start_stub(self, **options):
+        self.stub = RestStub(**options)
+        await self.stub.start()
+        self.base = discord.http.Route.BASE
+        self.stub.install()
+        self.client = discord.Client(intents=discord.Intents.none())
+        await self.client.login('stub-token')
+        self.stub.reset_counters()
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        await self.stub.close()
+        discord.http.Route.BASE = self.base
+
+    def channels(self, count):
+        return [self.client.get_partial_messageable(FIRST_CHANNEL + i) for i in range(count)]
+
+    @staticmethod
+    async def send(channel):
+        await channel.send("✅ Bot is now online!")
+
+    async def test_repeated_runs_only_send_missing_targets(self):
+        await self.start_stub(latency=0.01)
+        channels = self.channels(10)
+        broadcaster = Broadcaster(concurrency=4, rate=100)
+
+        job = await broadcaster.run('online', channels + channels[:3], self.send)
+        self.assertEqual((job['total'], job['sent'], job['skipped']), (10, 10, 3))
+        self.assertEqual(self.stub.calls[SEND], 10)
+
+        # on_ready หลัง reconnect: ไม่มีการส่งซ้ำเลย
+        self.stub.reset_counters()
+        job = await broadcaster.run('online', channels, self.send)
+        self.assertEqual((job['total'], job['sent'], job['skipped']), (0, 0, 10))
+        self.assertEqual(self.stub.requests, 0)
+
+    async def test_failed_targets_are_retried_on_the_next_run(self):
+        await self.start_stub(latency=0.01)
+        channels = self.channels(5)
+        broadcaster = Broadcaster(concurrency=4, rate=100)
+
+        self.stub.forbidden = {str(FIRST_CHANNEL + 1)}
+        job = await broadcaster.run('online', channels, self.send)
+        self.assertEqual((job['sent'], job['failed']), (4, 1))
+
+        self.stub.forbidden = set()
+        self.stub.reset_counters()
+        job = await broadcaster.run('online', channels, self.send)
+        self.assertEqual((job['total'], job['sent'], job['skipped']), (1, 1, 4))
+        self.assertEqual(self.stub.calls[SEND], 1)
+
+    async def test_rate_limiter_keeps_under_the_global_limit(self):
+        await self.start_stub(latency=0.01, global_limit=20)
+        broadcaster = Broadcaster(concurrency=10, rate=15)
+        job = await broadcaster.run('online', self.channels(30), self.send)
+        self.assertEqual((job['sent'], job['failed']), (30, 0))
+        self.assertEqual(self.stub.global_429, 0)
+
+    async def test_global_429s_are_retried(self):
+        # rate สูงกว่า limit ของ stub: ได้ 429 แบบ global แต่สุดท้ายต้องส่งครบ
+        await self.start_stub(latency=0.01, global_limit=10)
+        broadcaster = Broadcaster(concurrency=10, rate=1000)
+        job = await broadcaster.run('online', self.channels(25), self.send)
+        self.assertGreater(self.stub.global_429, 0)
+        self.assertEqual((job['sent'], job['failed']), (25, 0))
+
+    async def test_concurrency_cap(self):
+        await self.start_stub(latency=0.05, global_limit=1000)
+        broadcaster = Broadcaster(concurrency=3, rate=1000)
+        job = await broadcaster.run('online', self.channels(20), self.send)
+        self.assertEqual(job['sent'], 20)
+        self.assertEqual(self.stub.max_in_flight, 3)
+
+
+class RateLimitedRetryTest(unittest.IsolatedAsyncioTestCase):
+    async def test_retries_after_rate_limited(self):
+        attempts = []
+
+        async def send(target):
+            attempts.append(target)
+            if len(attempts) == 1:
+                raise discord.RateLimited(0.05)
+
+        broadcaster = Broadcaster(rate=1000)
+        job = await broadcaster.run('online', [1], send, key=lambda target: target)
+        self.assertEqual(attempts, [1, 1])
+        self.assertEqual((job['sent'], job['retries'], job['failed']), (1, 1, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
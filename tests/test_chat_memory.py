@@ -0,0 +1,37 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chat_memory import ConversationStore, estimate_tokens  # noqa: E402
+
+THAI = "สวัสดีครับวันนี้อากาศดีมากเลยนะ"
+
+
+class EstimateTokensTests(unittest.TestCase):
+    def test_thai_counts_about_one_token_per_character(self):
+        self.assertGreaterEqual(estimate_tokens(THAI), len(THAI))
+
+    def test_ascii_keeps_three_characters_per_token(self):
+        self.assertEqual(estimate_tokens("a" * 30), 11)
+
+
+class ConversationStoreTests(unittest.TestCase):
+    def test_thai_history_is_trimmed_to_budget(self):
+        store = ConversationStore(window_tokens=100, summary_tokens=60, snippet_chars=20)
+        for i in range(10):
+            store.add(1, "user", f"{THAI} {i}")
+
+        messages = store.history(1)
+        turns = [m for m in messages if m["role"] != "system"]
+        self.assertTrue(turns)
+        self.assertLess(len(turns), 10)
+        # ตัวอักษรไทยแต่ละตัวเป็นอย่างน้อย 1 token จริง จำนวนตัวอักษรจึงต้องไม่เกิน budget
+        self.assertLessEqual(sum(len(m["content"]) for m in turns), store.window_tokens)
+        summary = messages[0]["content"].split("\n", 1)[1]
+        self.assertLessEqual(len(summary), store.summary_tokens)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import asyncio
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extraction_pool import ExtractionPool  # noqa: E402
+
+
+class FakeProc:
+    def __init__(self):
+        self.returncode = None
+
+    def kill(self):
+        self.returncode = -9
+
+    async def wait(self):
+        return self.returncode
+
+
+class StartTest(unittest.IsolatedAsyncioTestCase):
+    async def test_failed_start_kills_the_workers_that_did_start(self):
+        pool = ExtractionPool(size=3)
+        launched = []
+
+        async def launch():
+            if len(launched) == 1:
+                launched.append(None)
+                raise RuntimeError("extraction worker failed to start")
+            proc = FakeProc()
+            launched.append(proc)
+            return proc
+
+        pool._launch = launch
+        with self.assertRaises(RuntimeError):
+            await pool.start()
+        procs = [proc for proc in launched if proc is not None]
+        self.assertEqual(len(procs), 2)
+        self.assertTrue(all(proc.returncode == -9 for proc in procs))
+        self.assertEqual(pool.stats()['workers'], 0)
+        self.assertFalse(pool._started)
+
+        # ลองใหม่ได้โดยไม่มี process ค้างจากรอบก่อน
+        await pool.start()
+        self.assertEqual(pool.stats()['workers'], 3)
+        self.assertEqual(pool.stats()['idle'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,30 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extractor import is_playlist  # noqa: E402
+
+
+class IsPlaylistTest(unittest.TestCase):
+    def test_playlist_links(self):
+        for url in ("https://www.youtube.com/playlist?list=PL123",
+                    "https://music.youtube.com/playlist?list=PL123",
+                    "https://soundcloud.com/artist/sets/album"):
+            with self.subTest(url=url):
+                self.assertTrue(is_playlist(url))
+
+    def test_video_shared_from_a_playlist_is_a_single_track(self):
+        for url in ("https://www.youtube.com/watch?v=abc123&list=PL123&index=4",
+                    "https://www.youtube.com/watch?list=PL123&v=abc123",
+                    "https://youtu.be/abc123?list=PL123"):
+            with self.subTest(url=url):
+                self.assertFalse(is_playlist(url))
+
+    def test_search_terms(self):
+        self.assertFalse(is_playlist("best playlist=2024"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_cache import ResponseCache  # noqa: E402
+
+
+class ResponseCacheWriteTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, 'cache.db')
+
+    async def asyncTearDown(self):
+        self._tmp.cleanup()
+
+    def rows(self):
+        db = sqlite3.connect(self.path)
+        try:
+            return dict(db.execute("SELECT key, value FROM responses").fetchall())
+        finally:
+            db.close()
+
+    async def test_writes_run_off_the_event_loop(self):
+        cache = ResponseCache(self.path, max_entries=2)
+        threads = []
+        original = cache.flush
+
+        def flush():
+            threads.append(threading.current_thread())
+            original()
+
+        cache.flush = flush
+        cache.put('a', '1')
+        cache.put('b', '2')
+        cache.put('c', '3')  # ดัน 'a' ออก
+        while cache._flush_task is not None:
+            await asyncio.sleep(0.01)
+
+        self.assertTrue(threads)
+        self.assertNotIn(threading.main_thread(), threads)
+        self.assertEqual(self.rows(), {'b': '2', 'c': '3'})
+        cache.close()
+
+    async def test_close_writes_what_is_still_queued(self):
+        cache = ResponseCache(self.path)
+        cache.put('a', '1')
+        cache.close()  # task ที่ยังไม่ได้รันต้องไม่ทำให้ของหาย
+        await asyncio.sleep(0.05)
+
+        self.assertEqual(self.rows(), {'a': '1'})
+        reopened = ResponseCache(self.path)
+        self.assertEqual(reopened.get('a'), '1')
+        reopened.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
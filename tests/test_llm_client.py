@@ -0,0 +1,30 @@
+import email.utils
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_client import _parse_retry_after  # noqa: E402
+
+
+class RetryAfterTest(unittest.TestCase):
+    def test_seconds(self):
+        self.assertEqual(_parse_retry_after("3"), 3.0)
+        self.assertEqual(_parse_retry_after("1.5"), 1.5)
+
+    def test_http_date(self):
+        value = email.utils.formatdate(time.time() + 30, usegmt=True)
+        self.assertAlmostEqual(_parse_retry_after(value), 30, delta=2)
+
+    def test_past_date_means_now(self):
+        self.assertEqual(_parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT"), 0.0)
+
+    def test_missing_or_garbage_is_ignored(self):
+        self.assertIsNone(_parse_retry_after(None))
+        self.assertIsNone(_parse_retry_after("soon"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import asyncio
+import os
+import sys
+import unittest
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics  # noqa: E402
+from llm_client import LLMClient  # noqa: E402
+from llm_scheduler import FairScheduler, SchedulerBusy  # noqa: E402
+
+
+class StubLLM:
+    """chat completions แบบ OpenAI บนเครื่อง ตอบช้า delay วินาทีและจดลำดับ/จำนวนที่รับพร้อมกัน"""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.served = []
+        self._runner = None
+        self.url = None
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post('/v1/chat/completions', self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f'http://127.0.0.1:{port}/v1/chat/completions'
+
+    async def close(self):
+        await self._runner.cleanup()
+
+    async def handle(self, request):
+        payload = await request.json()
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        content = payload['messages'][-1]['content']
+        self.served.append(content)
+        return web.json_response({'choices': [{'message': {'role': 'assistant', 'content': content}}]})
+
+
+class FairSchedulerTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.stub = StubLLM()
+        await self.stub.start()
+        self.client = LLMClient('test', url=self.stub.url, max_retries=0)
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        await self.stub.close()
+
+    async def ask(self, scheduler, guild_id, user_id, text, positions=None):
+        async def on_wait(position):
+            if positions is not None:
+                positions[text] = position
+
+        async with scheduler.slot(guild_id, user_id, on_wait=on_wait):
+            return await self.client.complete([{'role': 'user', 'content': text}])
+
+    async def test_caps_upstream_concurrency(self):
+        scheduler = FairScheduler(max_concurrency=2, max_queue=10, max_per_user=5)
+        jobs = [self.ask(scheduler, 1, user, f'u{user}-{i}') for user in range(3) for i in range(2)]
+        await asyncio.gather(*jobs)
+        self.assertEqual(self.stub.max_in_flight, 2)
+        self.assertEqual(len(self.stub.served), 6)
+        self.assertEqual(scheduler.stats()['running'], 0)
+        self.assertEqual(scheduler.stats()['waiting'], 0)
+
+    async def test_exports_queue_wait_and_service_time(self):
+        scheduler = FairScheduler(max_concurrency=1, max_queue=10, max_per_user=5)
+        waits = metrics.llm_queue_wait.labels().count
+        await asyncio.gather(*(self.ask(scheduler, 1, user, f'u{user}') for user in range(3)))
+        self.assertEqual(metrics.llm_queue_wait.labels().count - waits, 3)
+        self.assertGreaterEqual(scheduler.stats()['service_time']['count'], 3)
+        output = metrics.render()
+        self.assertIn('bot_llm_queue_wait_seconds_count', output)
+        self.assertIn('bot_llm_service_seconds_bucket', output)
+
+    async def test_round_robin_order_and_position(self):
+        scheduler = FairScheduler(max_concurrency=1, max_queue=10, max_per_user=5)
+        positions = {}
+        first = asyncio.create_task(self.ask(scheduler, 1, 1, 'running'))
+        await asyncio.sleep(0)
+        tasks = [asyncio.create_task(self.ask(scheduler, guild, user, text, positions))
+                 for guild, user, text in ((1, 1, 'a1'), (1, 1, 'a2'), (2, 2, 'b1'))]
+        await asyncio.gather(first, *tasks)
+        # guild 2 แทรกระหว่างสองงานของ guild 1 จึงได้ลำดับที่ 2 ทั้งที่มีงานรออยู่ก่อนแล้ว 2 งาน
+        self.assertEqual(self.stub.served, ['running', 'a1', 'b1', 'a2'])
+        self.assertEqual(positions, {'a1': 1, 'a2': 2, 'b1': 2})
+
+    async def test_cancelled_waiters_free_their_place(self):
+        scheduler = FairScheduler(max_concurrency=1, max_queue=1, max_per_user=1)
+        first = asyncio.create_task(self.ask(scheduler, 1, 1, 'running'))
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(self.ask(scheduler, 1, 2, 'cancelled'))
+        await asyncio.sleep(0)
+        with self.assertRaises(SchedulerBusy):
+            await self.ask(scheduler, 1, 3, 'rejected')
+
+        queued.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await queued
+        self.assertEqual(scheduler.stats()['waiting'], 0)
+
+        again = asyncio.create_task(self.ask(scheduler, 1, 2, 'again'))
+        await asyncio.gather(first, again)
+        self.assertEqual(self.stub.served, ['running', 'again'])
+        self.assertEqual(scheduler.stats()['waiting'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
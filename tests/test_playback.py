@@ -0,0 +1,77 @@
+import asyncio
+import os
+import sys
+import unittest
+from unittest import mock
+
+import discord
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import playback  # noqa: E402
+from audio_dsp import OpusPassthrough  # noqa: E402
+
+
+class FakeSource(discord.AudioSource):
+    def __init__(self, opus):
+        self.opus = opus
+        self.closed = False
+
+    def is_opus(self):
+        return self.opus
+
+    def read(self):
+        return b''
+
+    def cleanup(self):
+        self.closed = True
+
+
+class FakeVoiceClient:
+    """เหมือน VoiceClient ตรงที่ encoder เป็น MISSING ถ้า play() ได้ source แรกเป็น Opus"""
+
+    def __init__(self, source):
+        self.encoder = discord.utils.MISSING
+        self._source = source
+        self.encoder_when_swapped = None
+
+    @property
+    def source(self):
+        return self._source
+
+    @source.setter
+    def source(self, value):
+        self.encoder_when_swapped = self.encoder
+        self._source = value
+
+
+class SetVolumeTest(unittest.TestCase):
+    def test_passthrough_to_pcm_swap_creates_encoder(self):
+        original = FakeSource(opus=True)
+        passthrough = OpusPassthrough(original)
+        passthrough.frames = 150
+        voice_client = FakeVoiceClient(passthrough)
+        pcm = FakeSource(opus=False)
+        create_source = mock.AsyncMock(return_value=pcm)
+
+        with mock.patch.object(playback, 'create_source', create_source), \
+                mock.patch.object(discord.opus, 'Encoder', return_value='encoder'):
+            asyncio.run(playback.set_volume(voice_client, track=object(), volume=0.5))
+
+        self.assertIs(voice_client.source, pcm)
+        self.assertEqual(voice_client.encoder_when_swapped, 'encoder')
+        self.assertEqual(create_source.call_args.kwargs, {'volume': 0.5, 'start': 3.0})
+        self.assertEqual(pcm.frames, 150)
+        self.assertTrue(original.closed)
+
+    def test_opus_swap_keeps_missing_encoder(self):
+        voice_client = FakeVoiceClient(OpusPassthrough(FakeSource(opus=True)))
+        remote = FakeSource(opus=True)
+        with mock.patch.object(playback, 'create_source', mock.AsyncMock(return_value=remote)):
+            asyncio.run(playback.set_volume(voice_client, track=object(), volume=0.5))
+        self.assertIs(voice_client.source, remote)
+        self.assertIs(voice_client.encoder, discord.utils.MISSING)
+
+
+if __name__ == '__main__':
+    unittest.main()
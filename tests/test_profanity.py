@@ -0,0 +1,72 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from profanity import Automaton, ProfanityFilter, normalize  # noqa: E402
+
+
+class NormalizeTest(unittest.TestCase):
+    def test_keeps_word_boundaries(self):
+        self.assertEqual(normalize("thank u yeah"), "thank u yeah")
+        self.assertEqual(normalize("ok, uy"), "ok uy")
+
+    def test_joins_runs_of_single_characters(self):
+        self.assertEqual(normalize("k u y"), "kuy")
+        self.assertEqual(normalize("K.U.Y lol"), "kuy lol")
+        self.assertEqual(normalize("ค ว ย"), "ควย")
+
+    def test_shortens_long_runs_only(self):
+        self.assertEqual(normalize("kuuuuy"), "kuuy")
+        self.assertEqual(normalize("good butt"), "good butt")
+
+    def test_leet_only_inside_words(self):
+        self.assertEqual(normalize("k@y"), "kay")
+        self.assertEqual(normalize("hi @all"), "hi all")
+
+
+class ProfanityFilterTest(unittest.TestCase):
+    def setUp(self):
+        self.filter = ProfanityFilter(path=None)
+
+    def test_ordinary_messages_pass(self):
+        for text in ("thank u yeah", "Check U Yo!", "ok, uy", "I took uyghur history", "pick u yesterday",
+                     "แค่คุยกันเฉยๆ"):
+            with self.subTest(text=text):
+                self.assertIsNone(self.filter.check(None, text))
+
+    def test_bypass_forms_are_caught(self):
+        for text in ("kuy", "KUY!", "ok kuy", "k u y", "K.U.Y", "k-u-y lol", "kuuuy", "k​uy",
+                     "ค ว ย", "มึงควยมาก"):
+            with self.subTest(text=text):
+                self.assertIsNotNone(self.filter.check(None, text))
+
+
+class AutomatonTest(unittest.TestCase):
+    def test_latin_terms_need_word_boundaries(self):
+        automaton = Automaton(["ass"])
+        self.assertIsNone(automaton.search(normalize("classic passage")))
+        self.assertEqual(automaton.search(normalize("you ass")), "ass")
+        self.assertEqual(automaton.search(normalize("you asssss")), "ass")
+
+    def test_doubled_letters_are_kept(self):
+        automaton = Automaton(["ass", "butt"])
+        for text in ("as soon as possible", "but I think so", "a bus stop"):
+            with self.subTest(text=text):
+                self.assertIsNone(automaton.search(normalize(text)))
+        self.assertEqual(automaton.search(normalize("b u t t")), "butt")
+
+    def test_repeats_stretched_out(self):
+        automaton = Automaton(["kuy", "ass"])
+        self.assertEqual(automaton.search(normalize("kuuy")), "kuy")
+        self.assertEqual(automaton.search(normalize("kkkuuuuyyy")), "kuy")
+
+    def test_overlapping_terms(self):
+        automaton = Automaton(["bc", "abcd"])
+        # "bc" อยู่กลางคำจึงไม่นับ แต่ "abcd" ที่ครอบมันอยู่ยังต้องเจอ
+        self.assertEqual(automaton.search("abcd"), "abcd")
+
+
+if __name__ == '__main__':
+    unittest.main()
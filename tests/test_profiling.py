@@ -0,0 +1,24 @@
+import asyncio
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from profiling import LoopWatchdog  # noqa: E402
+
+
+class LoopWatchdogTests(unittest.IsolatedAsyncioTestCase):
+    async def test_close_waits_for_the_watch_thread(self):
+        watchdog = LoopWatchdog(interval=0.01)
+        watchdog.start()
+        thread = watchdog._thread
+        await asyncio.sleep(0.05)
+
+        watchdog.close()
+
+        self.assertFalse(thread.is_alive())
+
+
+if __name__ == '__main__':
+    unittest.main()
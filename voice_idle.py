@@ -0,0 +1,104 @@
+import asyncio
+import heapq
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class IdleVoiceScheduler:
+    """ตัวจับเวลากลางสำหรับออกจากห้อง voice เมื่อไม่มีคนอยู่ครบ grace วินาที
+
+    นับจำนวนคน (ไม่รวมบอท) ในห้องที่บอทอยู่แบบเพิ่ม/ลดทีละ event ไม่ต้องไล่ดู
+    channel.members ทุกครั้ง deadline ของทุก guild อยู่ใน heap เดียว มี task เดียวรอ
+    deadline ที่ใกล้ที่สุด การยกเลิกแค่ลบออกจาก dict (entry เก่าใน heap ถูกข้ามตอนถึงคิว)
+    """
+
+    def __init__(self, on_idle, grace=5.0):
+        self.on_idle = on_idle
+        self.grace = grace
+        self.humans = {}  # guild_id -> จำนวนคนในห้องที่บอทอยู่
+        self._deadlines = {}  # guild_id -> deadline ที่ยังมีผล
+        self._heap = []
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self.fired = 0
+
+    def bot_moved(self, guild_id, channel):
+        """บอทเข้า/ย้าย/ออกจากห้อง นับคนในห้องใหม่ครั้งเดียว"""
+        if channel is None:
+            self.humans.pop(guild_id, None)
+            self.cancel(guild_id)
+            return
+        self.humans[guild_id] = sum(1 for m in channel.members if not m.bot)
+        self._check(guild_id)
+
+    def member_moved(self, guild_id, bot_channel_id, before_id, after_id):
+        """สมาชิก (ไม่ใช่บอท) เปลี่ยนห้อง ปรับจำนวนคนในห้องของบอท"""
+        if guild_id not in self.humans or before_id == after_id:
+            return
+        if before_id == bot_channel_id:
+            self.humans[guild_id] -= 1
+        elif after_id == bot_channel_id:
+            self.humans[guild_id] += 1
+        else:
+            return
+        self._check(guild_id)
+
+    def _check(self, guild_id):
+        if self.humans[guild_id] <= 0:
+            self.schedule(guild_id)
+        else:
+            self.cancel(guild_id)
+
+    def schedule(self, guild_id):
+        if guild_id in self._deadlines:
+            return
+        deadline = asyncio.get_running_loop().time() + self.grace
+        self._deadlines[guild_id] = deadline
+        entry = (deadline, guild_id)
+        heapq.heappush(self._heap, entry)
+        if self._heap[0] == entry:
+            self._wakeup.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def cancel(self, guild_id):
+        self._deadlines.pop(guild_id, None)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            heap = self._heap
+            while heap and self._deadlines.get(heap[0][1]) != heap[0][0]:
+                heapq.heappop(heap)
+            self._wakeup.clear()
+            if not heap:
+                await self._wakeup.wait()
+                continue
+
+            delay = heap[0][0] - loop.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            _, guild_id = heapq.heappop(heap)
+            del self._deadlines[guild_id]
+            self.fired += 1
+            try:
+                await self.on_idle(guild_id)
+            except Exception as e:
+                logger.error(f"Idle disconnect failed for guild {guild_id}: {e}")
+
+    def stats(self):
+        return {
+            'tracked': len(self.humans),
+            'pending': len(self._deadlines),
+            'fired': self.fired,
+        }
+
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
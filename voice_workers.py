@@ -0,0 +1,323 @@
+"""Worker process สำหรับเสียง (เปิดด้วย VOICE_WORKERS=จำนวน process)
+
+ปกติ ffmpeg -> PCM -> ปรับเสียง -> Opus encode ของทุก guild รันอยู่ใน thread ของ
+AudioPlayer ใน process เดียวกับบอท แย่ง GIL กันเอง พอมีหลาย guild เล่นพร้อมกันเสียงจะเริ่มกระตุก
+โหมดนี้ย้ายงาน decode/gain/encode ไปไว้ใน process ลูก process หลักแค่รับแพ็กเก็ต Opus
+ที่พร้อมส่งผ่าน pipe แล้วส่งต่อให้ Discord เท่านั้น
+
+โปรโตคอล: process หลักส่งคำสั่งเป็น JSON บรรทัดละคำสั่งทาง stdin worker ส่งแพ็กเก็ตกลับ
+ทาง stdout เป็น [stream id: u32][ความยาว: u16][แพ็กเก็ต Opus] ความยาว 0 = เพลงจบ
+worker ส่งล่วงหน้าได้ไม่เกิน AHEAD_FRAMES แพ็กเก็ต แล้วต้องรอ credit จากฝั่งที่เล่นอยู่
+"""
+import itertools
+import json
+import logging
+import os
+import struct
+import subprocess
+import sys
+import threading
+from collections import deque
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+HEADER = struct.Struct('<IH')
+# แพ็กเก็ตที่ worker ส่งล่วงหน้าได้ (300ms) และคืน credit ทีละ CREDIT_FRAMES
+# แพ็กเก็ตที่ส่งมาแล้วถูกเข้ารหัสด้วยระดับเสียงเดิม ค่านี้จึงเป็นเวลาที่ !volume จะมีผลช้าสุด
+AHEAD_FRAMES = 15
+CREDIT_FRAMES = 5
+# เวลาที่ยอมรอแพ็กเก็ตแรก (ffmpeg เชื่อมต่อ) และแพ็กเก็ตถัดๆ ไป
+FIRST_PACKET_TIMEOUT = 30.0
+PACKET_TIMEOUT = 5.0
+
+
+class RemoteOpusSource(discord.AudioSource):
+    """AudioSource ที่อ่านแพ็กเก็ต Opus ที่ worker process เข้ารหัสไว้แล้ว"""
+
+    def __init__(self, worker, stream_id, volume, passthrough):
+        self._worker = worker
+        self.id = stream_id
+        self.passthrough = passthrough
+        self._volume = volume
+        self._packets = deque()
+        self._cond = threading.Condition()
+        self._ended = False
+        self._unacked = 0
+        self.frames = 0
+        self.on_first_frame = None
+
+    @property
+    def adjustable(self):
+        """ปรับเสียงได้ทันทีหรือไม่ (ทาง passthrough ต้องเปิดใหม่เป็น PCM)"""
+        return not self.passthrough
+
+    @property
+    def volume(self):
+        return self._volume
+
+    @volume.setter
+    def volume(self, value):
+        self._volume = value
+        self._worker.send({'op': 'volume', 'id': self.id, 'volume': value})
+
+    @property
+    def position(self):
+        return self.frames * 0.02
+
+    def feed(self, packet):
+        """เรียกจาก thread ที่อ่าน stdout ของ worker (แพ็กเก็ตว่าง = จบ)"""
+        with self._cond:
+            if packet:
+                self._packets.append(packet)
+            else:
+                self._ended = True
+            self._cond.notify()
+
+    def is_opus(self):
+        return True
+
+    def read(self):
+        timeout = PACKET_TIMEOUT if self.frames else FIRST_PACKET_TIMEOUT
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._packets or self._ended, timeout):
+                logger.warning(f"Voice worker stream {self.id} stalled")
+                return b''
+            if not self._packets:
+                return b''
+            packet = self._packets.popleft()
+
+        self.frames += 1
+        if self.frames == 1 and self.on_first_frame is not None:
+            self.on_first_frame()
+        self._unacked += 1
+        if self._unacked >= CREDIT_FRAMES:
+            self._worker.send({'op': 'credit', 'id': self.id, 'n': self._unacked})
+            self._unacked = 0
+        return packet
+
+    def cleanup(self):
+        self._worker.close_stream(self)
+
+
+class VoiceWorker:
+    """process ลูกหนึ่งตัว กับ thread ที่แยกแพ็กเก็ตจาก stdout ไปให้ source แต่ละตัว"""
+
+    def __init__(self):
+        self.streams = {}
+        self.packets = 0
+        self._write_lock = threading.Lock()
+        self._proc = subprocess.Popen(
+            [sys.executable, '-m', 'voice_workers'],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            cwd=HERE,
+        )
+        self._reader = threading.Thread(target=self._read_loop, name=f'voice-worker-{self._proc.pid}', daemon=True)
+        self._reader.start()
+
+    @property
+    def alive(self):
+        return self._proc.poll() is None
+
+    def send(self, message):
+        data = json.dumps(message).encode() + b'\n'
+        with self._write_lock:
+            try:
+                self._proc.stdin.write(data)
+                self._proc.stdin.flush()
+            except (BrokenPipeError, ValueError, OSError):
+                pass
+
+    def open_stream(self, stream_id, source_url, before_options, volume, passthrough):
+        source = RemoteOpusSource(self, stream_id, volume, passthrough)
+        self.streams[stream_id] = source
+        self.send({
+            'op': 'open',
+            'id': stream_id,
+            'url': source_url,
+            'before_options': before_options,
+            'volume': volume,
+            'passthrough': passthrough,
+        })
+        return source
+
+    def close_stream(self, source):
+        if self.streams.pop(source.id, None) is not None:
+            self.send({'op': 'close', 'id': source.id})
+
+    def _read_loop(self):
+        stdout = self._proc.stdout
+        while True:
+            header = stdout.read(HEADER.size)
+            if len(header) < HEADER.size:
+                break
+            stream_id, length = HEADER.unpack(header)
+            packet = stdout.read(length) if length else b''
+            source = self.streams.get(stream_id)
+            if source is not None:
+                self.packets += 1
+                source.feed(packet)
+        # worker ตาย: ให้ทุกเพลงที่ค้างอยู่จบไป (after callback จะเล่นเพลงถัดไปให้)
+        for source in list(self.streams.values()):
+            source.feed(b'')
+        self.streams.clear()
+
+    def close(self):
+        if self.alive:
+            self._proc.kill()
+        self._proc.wait()
+
+
+class VoiceWorkerPool:
+    """กระจาย stream ไปยัง worker process ที่มีงานน้อยที่สุด สร้างใหม่ถ้าตัวไหนตาย"""
+
+    def __init__(self, size):
+        self.size = size
+        self._workers = []
+        self._ids = itertools.count(1)
+        self.opened = 0
+        self.restarts = 0
+
+    def _ensure_workers(self):
+        alive = [worker for worker in self._workers if worker.alive]
+        self.restarts += len(self._workers) - len(alive)
+        while len(alive) < self.size:
+            alive.append(VoiceWorker())
+        self._workers = alive
+
+    def open(self, source_url, before_options='', volume=1.0, passthrough=False):
+        """เปิด stream ใหม่ คืน RemoteOpusSource ที่ใช้กับ voice client ได้เลย"""
+        self._ensure_workers()
+        worker = min(self._workers, key=lambda w: len(w.streams))
+        self.opened += 1
+        return worker.open_stream(next(self._ids), source_url, before_options, volume, passthrough)
+
+    def stats(self):
+        return {
+            'workers': len(self._workers),
+            'streams': [len(worker.streams) for worker in self._workers],
+            'opened': self.opened,
+            'packets': sum(worker.packets for worker in self._workers),
+            'restarts': self.restarts,
+        }
+
+    def close(self):
+        for worker in self._workers:
+            worker.close()
+        self._workers = []
+
+
+# ---- ฝั่ง worker process ----
+
+class _Stream(threading.Thread):
+    """stream หนึ่งเพลงใน worker: อ่านจาก ffmpeg แล้วส่งแพ็กเก็ต Opus ออกไป"""
+
+    def __init__(self, stream_id, job, out):
+        super().__init__(name=f'stream-{stream_id}', daemon=True)
+        self.id = stream_id
+        self.job = job
+        self.out = out
+        self.volume = job['volume']
+        self.credit = threading.Semaphore(AHEAD_FRAMES)
+        self.stopped = threading.Event()
+
+    def stop(self):
+        self.stopped.set()
+        self.credit.release(AHEAD_FRAMES)
+
+    def _packets(self, source):
+        from audio_dsp import FRAME_BYTES, GainStage
+
+        if self.job['passthrough']:
+            while True:
+                packet = source.read()
+                if not packet:
+                    return
+                if not packet.startswith((b'OpusHead', b'OpusTags')):
+                    yield packet
+
+        encoder = discord.opus.Encoder()
+        stage = GainStage()
+        while True:
+            frame = source.read()
+            if len(frame) != FRAME_BYTES:
+                return
+            yield encoder.encode(stage.process(frame, self.volume), encoder.SAMPLES_PER_FRAME)
+
+    def run(self):
+        job = self.job
+        try:
+            if job['passthrough']:
+                source = discord.FFmpegOpusAudio(job['url'], codec='copy', before_options=job['before_options'], options='-vn')
+            else:
+                source = discord.FFmpegPCMAudio(job['url'], before_options=job['before_options'], options='-vn')
+        except Exception as e:
+            logger.error(f"Voice worker failed to open stream {self.id}: {e}")
+            self.out(self.id, b'')
+            return
+
+        try:
+            for packet in self._packets(source):
+                while not self.credit.acquire(timeout=1.0):
+                    if self.stopped.is_set():
+                        return
+                if self.stopped.is_set():
+                    return
+                self.out(self.id, packet)
+        except Exception as e:
+            logger.error(f"Voice worker stream {self.id} failed: {e}")
+        finally:
+            source.cleanup()
+            if not self.stopped.is_set():
+                self.out(self.id, b'')
+
+
+def worker_main():
+    """loop ของ worker process: รับคำสั่งทาง stdin ส่งแพ็กเก็ตทาง stdout"""
+    out_file = os.fdopen(os.dup(1), 'wb')
+    os.dup2(2, 1)
+    sys.stdout = sys.stderr
+    logging.basicConfig(level=logging.INFO)
+
+    # ถ้าไม่ได้ตั้ง OPUS_LIBRARY ตัว Encoder จะโหลด libopus ที่หาเจอในระบบเองตอนเปิด stream แรก
+    library = os.getenv('OPUS_LIBRARY')
+    if library and not discord.opus.is_loaded():
+        try:
+            discord.opus.load_opus(library)
+        except OSError as e:
+            logger.error(f"Failed to load opus library {library}: {e}")
+
+    out_lock = threading.Lock()
+
+    def out(stream_id, packet):
+        with out_lock:
+            out_file.write(HEADER.pack(stream_id, len(packet)) + packet)
+            out_file.flush()
+
+    streams = {}
+    for line in sys.stdin:
+        job = json.loads(line)
+        stream = streams.get(job['id'])
+        if job['op'] == 'open':
+            stream = streams[job['id']] = _Stream(job['id'], job, out)
+            stream.start()
+        elif stream is None:
+            continue
+        elif job['op'] == 'credit':
+            stream.credit.release(job['n'])
+        elif job['op'] == 'volume':
+            stream.volume = job['volume']
+        elif job['op'] == 'close':
+            stream.stop()
+            del streams[job['id']]
+
+    for stream in streams.values():
+        stream.stop()
+
+
+if __name__ == '__main__':
+    worker_main()
@@ -0,0 +1,119 @@
+import asyncio
+import logging
+
+import discord
+
+import metrics
+from broadcast import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+
+class WelcomePipeline:
+    """ต้อนรับสมาชิกใหม่แบบรวมเป็นชุด เพื่อไม่ให้ช่วง raid/invite wave ยิง REST ตามจำนวนคนที่เข้า
+
+    - ข้อความในห้อง: คนที่เข้าภายใน window วินาทีหลังคนแรกรวมเป็นข้อความเดียว
+      (mention ได้ไม่เกิน max_mentions คน ที่เหลือบอกเป็นจำนวน) ห้องต้อนรับหาจาก
+      ChannelPolicy ซึ่งเก็บ id ไว้และอัปเดตตาม event ของห้อง
+    - DM: ใส่คิวขนาดจำกัด มี worker dm_workers ตัวส่งตาม dm_rate ต่อวินาที
+      ถ้าคิวเต็มจะทิ้ง DM ของคนที่เข้ามาใหม่ (นับไว้ใน stats) แทนที่จะสะสมไม่จำกัด
+
+    ในหนึ่งนาที REST ที่ออกไปจึงไม่เกิน 60 / window ข้อความต่อ guild และ dm_rate * 60 DM
+    ไม่ว่าจะมีคนเข้ามากี่คน
+    """
+
+    def __init__(self, channels, window=2.0, max_mentions=50, dm_workers=2, dm_queue=100, dm_rate=2.0):
+        self.channels = channels
+        self.window = window
+        self.max_mentions = max_mentions
+        self.dm_workers = dm_workers
+        self._dm_queue = asyncio.Queue(maxsize=dm_queue)
+        self._dm_limiter = RateLimiter(dm_rate, burst=1)
+        self._batches = {}  # guild_id -> สมาชิกที่รอต้อนรับในรอบนี้
+        self._flushers = {}  # guild_id -> task ที่จะส่งข้อความของรอบนี้
+        self._workers = []
+        self.joined = 0
+        self.dropped = 0
+
+    def member_joined(self, member):
+        """เรียกจาก on_member_join (ไม่รอ REST)"""
+        self.joined += 1
+        self._queue_dm(member)
+
+        guild = member.guild
+        batch = self._batches.setdefault(guild.id, [])
+        batch.append(member)
+        if guild.id not in self._flushers:
+            self._flushers[guild.id] = asyncio.create_task(self._flush_later(guild))
+
+    # ---- ข้อความในห้องต้อนรับ ----
+
+    async def _flush_later(self, guild):
+        try:
+            await asyncio.sleep(self.window)
+        finally:
+            self._flushers.pop(guild.id, None)
+            members = self._batches.pop(guild.id, [])
+        channel = self.channels.channel_for(guild)
+        if channel is None or not members:
+            return
+        try:
+            await channel.send(self.format_welcome(members),
+                               allowed_mentions=discord.AllowedMentions(users=True, roles=False, everyone=False))
+        except discord.HTTPException as e:
+            metrics.welcomes.inc('channel', 'failed')
+            logger.warning(f"Failed to post welcome in {guild.id}: {e}")
+        else:
+            metrics.welcomes.inc('channel', 'sent')
+
+    def format_welcome(self, members):
+        mentions = ", ".join(member.mention for member in members[:self.max_mentions])
+        extra = len(members) - self.max_mentions
+        if extra > 0:
+            mentions += f" และอีก {extra} คน"
+        return f"ยินดีต้อนรับ {mentions} เข้าสู่เซิร์ฟเวอร์! ของโอย่า"
+
+    # ---- DM ----
+
+    def _queue_dm(self, member):
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._dm_worker()) for _ in range(self.dm_workers)]
+        try:
+            self._dm_queue.put_nowait(member)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            metrics.welcomes.inc('dm', 'dropped')
+
+    async def _dm_worker(self):
+        while True:
+            member = await self._dm_queue.get()
+            try:
+                await self._dm_limiter.acquire()
+                await member.send(f"Welcome to the server {member.guild}!")
+            except discord.Forbidden:
+                metrics.welcomes.inc('dm', 'forbidden')
+            except discord.HTTPException as e:
+                metrics.welcomes.inc('dm', 'failed')
+                logger.warning(f"Failed to DM {member.id}: {e}")
+            except Exception as e:
+                # เช่น aiohttp.ClientError / asyncio.TimeoutError ห้ามให้ worker ตาย
+                # ไม่อย่างนั้นคิวจะค้างและ DM หลังจากนี้ถูกทิ้งหมด
+                metrics.welcomes.inc('dm', 'failed')
+                logger.error(f"Unexpected error sending welcome DM to {member.id}: {e}")
+            else:
+                metrics.welcomes.inc('dm', 'sent')
+            finally:
+                self._dm_queue.task_done()
+
+    def stats(self):
+        return {
+            'joined': self.joined,
+            'batching': sum(len(batch) for batch in self._batches.values()),
+            'dm_queued': self._dm_queue.qsize(),
+            'dm_dropped': self.dropped,
+        }
+
+    def close(self):
+        for task in list(self._flushers.values()) + self._workers:
+            task.cancel()
+        self._workers = []